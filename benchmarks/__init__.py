@@ -0,0 +1,14 @@
+"""Performance benchmarks of thermo-ml
+
+Each "bench_*" module has a "run()" function returning
+a dictionary of key=metric name and value=seconds.
+Run one from the repository root, e.g.:
+
+    python -m benchmarks.bench_artifact
+
+or all of them, saving or comparing against a baseline
+(exits with status 1 on regressions), e.g.:
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json --tolerance 0.25
+"""
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Elements commonly found in oxides, silicates and cement phases
+COMMON_ELEMENTS = (
+    'H', 'C', 'N', 'O', 'F', 'Na', 'Mg', 'Al', 'Si', 'P', 'S', 'Cl',
+    'K', 'Ca', 'Ti', 'Cr', 'Mn', 'Fe', 'Co', 'Ni', 'Cu', 'Zn', 'Sr', 'Ba',
+)
+
+
+def random_formulas(n:int, max_elements:int=4, seed:int=0) -> list:
+    """Synthetic flat formulas (e.g. 'Ca2Si1O4')
+
+    Args:
+        n (int): Number of formulas.
+        max_elements (int, optional): Max. number of
+            distinct elements per formula. Defaults to 4.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        list of str: Chemical formulas
+    """
+    rng = np.random.default_rng(seed)
+    formulas = []
+    for _ in range(n):
+        n_elements = rng.integers(1, max_elements + 1)
+        atoms = rng.choice(COMMON_ELEMENTS, size=n_elements, replace=False)
+        counts = rng.integers(1, 9, size=n_elements)
+        formulas.append(''.join(f'{a}{c}' for a, c in zip(atoms, counts)))
+    return formulas
+
+def nested_formula(depth:int, width:int=1) -> str:
+    """Formula with brackets nested "depth" levels deep
+
+    Scales up 'COOH[C[CH3]2]3CH3' (depth 2, width 1) in
+    nesting depth and in length, the outermost group
+    being repeated "width" times.
+
+    Args:
+        depth (int): Levels of nested brackets.
+        width (int, optional): Copies of the outermost group.
+            Defaults to 1.
+
+    Returns:
+        str: Chemical formula
+    """
+    group = 'CH3'
+    for level in range(depth):
+        left, right = ('[', ']') if level % 2 else ('(', ')')
+        group = f'C{left}{group}{right}{level % 3 + 2}'
+    return 'COOH' + group * width + 'CH3'
+
+def nested_formulas(n:int, depth:int, width:int=1, seed:int=0) -> list:
+    """Synthetic nested formulas, all different
+
+    Args:
+        n (int): Number of formulas.
+        depth (int): See "nested_formula".
+        width (int, optional): See "nested_formula". Defaults to 1.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        list of str: Chemical formulas
+            (e.g. 'Ca2Fe1COOH(C[CH3]2)3CH3')
+    """
+    base = nested_formula(depth, width)
+    return [prefix + base for prefix in random_formulas(n, max_elements=2, seed=seed)]
@@ -0,0 +1,57 @@
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+from thermo_ml import ml
+
+
+def run(quick:bool=False) -> dict:
+    """Time loading a model artifact vs. unpickling the same weights
+
+    Args:
+        quick (bool, optional): Use smaller weights. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n_members, n_features = (64, 2_000) if quick else (256, 20_000)
+    rng = np.random.default_rng(0)
+    artifact = ml.Artifact(
+        model_type='Benchmark',
+        arrays={'coef': rng.standard_normal((n_members, n_features)),
+                'intercept': rng.standard_normal(n_members)},
+        feature_spec={'n_features': n_features})
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path_artifact = os.path.join(tmp, 'model.tmla')
+        path_pickle = os.path.join(tmp, 'model.pkl')
+        artifact.save(path_artifact)
+        with open(path_pickle, 'wb') as f:
+            pickle.dump(artifact.arrays, f)
+        results['artifact_load_mmap'] = _best_of(
+            lambda: ml.load_artifact(path_artifact))
+        results['artifact_load_copy'] = _best_of(
+            lambda: ml.load_artifact(path_artifact, mmap_mode=False))
+        results['pickle_load'] = _best_of(
+            lambda: _unpickle(path_pickle))
+    return results
+
+def _unpickle(path:str):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _best_of(func, repeat:int=5) -> float:
+    """Best wall time of several calls"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
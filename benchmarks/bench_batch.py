@@ -0,0 +1,44 @@
+import time
+
+from thermo_ml import composition
+from benchmarks._corpus import random_formulas
+
+
+def run(quick:bool=False) -> dict:
+    """Time CompositionBatch operations vs. the same on a list of dicts
+
+    Args:
+        quick (bool, optional): Use fewer formulas. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    formulas = random_formulas(20_000 if quick else 200_000, seed=3)
+    dicts = composition.parse_formulas(formulas)
+    results = {}
+    start = time.perf_counter()
+    batch = composition.as_batch(dicts)
+    results['batch_build'] = time.perf_counter() - start
+    ### Normalize & filter, vectorized vs. per formula
+    start = time.perf_counter()
+    batch.normalize().filter_by_element(['Ca', 'Si'], how='all')
+    results['batch_normalize_filter'] = time.perf_counter() - start
+    start = time.perf_counter()
+    normalized = [{a: n / sum(d.values()) for a, n in d.items()} for d in dicts]
+    [d for d in normalized if 'Ca' in d and 'Si' in d]
+    results['dicts_normalize_filter'] = time.perf_counter() - start
+    ### Merge, e.g. adding water to every formula
+    water = composition.as_batch(['H2O']).take([0] * len(batch))
+    start = time.perf_counter()
+    batch + water
+    results['batch_add'] = time.perf_counter() - start
+    start = time.perf_counter()
+    [{a: d.get(a, 0.0) + {'H': 2.0, 'O': 1.0}.get(a, 0.0) for a in {*d, 'H', 'O'}}
+     for d in dicts]
+    results['dicts_add'] = time.perf_counter() - start
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
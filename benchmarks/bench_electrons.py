@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+from thermo_ml import composition, database, electrons
+from benchmarks._corpus import random_formulas
+
+
+def run(quick:bool=False) -> dict:
+    """Time valence & ionization features vs. a loop over formulas
+
+    Uses random electron configurations & ionization energies,
+    so it runs without the Atoms database.
+
+    Args:
+        quick (bool, optional): Use fewer formulas. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    rng = np.random.default_rng(0)
+    configs = rng.integers(0, 3, (composition.N_ELEMENTS, len(database.SUBSHELLS)))
+    energies = np.sort(rng.uniform(5, 100, (composition.N_ELEMENTS,
+                                            database.N_IONIZATION_ENERGIES)), axis=1)
+    formulas = random_formulas(20_000 if quick else 200_000, seed=7)
+    batch = composition.as_batch(formulas)
+    dicts = batch.to_dicts()
+    results = {}
+    start = time.perf_counter()
+    electrons.valence_features(batch, configs)
+    results['valence_batch'] = time.perf_counter() - start
+    valence, _ = electrons.valence_table(configs)
+    start = time.perf_counter()
+    for d in dicts:
+        n = sum(d.values())
+        sum(valence[composition.ELEMENT_INDEX[a]] * c / n for a, c in d.items())
+    results['valence_dicts'] = time.perf_counter() - start
+    start = time.perf_counter()
+    electrons.ionization_features(batch, 2, energies)
+    results['ionization_batch'] = time.perf_counter() - start
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
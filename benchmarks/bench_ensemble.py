@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+from thermo_ml import ml
+
+
+def run(quick:bool=False) -> dict:
+    """Time bootstrap ensemble training & prediction
+
+    Compares fitting members one after another on resampled
+    copies of the data vs. the weighted fits on shared features.
+
+    Args:
+        quick (bool, optional): Use fewer samples & members.
+            Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n_samples, n_features, n_members = (5_000, 20, 32) if quick else (50_000, 40, 128)
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((n_samples, n_features))
+    y = X @ rng.standard_normal(n_features) + rng.standard_normal(n_samples)
+    results = {}
+    ### Resampled copies, one member after another
+    start = time.perf_counter()
+    for _ in range(n_members):
+        rows = rng.integers(0, n_samples, n_samples)
+        Xb = X[rows] - X[rows].mean(axis=0)
+        yb = y[rows] - y[rows].mean()
+        np.linalg.solve(Xb.T @ Xb + np.eye(n_features), Xb.T @ yb)
+    results['fit_resampled_loop'] = time.perf_counter() - start
+    start = time.perf_counter()
+    model = ml.BootstrapEnsemble(n_members=n_members, n_jobs=1, seed=0).fit(X, y)
+    results['fit_weighted_serial'] = time.perf_counter() - start
+    start = time.perf_counter()
+    ml.BootstrapEnsemble(n_members=n_members, seed=0).fit(X, y)
+    results['fit_weighted_parallel'] = time.perf_counter() - start
+    start = time.perf_counter()
+    model.predict(X)
+    results['predict'] = time.perf_counter() - start
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
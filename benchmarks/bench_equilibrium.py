@@ -0,0 +1,42 @@
+import time
+
+import numpy as np
+from thermo_ml.equilibrium import EquilibriumSolver
+
+
+### C-O-H system with made-up but realistic G(T) (J/mol)
+GASES = ['H2', 'O2', 'H2O', 'CO', 'CO2', 'CH4', 'OH', 'H', 'O']
+CONDENSED = {'C(s)': 'C'}
+GIBBS = {
+    'H2': [0.0], 'O2': [0.0], 'C(s)': [0.0],
+    'H2O': [-242000.0, 45.0], 'CO': [-111000.0, -89.0],
+    'CO2': [-394000.0, -1.0], 'CH4': [-90000.0, 110.0],
+    'OH': [39000.0, -12.0], 'H': [220000.0, -50.0], 'O': [249000.0, -60.0],
+}
+
+
+def run(quick:bool=False) -> dict:
+    """Time equilibrium over a temperature x composition grid
+
+    Args:
+        quick (bool, optional): Use a smaller grid. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n_T, n_c = (20, 20) if quick else (100, 50)
+    solver = EquilibriumSolver(gases=GASES, condensed=CONDENSED, gibbs=GIBBS)
+    T = np.linspace(500, 3000, n_T)
+    rng = np.random.default_rng(0)
+    compositions = [dict(zip('CHO', x)) for x in rng.dirichlet([1, 1, 1], n_c)]
+    results = {}
+    for name, warm_start in [('cold', False), ('warm', True)]:
+        start = time.perf_counter()
+        solver.solve(T, compositions, warm_start=warm_start)
+        results[f'equilibrium_grid_{name}'] = time.perf_counter() - start
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
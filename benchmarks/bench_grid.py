@@ -0,0 +1,68 @@
+import functools
+import os
+import time
+
+import numpy as np
+from thermo_ml.equilibrium import EquilibriumSolver
+from thermo_ml.grid import GridSweep
+from benchmarks.bench_equilibrium import CONDENSED, GASES, GIBBS
+
+
+def run(quick:bool=False) -> dict:
+    """Time a stable-phase map of the C-O-H system, serial vs. all cores
+
+    Args:
+        quick (bool, optional): Use a smaller grid. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n = 24 if quick else 96
+    axes = [np.linspace(0.05, 0.95, n), np.linspace(500, 3000, n)]
+    results = {}
+    for name, n_jobs in [('serial', 1), ('parallel', os.cpu_count())]:
+        sweep = GridSweep(_phase_label, n_jobs=n_jobs, tile_size=n * 4)
+        start = time.perf_counter()
+        values = sweep.run(axes)
+        results[f'grid_{name}'] = time.perf_counter() - start
+        start = time.perf_counter()
+        sweep.refine(axes, values, levels=3)
+        results[f'grid_refine_{name}'] = time.perf_counter() - start
+    return results
+
+def _phase_label(points:np.ndarray) -> np.ndarray:
+    """Dominant gas species & graphite stability at (carbon fraction, T) points"""
+    solver = _solver()
+    x, T = points[:, 0], points[:, 1]
+    labels = np.zeros(len(points), dtype=np.int64)
+    # Points share a composition or a temperature with many others,
+    # each is solved together with the larger of the two groups
+    _, x_group, x_count = np.unique(x, return_inverse=True, return_counts=True)
+    _, T_group, T_count = np.unique(T, return_inverse=True, return_counts=True)
+    by_T = T_count[T_group] > x_count[x_group]
+    for value in np.unique(x[~by_T]):
+        rows = np.flatnonzero(~by_T & (x == value))
+        result = solver.solve(T[rows], [_composition(value)])
+        labels[rows] = _label(result.amounts[:, 0, :])
+    for value in np.unique(T[by_T]):
+        rows = np.flatnonzero(by_T & (T == value))
+        result = solver.solve([value], [_composition(v) for v in x[rows]])
+        labels[rows] = _label(result.amounts[0])
+    return labels
+
+def _label(amounts:np.ndarray) -> np.ndarray:
+    n_gases = len(GASES)
+    graphite = amounts[:, n_gases] > 1e-6
+    return amounts[:, :n_gases].argmax(axis=1) + n_gases * graphite
+
+def _composition(x:float) -> dict:
+    return {'C': x, 'H': 0.5 * (1 - x), 'O': 0.5 * (1 - x)}
+
+@functools.lru_cache(maxsize=None)
+def _solver() -> EquilibriumSolver:
+    return EquilibriumSolver(gases=GASES, condensed=CONDENSED, gibbs=GIBBS)
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
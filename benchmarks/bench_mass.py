@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+from thermo_ml import composition, database, mass, parse
+from benchmarks._corpus import random_formulas
+
+
+def run(quick:bool=False) -> dict:
+    """Time vectorized molar masses vs. a per-formula loop
+
+    Args:
+        quick (bool, optional): Use fewer formulas. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n_formulas = 20_000 if quick else 200_000
+    # Unique formulas, plus repeats as found in real datasets
+    formulas = random_formulas(n_formulas // 2, seed=0)
+    formulas = formulas + formulas
+    weights = _atomic_weights()
+    results = {}
+    ### Vectorized
+    start = time.perf_counter()
+    mass.molar_masses(formulas, weights)
+    results['molar_mass_vectorized'] = time.perf_counter() - start
+    ### Per-formula loop
+    dict_weights = dict(zip(composition.ELEMENTS, weights))
+    start = time.perf_counter()
+    [sum(count * dict_weights[atom] for atom, count in parse.atoms(f).items())
+     for f in formulas]
+    results['molar_mass_loop'] = time.perf_counter() - start
+    return results
+
+def _atomic_weights() -> np.ndarray:
+    """Atomic weights from the database, or stand-ins if it isn't available"""
+    try:
+        return database.get_property_array(mass.ATOMIC_WEIGHT)
+    except FileNotFoundError:
+        return 2.0 * np.arange(1, composition.N_ELEMENTS + 1)
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
@@ -0,0 +1,36 @@
+import time
+
+from thermo_ml.oxidation import OxidationStateAssigner
+from benchmarks._corpus import random_formulas
+
+
+def run(quick:bool=False) -> dict:
+    """Time oxidation-state assignment of random formulas
+
+    Needs the ionization energies of the Atoms database,
+    returns no metrics without it.
+
+    Args:
+        quick (bool, optional): Use fewer formulas. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    formulas = random_formulas(10_000 if quick else 100_000, seed=5)
+    try:
+        assigner = OxidationStateAssigner()
+    except FileNotFoundError: # atoms.xls not available
+        return {}
+    results = {}
+    start = time.perf_counter()
+    assigner.assign(formulas)
+    results['assign_cold'] = time.perf_counter() - start
+    start = time.perf_counter()
+    assigner.assign(formulas)
+    results['assign_cached'] = time.perf_counter() - start
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
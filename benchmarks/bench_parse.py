@@ -0,0 +1,78 @@
+import subprocess
+import sys
+import time
+
+from thermo_ml import composition, database, parse
+from benchmarks._corpus import nested_formulas, random_formulas
+
+
+# Nesting depths & lengths of the nested formula corpora
+DEPTHS = (0, 2, 4, 8)
+WIDTHS = (1, 4)
+
+
+def run(quick:bool=False) -> dict:
+    """Time import, formula parsing and atomic properties lookups
+
+    Database metrics are left out if the atomic
+    properties table isn't available.
+
+    Args:
+        quick (bool, optional): Use fewer formulas. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n_formulas = 500 if quick else 5_000
+    results = {'import_cold': _import_time()}
+    ### Parse throughput (seconds per formula) by nesting depth & length
+    for depth in DEPTHS:
+        for width in WIDTHS:
+            formulas = nested_formulas(n_formulas, depth, width, seed=depth)
+            start = time.perf_counter()
+            for formula in formulas:
+                parse.atoms(formula)
+            results[f'parse_depth{depth}_width{width}'] = (
+                (time.perf_counter() - start) / n_formulas)
+    formulas = random_formulas(n_formulas * 4, seed=2)
+    start = time.perf_counter()
+    composition.parse_formulas(formulas)
+    results['parse_bulk_flat'] = (time.perf_counter() - start) / len(formulas)
+    ### Float vs. exact (rational) counts on fractional formulas
+    fractional = [f'{f}(H0.{i % 9 + 1}Si2O7)2.5' for i, f in enumerate(formulas)]
+    for name, exact in [('float', False), ('exact', True)]:
+        start = time.perf_counter()
+        for formula in fractional:
+            parse.atoms(formula, exact=exact)
+        results[f'parse_fractional_{name}'] = (time.perf_counter() - start) / len(fractional)
+    ### Atomic properties table
+    try:
+        start = time.perf_counter()
+        atoms = database.Atoms()
+        results['atoms_load'] = time.perf_counter() - start
+    except FileNotFoundError:
+        return results
+    n_lookups = 20 if quick else 200
+    start = time.perf_counter()
+    for _ in range(n_lookups):
+        atoms.get_atoms('Ca', 'Electronegativity')
+    results['get_atoms_single'] = (time.perf_counter() - start) / n_lookups
+    symbols = atoms.list_all_atoms['Symbol'].dropna().tolist()
+    start = time.perf_counter()
+    for _ in range(n_lookups):
+        atoms.get_atoms(symbols, ['Electronegativity', 'Atomic weight (a.m.u.)'])
+    results['get_atoms_bulk'] = (time.perf_counter() - start) / n_lookups
+    return results
+
+def _import_time() -> float:
+    """Seconds to import thermo_ml in a fresh interpreter"""
+    code = ('import time; start = time.perf_counter(); import thermo_ml; '
+            'print(time.perf_counter() - start)')
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True)
+    return float(output.stdout)
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
@@ -0,0 +1,34 @@
+import time
+
+from thermo_ml import parse, profiling
+from benchmarks._corpus import random_formulas
+
+
+def run(quick:bool=False) -> dict:
+    """Time parsing with instrumentation off vs. on
+
+    Args:
+        quick (bool, optional): Use fewer formulas. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    formulas = random_formulas(2_000 if quick else 20_000, seed=1)
+    enabled = profiling.ENABLED
+    results = {}
+    try:
+        for name, on in [('off', False), ('on', True)]:
+            profiling.ENABLED = on
+            start = time.perf_counter()
+            for formula in formulas:
+                parse.atoms(formula)
+            results[f'parse_profiling_{name}'] = time.perf_counter() - start
+    finally:
+        profiling.ENABLED = enabled
+        profiling.reset()
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from thermo_ml.search import SearchIndex
+from benchmarks._corpus import random_formulas
+
+
+# Words of synthetic compound names
+WORDS = ('calcium', 'silicate', 'hydrate', 'aluminate', 'ferrite', 'sodium',
+         'potassium', 'magnesium', 'oxide', 'hydroxide', 'carbonate', 'sulfate',
+         'chloride', 'iron', 'alpha', 'beta', 'gamma', 'tri', 'di', 'anhydrous')
+PREFIX_QUERIES = ('calcium sil', 'potassium', 'sulfate 99', 'Ca2Si1', 'hydrate 123')
+FUZZY_QUERIES = ('calcium silcate hydrate 12', 'sulfate ferite 42', 'magnesum oxyde')
+
+
+def run(quick:bool=False) -> dict:
+    """Time building, loading & querying a search index vs. pandas
+
+    Query times are per query, on the memory mapped index.
+
+    Args:
+        quick (bool, optional): Index 20k instead of 1M entries.
+            Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n = 20_000 if quick else 1_000_000
+    rng = np.random.default_rng(0)
+    names = [' '.join(rng.choice(WORDS, rng.integers(1, 5))) + f' {i}' for i in range(n)]
+    formulas = random_formulas(n, seed=11)
+    results = {}
+    start = time.perf_counter()
+    index = SearchIndex(names, formulas)
+    results['build'] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(os.path.join(tmp, 'index'))
+        start = time.perf_counter()
+        index = SearchIndex.load(os.path.join(tmp, 'index'))
+        results['load'] = time.perf_counter() - start
+        for metric, queries in (('query_prefix', PREFIX_QUERIES),
+                                ('query_fuzzy', FUZZY_QUERIES)):
+            # First queries page the memory maps in
+            start = time.perf_counter()
+            for query in queries:
+                index.search(query)
+            results[f'{metric}_cold'] = (time.perf_counter() - start) / len(queries)
+            start = time.perf_counter()
+            for query in queries:
+                index.search(query)
+            results[metric] = (time.perf_counter() - start) / len(queries)
+    ### Substring filter of a DataFrame
+    df = pd.DataFrame({'name': names, 'formula': formulas})
+    start = time.perf_counter()
+    for query in PREFIX_QUERIES:
+        df[df['name'].str.contains(query, regex=False)
+           | df['formula'].str.contains(query, regex=False)]
+    results['query_pandas_contains'] = (time.perf_counter() - start) / len(PREFIX_QUERIES)
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
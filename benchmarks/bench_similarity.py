@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+from thermo_ml import composition, parse
+from thermo_ml.similarity import CompositionIndex
+from benchmarks._corpus import random_formulas
+
+
+def run(quick:bool=False) -> dict:
+    """Time batched k-NN queries vs. a linear scan over compositions
+
+    The KD-tree is timed on 8 random element features per atom
+    (the element table isn't needed), against the blocked scan
+    of the same vectors.
+
+    Args:
+        quick (bool, optional): Use a smaller table. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n_table, n_queries = (2_000, 50) if quick else (200_000, 500)
+    table = random_formulas(n_table, seed=0)
+    queries = random_formulas(n_queries, seed=1)
+    results = {}
+    ### Build index
+    start = time.perf_counter()
+    index = CompositionIndex()
+    index.add(table)
+    results['index_build'] = time.perf_counter() - start
+    ### Batched queries
+    start = time.perf_counter()
+    index.query(queries, k=5)
+    results['index_query_per_formula'] = (time.perf_counter() - start) / n_queries
+    ### Element features: KD-tree vs. blocked scan
+    features = np.random.default_rng(2).normal(size=(composition.N_ELEMENTS, 8))
+    for name, tree in (('tree', True), ('feature_scan', False)):
+        index = CompositionIndex(features, tree=tree)
+        index.add(table)
+        start = time.perf_counter()
+        index.query(queries[:1]) # builds the tree
+        results[f'{name}_build'] = time.perf_counter() - start
+        start = time.perf_counter()
+        index.query(queries, k=5)
+        results[f'{name}_query_per_formula'] = (time.perf_counter() - start) / n_queries
+    ### Linear scan over the parsed table (a few queries only)
+    fractions = [_fractions(parse.atoms(f)) for f in table]
+    n_scan = max(1, n_queries // 50)
+    start = time.perf_counter()
+    for formula in queries[:n_scan]:
+        query = _fractions(parse.atoms(formula))
+        sorted(range(len(fractions)),
+               key=lambda i: _sq_distance(query, fractions[i]))[:5]
+    results['linear_scan_per_formula'] = (time.perf_counter() - start) / n_scan
+    return results
+
+def _fractions(composition:dict) -> dict:
+    total = sum(composition.values())
+    return {atom: count / total for atom, count in composition.items()}
+
+def _sq_distance(a:dict, b:dict) -> float:
+    return sum((a.get(atom, 0.0) - b.get(atom, 0.0))**2 for atom in a.keys() | b.keys())
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
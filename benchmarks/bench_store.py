@@ -0,0 +1,47 @@
+import os
+import tempfile
+import time
+
+from thermo_ml.database import CompoundStore
+from benchmarks._corpus import random_formulas
+
+
+# Rows per append, like a parser flushing small batches
+BATCH_ROWS = 100
+
+
+def run(quick:bool=False) -> dict:
+    """Time appends, compaction & delta vs. full reads of a compound store
+
+    Args:
+        quick (bool, optional): Store fewer rows. Defaults to False.
+
+    Returns:
+        dict: key=metric name, value=seconds
+    """
+    n = 10_000 if quick else 100_000
+    formulas = random_formulas(n, seed=5)
+    records = [{'formula': f, 'source': 'bench', 'properties': {'row': i}}
+               for i, f in enumerate(formulas)]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CompoundStore(os.path.join(tmp, 'store'))
+        start = time.perf_counter()
+        for i in range(0, n, BATCH_ROWS):
+            store.append(records[i:i + BATCH_ROWS])
+        results['append_batch'] = (time.perf_counter() - start) / (n // BATCH_ROWS)
+        start = time.perf_counter()
+        store.compact()
+        results['compact'] = time.perf_counter() - start
+        store.append(records[:BATCH_ROWS])
+        for metric, version in (('read_delta', store.version - BATCH_ROWS),
+                                ('read_full', 0)):
+            start = time.perf_counter()
+            store.rows_since(version)
+            results[metric] = time.perf_counter() - start
+    return results
+
+
+if __name__ == '__main__':
+    for name, seconds in run().items():
+        print(f'{name:<30} {seconds * 1e3:10.3f} ms')
@@ -0,0 +1,152 @@
+import argparse
+import importlib
+import json
+import platform
+import pkgutil
+import sys
+
+import numpy as np
+
+import benchmarks
+
+
+# Max. allowed slow down vs. the baseline (0.25 = 25 % slower)
+DEFAULT_TOLERANCE = 0.25
+
+
+def modules() -> list:
+    """Names of all benchmark modules (e.g. 'bench_parse')"""
+    return sorted(m.name for m in pkgutil.iter_modules(benchmarks.__path__)
+                  if m.name.startswith('bench_'))
+
+def run(names:list=None, quick:bool=False, repeat:int=3) -> dict:
+    """Run benchmark modules, keeping the best time of each metric
+
+    Args:
+        names (list of str, optional): Benchmark modules.
+            Defaults to None, meaning all of them.
+        quick (bool, optional): Smaller workloads. Defaults to False.
+        repeat (int, optional): Runs per module. Defaults to 3.
+
+    Returns:
+        dict: key=<module>.<metric>, value=seconds
+    """
+    results = {}
+    for name in names or modules():
+        module = importlib.import_module(f'benchmarks.{name}')
+        for _ in range(repeat):
+            metrics = module.run(quick=quick)
+            if not metrics:
+                print(f'warning: {name} reported no metrics (missing data?)',
+                      file=sys.stderr)
+                break
+            for metric, seconds in metrics.items():
+                key = f'{name[len("bench_"):]}.{metric}'
+                results[key] = min(results.get(key, np.inf), seconds)
+    return results
+
+def compare(results:dict, baseline:dict, tolerance:float=DEFAULT_TOLERANCE) -> dict:
+    """Compare results against a baseline
+
+    Args:
+        results (dict): key=metric, value=seconds
+        baseline (dict): Same, from an earlier run.
+        tolerance (float, optional): Max. allowed relative slow
+            down. Defaults to DEFAULT_TOLERANCE.
+
+    Returns:
+        dict: key=metric, value=dict of 'baseline', 'current',
+            'ratio' (current / baseline) and 'status', one of
+            'ok', 'regression', 'improvement', 'missing' (in the
+            baseline only, e.g. a benchmark that stopped
+            reporting) or 'new' (in the results only).
+    """
+    comparison = {}
+    for metric in sorted(set(results) | set(baseline)):
+        old, new = baseline.get(metric), results.get(metric)
+        if new is None:
+            status, ratio = 'missing', None
+        elif old is None:
+            status, ratio = 'new', None
+        else:
+            ratio = new / old if old > 0 else np.inf
+            if ratio > 1.0 + tolerance:
+                status = 'regression'
+            elif ratio < 1.0 / (1.0 + tolerance):
+                status = 'improvement'
+            else:
+                status = 'ok'
+        comparison[metric] = {'baseline': old, 'current': new,
+                              'ratio': ratio, 'status': status}
+    return comparison
+
+def save(path:str, results:dict, quick:bool=False):
+    """Write results as a JSON baseline, with the environment they ran in"""
+    document = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+def load(path:str) -> dict:
+    """Results of a JSON baseline written by "save" """
+    with open(path) as f:
+        return json.load(f)['results']
+
+def main(argv=None) -> int:
+    """Run the suite, optionally saving or comparing against a baseline
+
+    e.g.
+        python -m benchmarks --save baseline.json
+        python -m benchmarks --compare baseline.json --tolerance 0.2
+
+    Returns:
+        int: Exit status, 1 if any metric regressed or is missing
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks',
+                                     description='thermo-ml benchmark suite')
+    parser.add_argument('--only', default=None,
+                        help=f'Comma separated modules, of {modules()}')
+    parser.add_argument('--quick', action='store_true', help='Smaller workloads')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per module, best time is kept (default: 3)')
+    parser.add_argument('--save', default=None, help='Write results to a JSON baseline')
+    parser.add_argument('--compare', default=None, help='JSON baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Max. relative slow down (default: {DEFAULT_TOLERANCE})')
+    args = parser.parse_args(argv)
+    names = args.only.split(',') if args.only else None
+    results = run(names, quick=args.quick, repeat=args.repeat)
+    if args.save:
+        save(args.save, results, quick=args.quick)
+    if not args.compare:
+        for metric, seconds in results.items():
+            print(f'{metric:<45} {seconds * 1e3:12.4f} ms')
+        return 0
+    baseline = load(args.compare)
+    if names:
+        # Only metrics of the modules that were run
+        prefixes = tuple(f'{name[len("bench_"):]}.' for name in names)
+        baseline = {m: s for m, s in baseline.items() if m.startswith(prefixes)}
+    comparison = compare(results, baseline, args.tolerance)
+    for metric, c in comparison.items():
+        old = '-' if c['baseline'] is None else f'{c["baseline"] * 1e3:.4f}'
+        new = '-' if c['current'] is None else f'{c["current"] * 1e3:.4f}'
+        ratio = '-' if c['ratio'] is None else f'{c["ratio"]:.2f}x'
+        print(f'{metric:<45} {old:>12} {new:>12} ms {ratio:>8}  {c["status"]}')
+    regressions = [m for m, c in comparison.items() if c['status'] == 'regression']
+    missing = [m for m, c in comparison.items() if c['status'] == 'missing']
+    if regressions:
+        print(f'{len(regressions)} regression(s) beyond {args.tolerance:.0%}: '
+              f'{regressions}', file=sys.stderr)
+    if missing:
+        print(f'{len(missing)} metric(s) of the baseline not reported: {missing}',
+              file=sys.stderr)
+    return 1 if regressions or missing else 0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from thermo_ml import arrow, composition
+
+pa = pytest.importorskip('pyarrow')
+
+
+FORMULAS = ['CaO', 'SiO2', 'Ca(OH)2', 'H2O', 'Al2O3']
+
+
+def test_batch_round_trip():
+    """Test composition batches through both Arrow layouts"""
+    batch = composition.as_batch(FORMULAS)
+    table = arrow.batch_to_arrow(batch, names=FORMULAS)
+    assert table.column_names == ['formula', 'composition']
+    assert table.column('composition')[2].as_py() == [
+        {'element': 'Ca', 'count': 1.0}, {'element': 'O', 'count': 2.0},
+        {'element': 'H', 'count': 2.0}]
+    # Counts are shared, not copied
+    loaded = arrow.batch_from_arrow(table)
+    assert np.shares_memory(loaded.counts, batch.counts)
+    assert np.shares_memory(loaded.element_ids, batch.element_ids)
+    assert loaded.to_dicts() == batch.to_dicts()
+    # Several chunks are concatenated
+    chunked = pa.concat_tables([table, table])
+    assert arrow.batch_from_arrow(chunked).to_dicts() == batch.to_dicts() * 2
+    # Slices of the column keep their own rows only
+    assert arrow.batch_from_arrow(table.slice(2, 2)).to_dicts() == batch.to_dicts()[2:4]
+    columns = arrow.batch_to_arrow(batch, layout='columns')
+    assert columns.column('Si').null_count == 4
+    np.testing.assert_array_equal(arrow.batch_from_arrow(columns).to_matrix(),
+                                  batch.to_matrix())
+
+
+def test_features_ipc(tmp_path):
+    """Test feature matrices through a chunked IPC file"""
+    X = np.arange(12, dtype=np.float64).reshape(4, 3)
+    table = arrow.features_to_arrow(X, names=['a', 'b', 'c'])
+    assert np.shares_memory(arrow.features_from_arrow(table), X)
+    for stream in [False, True]:
+        path = tmp_path / f'features_{stream}.arrow'
+        with arrow.IPCWriter(str(path), stream=stream) as writer:
+            writer.write(arrow.features_to_arrow(X[:2]))
+            writer.write(arrow.features_to_arrow(X[2:]))
+        np.testing.assert_array_equal(arrow.features_from_arrow(arrow.read_ipc(str(path))), X)
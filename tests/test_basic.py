@@ -29,6 +29,20 @@ def test_parser():
                    f'as output of\n"{formula}"\n'
                    f'but instead got\n{output}')
         assert (output == expected_output), err_msg
+
+
+def test_parser_exact():
+    """Test exact (rational) stoichiometry mode of the parser
+    """
+    from fractions import Fraction
+    CP = parse.ChemParser(exact=True)
+    output = CP.atoms('Ca6.4(H0.6Si2O7)2(OH)2', stack=[{}])
+    assert output == [{'Ca': Fraction(32, 5), 'H': Fraction(16, 5), 'Si': 4, 'O': 16}]
+    assert isinstance(output[0]['Si'], int)
+    # Different spellings of the same composition give identical floats
+    assert parse.atoms('(H0.1)3', exact=True) == parse.atoms('H0.3', exact=True)
+    assert parse.atoms('(H0.1)3') != parse.atoms('H0.3')
+    assert parse.atoms('2(CaO)·0.5(SiO2)', exact=True) == {'Ca': 2.0, 'O': 3.0, 'Si': 0.5}
         
         
 def test_atomic_data():
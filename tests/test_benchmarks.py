@@ -0,0 +1,26 @@
+from benchmarks import suite
+
+
+def test_benchmark_compare(tmp_path):
+    """Test baselines round trip & regressions are flagged"""
+    baseline = {'parse.a': 1.0, 'parse.b': 1.0, 'parse.c': 1.0, 'mass.d': 1.0}
+    path = str(tmp_path / 'baseline.json')
+    suite.save(path, baseline)
+    assert suite.load(path) == baseline
+    results = {'parse.a': 1.2, 'parse.b': 1.3, 'parse.c': 0.5, 'parse.e': 1.0}
+    comparison = suite.compare(results, baseline, tolerance=0.25)
+    assert {m: c['status'] for m, c in comparison.items()} == {
+        'parse.a': 'ok', 'parse.b': 'regression', 'parse.c': 'improvement',
+        'mass.d': 'missing', 'parse.e': 'new'}
+    assert 'bench_parse' in suite.modules()
+
+
+def test_benchmark_compare_missing(tmp_path, monkeypatch, capsys):
+    """Test that a benchmark which stops reporting fails the comparison"""
+    path = str(tmp_path / 'baseline.json')
+    suite.save(path, {'parse.a': 1.0, 'parse.b': 1.0})
+    monkeypatch.setattr(suite, 'run', lambda names, quick, repeat: {'parse.a': 1.0})
+    assert suite.main(['--compare', path, '--only', 'bench_parse']) == 1
+    assert "['parse.b']" in capsys.readouterr().err
+    suite.save(path, {'parse.a': 1.0})
+    assert suite.main(['--compare', path]) == 0
@@ -0,0 +1,42 @@
+import pytest
+import pandas as pd
+from thermo_ml import cli
+
+
+def test_cli_parse(tmp_path):
+    """Test chunked, parallel batch parsing with an error file"""
+    source = tmp_path / 'formulas.csv'
+    pd.DataFrame({'formula': ['CaO', 'Ca(OH', 'Ca(OH)2', 'Xx2O', 'SiO2'] * 3}
+                 ).to_csv(source, index=False)
+    outputs = []
+    for jobs in [1, 2]:
+        output = tmp_path / f'atoms_{jobs}.csv'
+        status = cli.main(['parse', str(source), '-o', str(output), '--elements', 'Ca,O,Si',
+                           '--jobs', str(jobs), '--chunk-size', '4', '--quiet'])
+        assert status == 0
+        outputs.append(pd.read_csv(output))
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
+    atoms = outputs[0]
+    assert list(atoms.columns) == ['row', 'formula', 'Ca', 'O', 'Si']
+    assert atoms['row'].tolist() == [0, 2, 4, 5, 7, 9, 10, 12, 14]
+    assert atoms.loc[1, ['Ca', 'O']].tolist() == [1.0, 2.0]
+    errors = pd.read_csv(tmp_path / 'atoms_2.errors.csv')
+    assert errors['row'].tolist() == [1, 3, 6, 8, 11, 13]
+    assert errors['error'].str.startswith('SyntaxError').sum() == 3
+
+
+def test_cli_input_errors(tmp_path):
+    """Test a missing formula column and stale error files"""
+    source = tmp_path / 'compounds.csv'
+    pd.DataFrame({'name': ['lime'], 'formula': ['CaO']}).to_csv(source, index=False)
+    output = tmp_path / 'atoms.csv'
+    with pytest.raises(SystemExit, match="no column 'smiles'"):
+        cli.main(['parse', str(source), '-o', str(output), '--column', 'smiles'])
+    with pytest.raises(SystemExit, match='cannot read'):
+        cli.main(['parse', str(tmp_path / 'missing.csv'), '-o', str(output)])
+    # An error file of a previous run is removed
+    errors = tmp_path / 'atoms.errors.csv'
+    errors.write_text('row,formula,error\n0,Ca(OH,SyntaxError\n')
+    assert cli.main(['parse', str(source), '-o', str(output), '--quiet']) == 0
+    assert not errors.exists()
+    assert pd.read_csv(output)['formula'].tolist() == ['CaO']
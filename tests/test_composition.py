@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from thermo_ml import composition, bonds, mass, oxides
+from thermo_ml.similarity import CompositionIndex
+
+
+def test_composition_matrix():
+    """Test dense composition matrix"""
+    matrix = composition.to_matrix(['CaO·H2O', {'Si': 1.0, 'O': 2.0}])
+    i = composition.ELEMENT_INDEX
+    assert matrix.shape == (2, composition.N_ELEMENTS)
+    np.testing.assert_allclose(matrix.sum(axis=1), 1.0)
+    assert matrix[0, i['O']] == 0.4
+    assert matrix[1, i['Si']] == 1 / 3
+
+
+def test_similarity_index():
+    """Test k-NN index against a brute force search"""
+    table = ['CaO', 'SiO2', 'Ca2SiO4', 'Ca3SiO5', 'Al2O3', 'CaAl2O4', 'H2O']
+    queries = ['Ca2.1SiO4', 'CaO·H2O', 'Al2O3·SiO2']
+    index = CompositionIndex()
+    index.add(table[:4])
+    index.add(table[4:]) # incremental insert
+    distances, indices = index.query(queries, k=3)
+    # Brute force
+    X = composition.to_matrix(table)
+    Q = composition.to_matrix(queries)
+    expected = np.sqrt(((Q[:, None, :] - X[None, :, :])**2).sum(axis=2))
+    np.testing.assert_array_equal(indices, np.argsort(expected, axis=1)[:, :3])
+    np.testing.assert_allclose(distances, np.sort(expected, axis=1)[:, :3], atol=1e-6)
+    assert index.keys[indices[0, 0]] == 'Ca2SiO4'
+
+
+def test_similarity_tree():
+    """Test the KD-tree over element features against the blocked scan"""
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(composition.N_ELEMENTS, 3))
+    elements = ['H', 'C', 'O', 'Na', 'Mg', 'Al', 'Si', 'S', 'Ca', 'Fe']
+    table = [{a: c for a, c in zip(rng.choice(elements, 3, replace=False), rng.random(3))}
+             for _ in range(3000)]
+    queries = table[:5] + ['CaO', 'SiO2', 'Fe2O3', 'NaCl', 'H2O']
+    scan = CompositionIndex(features, tree=False)
+    scan.add(table)
+    tree = CompositionIndex(features, leaf_size=8)
+    assert tree.tree
+    tree.add(table[:2000])
+    tree.add(table[2000:]) # scanned beside the tree until rebuilt
+    for index in [scan, tree]:
+        index.add(['CaO'], keys=['lime'])
+    expected = scan.query(queries, k=4)
+    for _ in range(2): # builds the tree, then uses it
+        distances, indices = tree.query(queries, k=4)
+        np.testing.assert_array_equal(indices, expected[1])
+        np.testing.assert_allclose(distances, expected[0], atol=1e-6)
+    assert tree._n_tree == len(tree) and tree.keys[indices[5, 0]] == 'lime'
+    # New formulas are found before the next rebuild
+    for index in [scan, tree]:
+        index.add(['CaSiO3', 'MgO'])
+    np.testing.assert_array_equal(tree.query(queries, k=4)[1], scan.query(queries, k=4)[1])
+    assert tree._n_tree == len(tree) - 2
+
+
+def test_similarity_unknown_features():
+    """Test that unknown features (NaN) of absent elements are ignored"""
+    i = composition.ELEMENT_INDEX
+    features = np.random.default_rng(0).normal(size=(composition.N_ELEMENTS, 2))
+    features[i['He']] = np.nan # e.g. electronegativity
+    features[i['Ca'], 1] = np.nan
+    for tree in [False, True]:
+        index = CompositionIndex(features, tree=tree)
+        np.testing.assert_allclose(index.vectorize(['SiO2'])[0],
+                                   (features[i['Si']] + 2 * features[i['O']]) / 3)
+        assert np.isnan(index.vectorize(['CaO'])[0, 1])
+        index.add(['SiO2', 'Al2O3', 'MgO'])
+        distances, indices = index.query(['SiO2', 'MgO'], k=2)
+        assert np.isfinite(distances).all() and indices[:, 0].tolist() == [0, 2]
+        with pytest.raises(ValueError):
+            index.add(['HeO'])
+        with pytest.raises(ValueError):
+            index.query(['CaO'])
+
+
+def test_bond_features():
+    """Test bond-weighted electronegativity features"""
+    i = composition.ELEMENT_INDEX
+    electronegativity = np.full(composition.N_ELEMENTS, np.nan)
+    for atom, en in {'H': 2.20, 'O': 3.44, 'Ca': 1.00, 'Si': 1.90}.items():
+        electronegativity[i[atom]] = en
+    features = bonds.bond_features(['CaO', 'SiO2', 'O2', 'CaHe'],
+                                   electronegativity=electronegativity)
+    np.testing.assert_allclose(features['mean_delta_en'][:3], [2.44, 1.54, 0.0])
+    np.testing.assert_allclose(features['max_delta_en'][:3], [2.44, 1.54, 0.0])
+    np.testing.assert_allclose(features['max_ionic_character'][0],
+                               1 - np.exp(-2.44**2 / 4))
+    # He has no electronegativity
+    assert np.isnan(features['mean_ionic_character'][3])
+    delta_en, ionic = bonds.pair_matrices(electronegativity)
+    assert delta_en.shape == ionic.shape == (composition.N_ELEMENTS,) * 2
+
+
+def test_molar_mass():
+    """Test vectorized molar masses and wt%/mol% conversion"""
+    atomic_weights = np.full(composition.N_ELEMENTS, np.nan)
+    for atom, weight in {'H': 1.008, 'O': 15.999, 'Ca': 40.078, 'Si': 28.086}.items():
+        atomic_weights[composition.ELEMENT_INDEX[atom]] = weight
+    formulas = ['CaO', 'SiO2', 'H2O', 'CaO', 'Ca(OH)2', 'He']
+    masses = mass.molar_masses(formulas, atomic_weights)
+    np.testing.assert_allclose(masses[:5], [56.077, 60.084, 18.015, 56.077, 74.092])
+    assert np.isnan(masses[5])
+    # Mass fractions sum to 1 per formula
+    offsets, element_ids, fractions = mass.mass_fractions(formulas[:5], atomic_weights)
+    sums = np.add.reduceat(fractions, offsets[:-1])
+    np.testing.assert_allclose(sums, 1.0)
+    # wt% -> mol% -> wt% round trip
+    wt = np.array([[0.5, 0.3, 0.2], [0.1, 0.1, 0.8]])
+    mol = mass.mass_to_mole_fractions(formulas[:3], wt, atomic_weights)
+    np.testing.assert_allclose(mol[0], np.array([0.5/56.077, 0.3/60.084, 0.2/18.015])
+                               / (0.5/56.077 + 0.3/60.084 + 0.2/18.015))
+    np.testing.assert_allclose(
+        mass.mole_to_mass_fractions(formulas[:3], mol, atomic_weights), wt)
+
+
+def test_oxide_decomposition():
+    """Test batch decomposition into an oxide basis"""
+    formulas = ['2(CaO)·2(SiO2)·2(H2O)', 'Ca9Si6O18(OH)6·8H2O', 'CaCO3']
+    result = oxides.decompose(formulas, ['CaO', 'SiO2', 'H2O'])
+    np.testing.assert_allclose(result['amounts'][:2], [[2, 2, 2], [9, 6, 11]], atol=1e-9)
+    np.testing.assert_allclose(result['fractions'][0], 1 / 3)
+    np.testing.assert_allclose(result['residual_norm'][:2], 0, atol=1e-9)
+    # Carbon is not in the basis, so it's left over
+    assert result['elements'][-1] == 'C'
+    assert result['residuals'][2, -1] == 1.0
+
+
+def test_composition_batch(tmp_path):
+    """Test CSR composition batch operations & serialization"""
+    import pickle
+    formulas = ['CaO', 'SiO2', 'Ca(OH)2', 'H2O', 'Al2O3']
+    batch = composition.CompositionBatch.from_formulas(formulas)
+    assert len(batch) == 5
+    assert batch[2] == {'Ca': 1.0, 'O': 2.0, 'H': 2.0}
+    assert batch.to_dicts() == composition.parse_formulas(formulas)
+    np.testing.assert_array_equal(batch.n_atoms, [2, 3, 5, 3, 5])
+    np.testing.assert_allclose(batch.normalize().to_matrix(),
+                               composition.to_matrix(formulas))
+    # Slices are views, masks & index arrays copies
+    assert batch[1:3].to_dicts() == batch.to_dicts()[1:3]
+    assert np.shares_memory(batch[1:3].counts, batch.counts)
+    assert batch[::-2].to_dicts() == batch.to_dicts()[::-2]
+    assert batch[np.array([True, False, True, False, False])].to_dicts() == [batch[0], batch[2]]
+    # Element filters
+    assert batch.filter_by_element(['Ca']).to_dicts() == [batch[0], batch[2]]
+    np.testing.assert_array_equal(batch.contains(['H', 'O'], how='all'),
+                                  [False, False, True, True, False])
+    np.testing.assert_array_equal(batch.contains(['Ca', 'O'], how='only'),
+                                  [True, False, False, False, False])
+    # Scale & merge
+    assert batch.scale([1, 2, 1, 1, 1])[1] == {'Si': 2.0, 'O': 4.0}
+    hydrates = batch[:2] + ['H2O', 'H2O']
+    assert hydrates[0] == {'H': 2.0, 'O': 2.0, 'Ca': 1.0}
+    assert len(composition.CompositionBatch.concatenate([batch, hydrates])) == 7
+    # Serialization
+    copy = pickle.loads(pickle.dumps(batch))
+    np.testing.assert_array_equal(copy.counts, batch.counts)
+    batch.save(str(tmp_path / 'batch'))
+    loaded = composition.CompositionBatch.load(str(tmp_path / 'batch'))
+    assert isinstance(loaded.counts, np.memmap)
+    assert loaded.to_dicts() == batch.to_dicts()
@@ -0,0 +1,163 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+from thermo_ml import database
+
+
+def _sleep_then(value, seconds):
+    def load():
+        time.sleep(seconds)
+        return value
+    return load
+
+
+def test_async_dataset_loader():
+    """Test concurrent, non-blocking dataset loading with readiness futures"""
+    def fail():
+        raise FileNotFoundError('model.tmla')
+    loader = database.DatasetLoader(
+        datasets={'atoms': _sleep_then('atoms', 0.3), 'constants': _sleep_then('constants', 0.3),
+                  'configs': _sleep_then('configs', 0.05), 'fast': _sleep_then('fast', 0.0)},
+        dependencies={'configs': ('atoms',)})
+    loader.add('model', fail)
+
+    async def main():
+        start = time.perf_counter()
+        loader.start()
+        # Returns at once, the event loop keeps running
+        assert time.perf_counter() - start < 0.1
+        assert await loader.get('fast') == 'fast'
+        assert loader.status()['atoms'] == 'pending'
+        datasets = await loader.wait(['atoms', 'constants', 'configs'])
+        # Independent loads overlap, dependent ones follow
+        assert 0.35 <= time.perf_counter() - start < 0.55
+        with pytest.raises(FileNotFoundError):
+            await loader.get('model')
+        return datasets
+
+    datasets = asyncio.run(main())
+    assert datasets == {'atoms': 'atoms', 'constants': 'constants', 'configs': 'configs'}
+    assert loader.is_ready('configs') and not loader.is_ready('model')
+    assert loader.status()['model'] == 'failed'
+    with pytest.raises(ValueError):
+        database.DatasetLoader(datasets={'a': list}, dependencies={'a': ('b',)})
+
+
+def test_async_dataset_loader_cancelled():
+    """Test that waiters don't hang on a cancelled load"""
+    loader = database.DatasetLoader(
+        datasets={'slow': _sleep_then('slow', 0.2), 'child': _sleep_then('child', 0.0)},
+        dependencies={'child': ('slow',)})
+
+    async def main():
+        loader.start()
+        waiters = [asyncio.ensure_future(loader.get(name)) for name in ['slow', 'child']]
+        await asyncio.sleep(0.01)
+        for task in loader._tasks: # as at loop shutdown
+            task.cancel()
+        for waiter in waiters:
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
+    assert loader.status() == {'slow': 'cancelled', 'child': 'cancelled'}
+    assert not loader.is_ready('slow')
+
+
+def test_compound_store(tmp_path):
+    """Test versioned appends, consumer deltas & compaction"""
+    path = str(tmp_path / 'compounds')
+    store = database.CompoundStore(path)
+    assert store.append([{'formula': 'CaO', 'source': 'lab',
+                          'properties': {'dHf': -635.1}}]) == (1, 1)
+    assert store.append([{'formula': f} for f in ['CaSiO3', 'Ca2SiO4', 'Ca3SiO5']]) == (2, 4)
+    rows, version = store.pending('featurizer')
+    assert rows['formula'].tolist() == ['CaO', 'CaSiO3', 'Ca2SiO4', 'Ca3SiO5']
+    assert rows.loc[0, 'dHf'] == -635.1
+    store.commit('featurizer', version)
+    store.append([{'formula': 'SiO2'}, {'formula': 'H2O'}])
+    # Only the delta, also after reopening the store
+    store = database.CompoundStore(path)
+    rows, version = store.pending('featurizer')
+    assert rows['version'].tolist() == [5, 6] and version == 6
+    assert store.rows_since(6).empty
+    # Compaction keeps rows & versions
+    assert store.compact(min_rows=100) == 2
+    assert len(store.segments) == 1 and len(store) == 6
+    assert store.rows_since(3)['formula'].tolist() == ['Ca3SiO5', 'SiO2', 'H2O']
+    assert [e['action'] for e in store.changelog()] == ['append'] * 3 + ['compact']
+    with pytest.raises(ValueError):
+        store.commit('featurizer', 2)
+    with pytest.raises(ValueError):
+        store.append([{'formula': 'CaO', 'properties': {'version': 1}}])
+    # Background compaction
+    for formula in ['MgO', 'FeO', 'ZnO']:
+        store.append([{'formula': formula}])
+    with store:
+        store.start_compaction(interval=0.01, min_rows=100)
+        deadline = time.time() + 5
+        while len(store.segments) > 1 and time.time() < deadline:
+            time.sleep(0.01)
+    assert len(store.segments) == 1
+    assert store.rows_since(0)['version'].tolist() == list(range(1, 10))
+
+
+def test_compound_store_reader(tmp_path):
+    """Test a reader instance following appends & compactions of a writer"""
+    path = str(tmp_path / 'compounds')
+    writer = database.CompoundStore(path)
+    reader = database.CompoundStore(path)
+    assert reader.version == 0 and reader.rows_since(0).empty
+    writer.append([{'formula': 'CaO'}, {'formula': 'SiO2'}])
+    rows, version = reader.pending('trainer')
+    assert rows['formula'].tolist() == ['CaO', 'SiO2'] and version == 2
+    reader.commit('trainer', version)
+    writer.append([{'formula': 'H2O'}])
+    writer.compact(min_rows=100)
+    assert len(reader.segments) == 1
+    assert reader.pending('trainer')[0]['formula'].tolist() == ['H2O']
+    assert writer.cursor('trainer') == 2
+
+
+def test_compound_store_compaction_error(tmp_path):
+    """Test background compaction surviving & reporting a failure"""
+    store = database.CompoundStore(str(tmp_path / 'compounds'))
+    store.append([{'formula': 'CaO'}])
+    store.append([{'formula': 'SiO2'}])
+    os.remove(os.path.join(store.path, store.segments[0]['file']))
+    store.start_compaction(interval=0.01, min_rows=100)
+    time.sleep(0.1)
+    assert store._compactor.is_alive()
+    with pytest.raises(RuntimeError):
+        store.stop_compaction()
+
+
+def _commit_all(path, consumer, last):
+    store = database.CompoundStore(path)
+    for version in range(1, last + 1):
+        store.commit(consumer, version)
+
+
+def test_compound_store_cursors(tmp_path):
+    """Test cursor commits of concurrent processes & leftover temp files"""
+    path = str(tmp_path / 'compounds')
+    store = database.CompoundStore(path)
+    store.append([{'formula': 'CaO'} for _ in range(20)])
+    consumers = ['parser', 'featurizer', 'model/trainer', 'model trainer']
+    processes = [multiprocessing.Process(target=_commit_all, args=(path, consumer, 20))
+                 for consumer in consumers]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    assert [store.cursor(consumer) for consumer in consumers] == [20] * 4
+    assert store.cursor('other') == 0
+    with pytest.raises(ValueError):
+        store.commit('', 1)
+    leftovers = [name for _, _, names in os.walk(path) for name in names
+                 if name.endswith('.tmp')]
+    assert not leftovers
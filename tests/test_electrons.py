@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from thermo_ml import composition, database, electrons
+
+
+# Electron configurations of a few elements & the cores they need
+CONFIGS = {
+    'He': '1s2', 'Ne': '[He] 2s2 2p6', 'Ar': '[Ne] 3s2 3p6',
+    'Kr': '[Ar] 3d10 4s2 4p6', 'Xe': '[Kr] 4d10 5s2 5p6',
+    'H': '1s1', 'O': '[He] 2s2 2p4', 'Fe': '[Ar] 3d6 4s2',
+    'Zn': '[Ar] 3d10 4s2', 'Pd': '[Kr] 4d10',
+    'Hf': '[Xe] 4f14 5d2 6s2',
+}
+
+
+def _electron_configs():
+    configs = np.full((composition.N_ELEMENTS, len(database.SUBSHELLS)), np.nan)
+    def fill(row, config):
+        for part in config.split():
+            if part.startswith('['):
+                fill(row, CONFIGS[part[1:-1]])
+            else:
+                row[database.SUBSHELLS.index(part[:2])] = int(part[2:])
+    for atom, config in CONFIGS.items():
+        fill(configs[composition.ELEMENT_INDEX[atom]], config)
+    return configs
+
+
+def test_valence_features():
+    """Test valence electrons & holes per element and per formula"""
+    valence, unfilled = electrons.valence_table(_electron_configs())
+    row = lambda atom: composition.ELEMENT_INDEX[atom]
+    # s, p, d, f
+    np.testing.assert_array_equal(valence[row('Fe')], [2, 0, 6, 0])
+    np.testing.assert_array_equal(unfilled[row('Fe')], [0, 0, 4, 0])
+    np.testing.assert_array_equal(valence[row('Pd')], [0, 0, 10, 0])
+    np.testing.assert_array_equal(valence[row('Hf')], [2, 0, 2, 14])
+    np.testing.assert_array_equal(valence[row('Ne')], [2, 6, 0, 0])
+    np.testing.assert_array_equal(unfilled[row('O')], [0, 2, 0, 0])
+    assert np.isnan(valence[row('Ca')]).all()
+    features = electrons.valence_features(['FeO', 'ZnO', 'H2O', 'CaO'],
+                                          _electron_configs())
+    np.testing.assert_allclose(features['mean_d_valence'][:3], [3, 5, 0])
+    np.testing.assert_allclose(features['mean_unfilled'][:3], [3, 1, 4 / 3])
+    assert np.isnan(features['mean_valence'][3])
+
+
+def test_ionization_features():
+    """Test cumulative ionization energies up to given charges"""
+    energies = np.full((composition.N_ELEMENTS, 3), np.nan)
+    energies[composition.ELEMENT_INDEX['Fe']] = [7.9, 16.2, 30.7]
+    energies[composition.ELEMENT_INDEX['O']] = [13.6, 35.1, 54.9]
+    cumulative = electrons.cumulative_ionization_energies(energies)
+    assert cumulative[composition.ELEMENT_INDEX['Fe'], 2] == pytest.approx(24.1)
+    batch = composition.as_batch(['Fe2O3', 'Fe3O4', 'FeO'])
+    # Fe, O entries of each formula
+    charges = np.where(batch.element_ids == composition.ELEMENT_INDEX['O'], -2.0,
+                       [3, 3, 8 / 3, 8 / 3, 2, 2])
+    features = electrons.ionization_features(batch, charges, energies)
+    np.testing.assert_allclose(features['max_cumulative_ie'],
+                               [54.8, 24.1 + 2 / 3 * 30.7, 24.1])
+    np.testing.assert_allclose(features['mean_cumulative_ie'][0], 0.4 * 54.8)
+    assert np.isnan(electrons.ionization_features(['FeO'], 4, energies)['mean_cumulative_ie'][0])
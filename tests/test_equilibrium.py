@@ -0,0 +1,67 @@
+import numpy as np
+from thermo_ml.equilibrium import EquilibriumSolver, GAS_CONSTANT
+
+
+def test_gas_equilibrium():
+    """Test dissociation equilibrium of an ideal gas"""
+    # H2 <-> 2 H with a made-up G(T)
+    solver = EquilibriumSolver(gases=['H2', 'H'],
+                               gibbs={'H2': [0.0], 'H': [220000.0, -50.0]})
+    T = np.array([1000.0, 2500.0, 4000.0])
+    result = solver.solve(T, ['H2'], pressure=2.0)
+    assert result.converged.all()
+    x = result.mole_fractions()[:, 0]
+    # K = x_H^2 P / x_H2
+    lnK = -(2 * (220000.0 - 50.0 * T)) / (GAS_CONSTANT * T)
+    assert np.allclose(np.log(x[:, 1]**2 * 2.0 / x[:, 0]), lnK, atol=1e-5)
+    # 1 mole of atoms in every point
+    assert np.allclose(result.amounts[:, 0] @ [2, 1], 1.0)
+
+def test_condensed_equilibrium():
+    """Test gas + graphite equilibrium, from scratch & warm started"""
+    solver = EquilibriumSolver(
+        gases=['O2', 'CO', 'CO2'], condensed={'C(s)': 'C'},
+        gibbs={'O2': [0.0], 'CO': [-111000.0, -89.0],
+               'CO2': [-394000.0, -1.0], 'C(s)': [0.0]})
+    T = np.linspace(600, 2000, 15)
+    compositions = ['CO2', 'C3O', {'C': 1, 'O': 1}, 'C']
+    for warm_start in [False, True]:
+        result = solver.solve(T, compositions, warm_start=warm_start, warm_stride=4)
+        assert result.converged.all()
+        # Mass balance
+        b = np.array([[1/3, 2/3], [3/4, 1/4], [1/2, 1/2], [1, 0]])
+        balance = np.einsum('es,tcs->tce', solver.matrix, result.amounts)
+        assert np.allclose(balance, b[None], atol=1e-6)
+        # Pure carbon is all graphite, excess carbon leaves some graphite
+        stable = result.stable(1e-6)
+        assert stable[:, 3, 3].all() and stable[:, 1, 3].all()
+        # Boudouard equilibrium C + CO2 <-> 2 CO where graphite is stable
+        G = solver.species_gibbs(T)
+        lnK = -(2 * G[:, 1] - G[:, 2] - G[:, 3]) / (GAS_CONSTANT * T)
+        x = result.mole_fractions()[:, 1]
+        assert np.allclose(np.log(x[:, 1]**2 / x[:, 2]), lnK, atol=1e-4)
+
+def test_warm_start(monkeypatch):
+    """Test warm started grids matching the ones solved from scratch"""
+    solver = EquilibriumSolver(
+        gases=['H2', 'O2', 'H2O', 'CO', 'CO2', 'CH4'], condensed={'C(s)': 'C'},
+        gibbs={'H2': [0.0], 'O2': [0.0], 'C(s)': [0.0], 'H2O': [-242000.0, 45.0],
+               'CO': [-111000.0, -89.0], 'CO2': [-394000.0, -1.0],
+               'CH4': [-90000.0, 110.0]})
+    T = np.linspace(500, 2500, 41)
+    # Graphite vanishes within the grid for CHO, no species holds Fe
+    compositions = ['CH4', 'C2H2O', 'CO2', 'H2O', 'CHO', 'FeO']
+    cold = solver.solve(T, compositions, warm_start=False)
+    refine, solved = solver._refine, []
+    def counted_refine(*args, **kwargs):
+        result = refine(*args, **kwargs)
+        solved.append(result[2].copy())
+        return result
+    monkeypatch.setattr(solver, '_refine', counted_refine)
+    warm = solver.solve(T, compositions, warm_stride=8)
+    assert np.array_equal(warm.converged, cold.converged)
+    assert not warm.converged[:, 5].any()
+    assert np.allclose(warm.gibbs, cold.gibbs, rtol=1e-9, atol=1e-3, equal_nan=True)
+    assert np.allclose(warm.amounts, cold.amounts, atol=1e-6, equal_nan=True)
+    # Most points need no barrier method, but not those across a phase boundary
+    assert 0.8 < solved[0].mean() < 1
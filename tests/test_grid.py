@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+from thermo_ml.grid import GridSweep
+
+
+def _inside_circle(points, center):
+    return (np.linalg.norm(points - center, axis=1) < 0.5).astype(np.int8)
+
+
+def _outside_circle(points, center):
+    return 1 - _inside_circle(points, center)
+
+
+def test_grid_sweep(tmp_path):
+    """Test parallel sweep with shared tables & checkpoint/resume"""
+    axes = [np.linspace(-1, 1, 21), np.linspace(-1, 1, 11)]
+    tables = {'center': np.array([0.1, 0.0])}
+    serial = GridSweep(_inside_circle, tables, n_jobs=1).run(axes)
+    assert serial.shape == (21, 11)
+    sweep = GridSweep(_inside_circle, tables, n_jobs=2, tile_size=40,
+                      checkpoint_dir=str(tmp_path))
+    assert (sweep.run(axes) == serial).all()
+    # Finished tiles are loaded instead of computed again
+    tile = tmp_path / 'grid' / 'tile_000000.npy'
+    np.save(tile, np.full(40, 7, dtype=np.int8))
+    resumed = sweep.run(axes)
+    assert (resumed.ravel()[:40] == 7).all()
+    assert (resumed.ravel()[40:] == serial.ravel()[40:]).all()
+    os.remove(tile)
+    assert (sweep.run(axes) == serial).all()
+    with pytest.raises(ValueError):
+        sweep.run([np.linspace(0, 1, 5)] * 2)
+    # Other tables or function: stale tiles are rejected
+    for function, other in [(_inside_circle, {'center': np.array([0.2, 0.0])}),
+                            (_outside_circle, tables)]:
+        with pytest.raises(ValueError):
+            GridSweep(function, other, n_jobs=1, tile_size=40,
+                      checkpoint_dir=str(tmp_path)).run(axes)
+
+
+def test_grid_refinement():
+    """Test that refinement adds points only along the boundary"""
+    axes = [np.linspace(-1, 1, 21)] * 2
+    sweep = GridSweep(_inside_circle, {'center': np.zeros(2)}, n_jobs=1)
+    values = sweep.run(axes)
+    points, new_values = sweep.refine(axes, values, levels=4)
+    assert len(points) == len(new_values) > 0
+    # Spacing 0.1 bisected 4 times
+    distance = np.abs(np.linalg.norm(points, axis=1) - 0.5)
+    assert distance.max() < 0.1
+    assert (new_values == _inside_circle(points, np.zeros(2))).all()
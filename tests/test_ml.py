@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+from thermo_ml import ml
+
+
+def test_artifact(tmp_path):
+    """Test model artifact round trip"""
+    arrays = {
+        'coef': np.arange(12, dtype=np.float64).reshape(3, 4),
+        'classes': np.array([1, 6, 20], dtype=np.uint8),
+        'empty': np.zeros((0, 2), dtype=np.float32),
+    }
+    artifact = ml.Artifact(model_type='Test', arrays=arrays,
+                           feature_spec={'properties': ['Electronegativity']},
+                           element_table_hash='abc')
+    path = tmp_path / 'model.tmla'
+    artifact.save(path)
+    # Both memory mapped and in-memory loads give back the same arrays
+    for mmap_mode in [True, False]:
+        loaded = ml.load_artifact(path, mmap_mode=mmap_mode)
+        assert loaded.model_type == 'Test'
+        assert loaded.feature_spec == {'properties': ['Electronegativity']}
+        for name, arr in arrays.items():
+            assert loaded[name].dtype == arr.dtype
+            np.testing.assert_array_equal(loaded[name], arr)
+    # Memory mapped arrays are read-only views
+    assert not ml.load_artifact(path)['coef'].flags.writeable
+    # Mismatching element table is refused
+    with pytest.raises(ValueError):
+        ml.load_artifact(path, element_table_hash='xyz')
+
+
+def test_bootstrap_ensemble(tmp_path):
+    """Test bootstrap ensemble predictions, uncertainty & artifact round trip"""
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((400, 3)) + [10.0, 0.0, -5.0]
+    y = X @ [2.0, -1.0, 0.5] + 3.0 + 0.1 * rng.standard_normal(400)
+    model = ml.BootstrapEnsemble(n_members=32, alpha=1e-6, n_jobs=4, seed=1).fit(X, y)
+    prediction = model.predict(X[:5])
+    np.testing.assert_allclose(prediction['mean'], X[:5] @ [2.0, -1.0, 0.5] + 3.0, atol=0.1)
+    assert (prediction['std'] > 0).all() and (prediction['std'] < 0.05).all()
+    assert prediction['quantiles'].shape == (5, 3)
+    # Extrapolation is less certain
+    assert model.predict(X[:1] * 10)['std'][0] > prediction['std'].max()
+    # Members don't depend on the number of threads
+    serial = ml.BootstrapEnsemble(n_members=32, alpha=1e-6, n_jobs=1, seed=1).fit(X, y)
+    np.testing.assert_allclose(serial.coef, model.coef)
+    # Artifact round trip
+    model.to_artifact().save(tmp_path / 'ensemble.tmla')
+    loaded = ml.BootstrapEnsemble.from_artifact(ml.load_artifact(tmp_path / 'ensemble.tmla'))
+    np.testing.assert_allclose(loaded.predict_members(X[:5]), model.predict_members(X[:5]))
+    with pytest.raises(ValueError):
+        ml.BootstrapEnsemble.from_artifact(ml.Artifact('Test', {}))
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from thermo_ml import composition
+from thermo_ml.oxidation import OxidationStateAssigner
+
+
+# Ionization energies (eV) of a few elements
+IONIZATION_ENERGIES = {
+    'H': [13.60], 'C': [11.26, 24.38, 47.89, 64.49],
+    'N': [14.53, 29.60, 47.45, 77.47, 97.89], 'Na': [5.14, 47.29],
+    'Ca': [6.11, 11.87, 50.91], 'Fe': [7.90, 16.20, 30.65, 54.80],
+    'S': [10.36, 23.34, 34.79, 47.22, 72.59, 88.05],
+    'Si': [8.15, 16.35, 33.49, 45.14], 'Al': [5.99, 18.83, 28.45],
+}
+
+
+@pytest.fixture
+def assigner():
+    ionization_energies = np.full((composition.N_ELEMENTS, 6), np.nan)
+    for atom, energies in IONIZATION_ENERGIES.items():
+        ionization_energies[composition.ELEMENT_INDEX[atom], :len(energies)] = energies
+    return OxidationStateAssigner(ionization_energies=ionization_energies)
+
+
+def test_oxidation_states(assigner):
+    """Test charge-balanced oxidation states, incl. mixed valence"""
+    results = assigner.assign(['Fe2O3', 'Fe3O4', 'CaSO4', 'Na2S2O3', 'CH4',
+                               'CaH2', 'NaNO3', 'Ca6.4(H0.6Si2O7)2(OH)2', 'Fe', 'FeAl'])
+    assert results[0] == {'Fe': 3.0, 'O': -2.0}
+    assert results[1]['Fe'] == pytest.approx(8 / 3)
+    assert results[2] == {'Ca': 2.0, 'O': -2.0, 'S': 6.0}
+    assert results[3]['S'] == 2.0
+    assert results[4] == {'C': -4.0, 'H': 1.0}
+    assert results[5] == {'Ca': 2.0, 'H': -1.0}
+    assert results[6]['N'] == 5.0
+    assert results[7] == {'Ca': 2.0, 'H': 1.0, 'O': -2.0, 'Si': 4.0}
+    assert results[8] == {'Fe': 0.0}
+    assert results[9] is None # no states balance an alloy
+    # Memoized by reduced composition
+    assert assigner.assign(['Fe6O8'])[0] is results[1]
+
+
+def test_oxidation_cache(assigner, monkeypatch):
+    """Test unknown elements, read-only results & the bounded memo"""
+    from thermo_ml import oxidation
+    monkeypatch.setattr(oxidation, 'CACHE_SIZE', 2)
+    results = assigner.assign(['Xx2O', 'CaO', 'Xx'])
+    assert results[0] is None and results[2] is None
+    with pytest.raises(ValueError):
+        assigner.state_costs('Xx')
+    with pytest.raises(TypeError):
+        results[1]['Ca'] = 3.0
+    assert assigner.assign(['CaO'])[0] == {'Ca': 2.0, 'O': -2.0}
+    assigner.assign(['Fe2O3', 'SiO2'])
+    assert len(assigner.cache) == 2 and len(assigner._element_options) <= 2
@@ -0,0 +1,28 @@
+import json
+
+from thermo_ml import composition, parse, profiling
+
+
+def test_profiling():
+    """Test metrics are recorded only while profiling is on"""
+    profiling.reset()
+    profiling.disable()
+    parse.atoms('CaO')
+    assert profiling.snapshot() == {'counters': {}, 'histograms': {}}
+    with profiling.profile():
+        composition.parse_formulas(['Ca(OH)2', 'Ca(OH)2', 'SiO2'])
+        with profiling.timer('block_seconds'):
+            pass
+    assert not profiling.ENABLED
+    metrics = profiling.snapshot()
+    assert metrics['counters']['composition.formulas'] == 3
+    assert metrics['counters']['composition.unique_formulas'] == 2
+    assert metrics['counters']['parse.tokens'] > 0
+    timings = metrics['histograms']['parse.atoms_seconds']
+    assert timings['count'] == 2
+    assert timings['buckets']['+Inf'] == 2
+    assert json.loads(profiling.to_json()) == metrics
+    text = profiling.to_prometheus()
+    assert 'thermo_ml_composition_formulas_total 3' in text
+    assert 'thermo_ml_parse_atoms_seconds_bucket{le="+Inf"} 2' in text
+    assert 'thermo_ml_block_seconds_count 1' in text
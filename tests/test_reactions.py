@@ -0,0 +1,47 @@
+import pytest
+from thermo_ml import reactions
+
+
+def test_balance():
+    """Test batch reaction balancing"""
+    results = reactions.balance([
+        (['CH4', 'O2'], ['CO2', 'H2O']),
+        (['O2', 'CH4'], ['H2O', 'CO2']), # same reaction, cached
+        (['H2'], ['H2O']),               # missing oxygen
+        (['C', 'O2'], ['CO', 'CO2']),    # not unique
+        (['Ca(OH'], ['CaO']),            # syntax error
+    ])
+    assert results[0].reactants == {'CH4': 1.0, 'O2': 2.0}
+    assert results[0].products == {'CO2': 1.0, 'H2O': 2.0}
+    assert results[1] is results[0]
+    assert [r.ok for r in results] == [True, True, False, False, False]
+
+
+def test_formation_reactions():
+    """Test formation reactions from elements and from oxides"""
+    from_elements = reactions.formation_reactions(['H2O', 'Fe3O4'])
+    assert from_elements[0].reactants == {'H2': 1.0, 'O2': 0.5}
+    assert from_elements[1].reactants == {'Fe': 3.0, 'O2': 2.0}
+    from_oxides = reactions.formation_reactions(
+        ['Ca2SiO4', 'CaCO3', 'Al2O3'], reference=['CaO', 'SiO2', 'CO2'])
+    assert from_oxides[0].reactants == {'CaO': 2.0, 'SiO2': 1.0}
+    assert str(from_oxides[1]) == 'CO2 + CaO -> CaCO3'
+    assert not from_oxides[2].ok
+
+
+def test_reaction_cache(monkeypatch):
+    """Test that cached reactions are bounded and read-only"""
+    reactions.clear_cache()
+    monkeypatch.setattr(reactions, 'CACHE_SIZE', 2)
+    water, = reactions.balance([(['H2', 'O2'], ['H2O'])])
+    with pytest.raises(TypeError):
+        water.reactants['H2'] = 3.0
+    with pytest.raises(AttributeError):
+        water.products = {}
+    reactions.balance([(['C', 'O2'], ['CO2'])])
+    assert reactions.balance([(['H2', 'O2'], ['H2O'])])[0] is water # recently used
+    reactions.balance([(['Ca', 'O2'], ['CaO'])])
+    assert len(reactions._CACHE) == 2
+    assert reactions.balance([(['H2', 'O2'], ['H2O'])])[0] is water
+    assert (('C', 'O2'), ('CO2',)) not in reactions._CACHE
+    reactions.clear_cache()
@@ -0,0 +1,47 @@
+from thermo_ml import composition, search
+from thermo_ml.search import SearchIndex
+
+
+NAMES = ['portlandite', 'calcite', 'calcium oxide', 'quartz', 'tricalcium silicate',
+         'calcium silicate hydrate', 'hematite', 'magnetite']
+FORMULAS = ['Ca(OH)2', 'CaCO3', 'CaO', 'SiO2', 'Ca3SiO5', None, 'Fe2O3', 'Fe3O4']
+
+
+def test_hill_formula():
+    """Test canonical formulas in Hill order"""
+    assert composition.hill_formula({'O': 2, 'H': 2, 'Ca': 1}) == 'CaH2O2'
+    assert composition.hill_formula({'O': 1, 'H': 4, 'C': 1}) == 'CH4O'
+    assert composition.hill_formula({'Si': 1, 'O': 2.5}) == 'O2.5Si'
+
+
+def test_search_index(tmp_path):
+    """Test exact, prefix, canonical formula & fuzzy search, and persistence"""
+    index = SearchIndex(NAMES, FORMULAS)
+    names = lambda results: [r['name'] for r in results]
+    # Exact before prefix matches, shorter keys first
+    assert names(index.search('calc', limit=3)) == ['calcite', 'calcium oxide',
+                                                    'calcium silicate hydrate']
+    assert index.search('CaO')[0]['name'] == 'calcium oxide'
+    assert index.search('CaO')[0]['score'] == 3.0
+    # Partial & differently written formulas
+    assert set(names(index.search('Fe', limit=2))) == {'hematite', 'magnetite'}
+    assert names(index.search('CaH2O2', limit=1)) == ['portlandite']
+    # Typos & words in any order
+    assert names(index.search('calcium silcate', limit=2)) == ['calcium silicate hydrate',
+                                                               'tricalcium silicate']
+    assert names(index.search('silicate calcium', limit=1)) == ['calcium silicate hydrate']
+    assert index.search('xyz') == []
+    # Memory mapped copy gives the same results
+    index.save(str(tmp_path / 'index'))
+    loaded = SearchIndex.load(str(tmp_path / 'index'))
+    for query in ['calc', 'CaH2O2', 'silicate calcium']:
+        assert loaded.search(query) == index.search(query)
+    # Elements by name or symbol
+    elements = SearchIndex.from_elements(['hydrogen', 'helium'] + [''] * 116)
+    assert elements.search('H')[0] == {'id': 0, 'name': 'hydrogen', 'formula': 'H', 'score': 3.0}
+    assert elements.search('heli')[0]['formula'] == 'He'
+    # Trigrams of very long names are bounded
+    index = SearchIndex(NAMES + ['calcium ' * 50_000], FORMULAS + ['CaSi2'])
+    assert index._n_trigrams.max() < 2 * search.MAX_TRIGRAM_CHARS
+    assert index.search('CaSi2')[0]['id'] == len(NAMES)
+    assert index.search('Si2Ca')[0]['id'] == len(NAMES)
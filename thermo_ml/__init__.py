@@ -1,6 +1,18 @@
 from thermo_ml import (
+    profiling,
     parse,
-    database
+    database,
+    ml,
+    composition,
+    similarity,
+    bonds,
+    mass,
+    oxides,
+    reactions,
+    equilibrium,
+    grid,
+    electrons,
+    oxidation,
+    search,
+    arrow
 )
-
-
@@ -0,0 +1,297 @@
+import numpy as np
+import pandas as pd
+from thermo_ml import composition, database
+
+
+### Apache Arrow interchange (needs the optional pyarrow package)
+#   Composition batches map onto large_list<struct<element, count>>,
+#   with elements dictionary encoded by their symbols; feature
+#   matrices onto fixed_size_list<float64>. Numeric buffers are
+#   handed over without copies whenever the layouts agree.
+COMPOSITION_COLUMN = 'composition'
+FEATURES_COLUMN = 'features'
+IPC_EXTENSIONS = ('.arrow', '.ipc', '.feather')
+
+
+def atoms_to_arrow(atoms=None, properties=None):
+    """Atomic properties table as an Arrow table
+
+    Args:
+        atoms (str|int|list, optional): See "database.get_atoms".
+            Defaults to None, meaning all atoms.
+        properties (str|int|list, optional): See
+            "database.get_atoms". Defaults to None.
+
+    Returns:
+        pyarrow.Table: One row per atom
+    """
+    return dataframe_to_arrow(database.get_atoms(atoms, properties))
+
+def dataframe_to_arrow(df:pd.DataFrame):
+    """DataFrame as an Arrow table (e.g. output of "database.get_atoms")
+
+    Numeric columns without missing values are shared, not
+    copied; text columns are converted.
+    """
+    pa = _pyarrow()
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def arrow_to_dataframe(table) -> pd.DataFrame:
+    """Arrow table as a DataFrame"""
+    return table.to_pandas()
+
+def batch_to_arrow(formulas, layout:str='list', names:list=None):
+    """Compositions as an Arrow table
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas or dictionaries of atom counts.
+        layout (str, optional): 'list' for one column of
+            large_list<struct<element: dictionary<uint8, string>,
+            count: float64>>, sharing the batch's offsets, element
+            ids and counts; 'columns' for one float64 column per
+            element present, null where absent. Defaults to 'list'.
+        names (list of str, optional): Adds a 'formula' column,
+            e.g. the input formulas. Defaults to None.
+
+    Raises:
+        ValueError: Unknown layout
+
+    Returns:
+        pyarrow.Table: One row per composition
+    """
+    pa = _pyarrow()
+    batch = composition.as_batch(formulas)
+    columns = {}
+    if names is not None:
+        columns['formula'] = pa.array(list(names), type=pa.string())
+    if layout == 'list':
+        columns[COMPOSITION_COLUMN] = _composition_array(batch)
+    elif layout == 'columns':
+        present = np.flatnonzero(np.bincount(batch.element_ids,
+                                             minlength=composition.N_ELEMENTS))
+        matrix = batch.to_matrix()
+        for z in present:
+            column = np.ascontiguousarray(matrix[:, z])
+            absent = np.ones(len(batch), dtype=bool)
+            absent[batch.row_ids[batch.element_ids == z]] = False
+            columns[composition.ELEMENTS[z]] = pa.array(column, mask=absent)
+    else:
+        raise ValueError(f"Unknown layout '{layout}', expected 'list' or 'columns'")
+    return pa.table(columns)
+
+def batch_from_arrow(data, column:str=COMPOSITION_COLUMN) -> composition.CompositionBatch:
+    """Compositions written by "batch_to_arrow" (either layout)
+
+    Args:
+        data (pyarrow.Table|Array|ChunkedArray): Table, or the
+            list<struct<element, count>> column itself.
+        column (str, optional): Column of a 'list' layout table.
+            Without it, element-named columns are read as the
+            'columns' layout. Defaults to COMPOSITION_COLUMN.
+
+    Raises:
+        ValueError: Unknown element
+
+    Returns:
+        CompositionBatch: Counts, and element ids when the
+            dictionary is "composition.ELEMENTS" (as written by
+            "batch_to_arrow"), are views of the Arrow buffers if the
+            column has one chunk; several chunks are concatenated
+            into one copy
+    """
+    pa = _pyarrow()
+    if isinstance(data, pa.Table):
+        if column not in data.column_names:
+            return _batch_from_columns(data)
+        data = data.column(column)
+    data = _single_chunk(data)
+    offsets = data.offsets.to_numpy(zero_copy_only=True).astype(np.int64, copy=False)
+    values = data.values.slice(offsets[0], offsets[-1] - offsets[0])
+    # flatten, unlike field, applies the slice to the children
+    fields = dict(zip([f.name for f in values.type], values.flatten()))
+    elements = fields['element']
+    if pa.types.is_dictionary(elements.type):
+        symbols = elements.dictionary.to_pylist()
+        element_ids = elements.indices.to_numpy(zero_copy_only=True)
+        if tuple(symbols) != composition.ELEMENTS[:len(symbols)]:
+            # Dictionary codes -> element ids
+            element_ids = _element_ids(symbols)[element_ids]
+    elif pa.types.is_string(elements.type) or pa.types.is_large_string(elements.type):
+        element_ids = _element_ids(elements.to_pylist())
+    else:
+        element_ids = elements.to_numpy(zero_copy_only=True)
+    counts = fields['count'].to_numpy(zero_copy_only=True)
+    return composition.CompositionBatch(offsets - offsets[0], element_ids, counts)
+
+def features_to_arrow(features, names:list=None):
+    """Feature matrix or dict of features as an Arrow table
+
+    Args:
+        features (np.ndarray|dict): Matrix of shape (n_samples,
+            n_features), stored in one fixed_size_list<float64>
+            column (shared with the matrix if C-contiguous float64),
+            or key=feature name, value=array of length n_samples
+            (e.g. output of "bonds.bond_features"), one column each.
+        names (list of str, optional): Feature names of a matrix,
+            kept in the schema metadata. Defaults to None.
+
+    Returns:
+        pyarrow.Table: One row per sample
+    """
+    pa = _pyarrow()
+    if isinstance(features, dict):
+        return pa.table({name: pa.array(np.asarray(values))
+                         for name, values in features.items()})
+    matrix = np.ascontiguousarray(features, dtype=np.float64)
+    if matrix.ndim != 2:
+        raise ValueError(f'Expected a matrix of shape (n_samples, n_features), '
+                         f'instead got shape {matrix.shape}')
+    column = pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), matrix.shape[1])
+    metadata = {'feature_names': ','.join(names)} if names is not None else None
+    return pa.table({FEATURES_COLUMN: column}, metadata=metadata)
+
+def features_from_arrow(data, column:str=FEATURES_COLUMN) -> np.ndarray:
+    """Feature matrix written by "features_to_arrow"
+
+    Args:
+        data (pyarrow.Table|Array|ChunkedArray): Table, or the
+            fixed_size_list column itself. A table without the
+            column is read as one feature per column.
+        column (str, optional): Column of the matrix.
+            Defaults to FEATURES_COLUMN.
+
+    Returns:
+        np.ndarray: Shape (n_samples, n_features), a read-only
+            view of the Arrow buffer if the column has one chunk;
+            several chunks (e.g. an IPC file written chunk by
+            chunk) are concatenated into one copy
+    """
+    pa = _pyarrow()
+    if isinstance(data, pa.Table):
+        if column not in data.column_names:
+            return np.column_stack([c.to_numpy() for c in data.columns])
+        data = data.column(column)
+    chunks = data.chunks if isinstance(data, pa.ChunkedArray) else [data]
+    width = data.type.list_size
+    matrices = [c.flatten().to_numpy(zero_copy_only=True).reshape(-1, width)
+                for c in chunks]
+    if len(matrices) == 1:
+        return matrices[0]
+    return np.concatenate(matrices) if matrices else np.empty((0, width))
+
+def read_ipc(path:str):
+    """Read an Arrow IPC file or stream, memory mapped
+
+    Returns:
+        pyarrow.Table: Columns are views of the mapped file
+    """
+    pa = _pyarrow()
+    source = pa.memory_map(path, 'r')
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid: # not the file format, try the stream format
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+
+class IPCWriter:
+    def __init__(self, sink, stream:bool=False):
+        """Write tables chunk by chunk to an Arrow IPC file or stream
+
+        e.g.
+            with arrow.IPCWriter('features.arrow') as writer:
+                for chunk in chunks:
+                    writer.write(arrow.features_to_arrow(featurize(chunk)))
+
+        The schema is taken from the first chunk; later chunks are
+        cast to it. Each chunk becomes one or more record batches,
+        so readers can process the output chunk by chunk.
+
+        Args:
+            sink (str|file-like): Path or writable binary file
+                (e.g. sys.stdout.buffer).
+            stream (bool, optional): Stream format (no footer, can
+                be read while written) instead of the file format
+                (random access). Defaults to False.
+
+        Raises:
+            ImportError: pyarrow isn't installed
+        """
+        self._pa = _pyarrow()
+        self.sink = sink
+        self.stream = stream
+        self._writer = None
+        self._schema = None
+
+    def write(self, table):
+        """Append a pyarrow.Table, pyarrow.RecordBatch or DataFrame"""
+        if isinstance(table, pd.DataFrame):
+            table = dataframe_to_arrow(table)
+        if self._writer is None:
+            new = self._pa.ipc.new_stream if self.stream else self._pa.ipc.new_file
+            self._schema = table.schema
+            self._writer = new(self.sink, self._schema)
+        if isinstance(table, self._pa.RecordBatch):
+            self._writer.write_batch(table)
+        else:
+            self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError('Arrow interchange requires pyarrow '
+                          '(pip install pyarrow).') from None
+    return pyarrow
+
+def _single_chunk(data):
+    """Array of a ChunkedArray, its only chunk as is, or else a copy of all"""
+    pa = _pyarrow()
+    if not isinstance(data, pa.ChunkedArray):
+        return data
+    if data.num_chunks == 1:
+        return data.chunk(0)
+    # combine_chunks copies even a single chunk, so only used for several
+    return data.combine_chunks()
+
+def _composition_array(batch:composition.CompositionBatch):
+    """large_list<struct<element, count>> sharing the batch's arrays"""
+    pa = _pyarrow()
+    elements = pa.DictionaryArray.from_arrays(
+        pa.array(np.ascontiguousarray(batch.element_ids), type=pa.uint8()),
+        pa.array(composition.ELEMENTS, type=pa.string()))
+    counts = pa.array(np.ascontiguousarray(batch.counts), type=pa.float64())
+    values = pa.StructArray.from_arrays([elements, counts], names=['element', 'count'])
+    offsets = pa.array(np.ascontiguousarray(batch.offsets), type=pa.int64())
+    return pa.LargeListArray.from_arrays(offsets, values)
+
+def _element_ids(symbols:list) -> np.ndarray:
+    """uint8 column in "composition.ELEMENTS" of every symbol"""
+    try:
+        return np.array([composition.ELEMENT_INDEX[s] for s in symbols], dtype=np.uint8)
+    except KeyError as err:
+        raise ValueError(f"Atom '{err.args[0]}' doesn't exist.") from None
+
+def _batch_from_columns(table) -> composition.CompositionBatch:
+    """Batch of a 'columns' layout table (one column per element)"""
+    matrix = np.zeros((table.num_rows, composition.N_ELEMENTS))
+    for name in table.column_names:
+        if name in composition.ELEMENT_INDEX:
+            values = table.column(name).to_numpy(zero_copy_only=False)
+            matrix[:, composition.ELEMENT_INDEX[name]] = np.nan_to_num(values)
+    return composition.CompositionBatch.from_matrix(matrix)
@@ -0,0 +1,107 @@
+import functools
+
+import numpy as np
+from thermo_ml import composition, database
+
+
+def ionic_character(delta_en):
+    """Pauling's fraction of ionic character of a bond
+
+    ionic character = 1 - exp(-(delta EN)^2 / 4)
+
+    Args:
+        delta_en (float|np.ndarray): Electronegativity
+            difference(s) between the bonded atoms.
+
+    Returns:
+        float|np.ndarray: Fraction between 0 and 1
+    """
+    return 1.0 - np.exp(-np.square(delta_en) / 4.0)
+
+def pair_matrices(electronegativity:np.ndarray=None):
+    """Electronegativity difference & ionic character of all element pairs
+
+    Args:
+        electronegativity (np.ndarray, optional):
+            Array of length N_ELEMENTS in the order of
+            "composition.ELEMENTS". Defaults to the
+            'Electronegativity' column of "database.Atoms",
+            in which case the matrices are computed once
+            and cached.
+
+    Returns:
+        np.ndarray: |EN_i - EN_j| of shape (N_ELEMENTS, N_ELEMENTS)
+        np.ndarray: Ionic character, same shape.
+            Both NaN where an electronegativity is unknown.
+    """
+    if electronegativity is None:
+        return _default_pair_matrices()
+    return _pair_matrices(np.asarray(electronegativity, dtype=np.float64))
+
+@functools.lru_cache(maxsize=None)
+def _default_pair_matrices():
+    delta_en, ionic = _pair_matrices(
+        database.get_property_array('Electronegativity'))
+    # Cached arrays are shared by all callers
+    delta_en.flags.writeable = False
+    ionic.flags.writeable = False
+    return delta_en, ionic
+
+def _pair_matrices(electronegativity:np.ndarray):
+    if electronegativity.shape != (composition.N_ELEMENTS,):
+        raise ValueError(f'Expected electronegativity of length {composition.N_ELEMENTS}, '
+                         f'instead got shape {electronegativity.shape}')
+    delta_en = np.abs(electronegativity[:, None] - electronegativity[None, :])
+    return delta_en, ionic_character(delta_en)
+
+def bond_features(formulas, electronegativity:np.ndarray=None) -> dict:
+    """Bond-weighted electronegativity features of many formulas at once
+
+    Every pair of different elements i, j in a formula is
+    weighted by x_i * x_j, where x are atomic fractions.
+    Formulas with a single element have no such bonds
+    and get 0. Formulas containing an element of unknown
+    electronegativity get NaN.
+
+    Args:
+        formulas (iterable of str|dict): Chemical formulas
+            (e.g. ['CaO', 'SiO2']) or dictionaries of atom counts.
+        electronegativity (np.ndarray, optional): See
+            "pair_matrices". Defaults to None.
+
+    Returns:
+        dict: key=feature name, value=np.ndarray of length n_formulas
+            'mean_delta_en': weighted mean electronegativity difference
+            'max_delta_en': largest electronegativity difference
+            'mean_ionic_character': weighted mean ionic character
+            'max_ionic_character': largest ionic character
+    """
+    delta_en, ionic = pair_matrices(electronegativity)
+    X = composition.to_matrix(formulas)
+    ### Rows with an element of unknown electronegativity
+    unknown = np.isnan(np.diagonal(delta_en))
+    missing = X[:, unknown].sum(axis=1) > 0
+    ### Weighted means: sum_ij x_i x_j M_ij / sum_(i!=j) x_i x_j
+    #   (the diagonal of both matrices is 0)
+    pair_weight = 1.0 - np.einsum('ij,ij->i', X, X)
+    has_bonds = pair_weight > 1e-12
+    features = {}
+    for name, matrix in [('delta_en', delta_en), ('ionic_character', ionic)]:
+        weighted = np.einsum('ij,ij->i', X @ np.nan_to_num(matrix), X)
+        features[f'mean_{name}'] = np.divide(
+            weighted, pair_weight, out=np.zeros(len(X)), where=has_bonds)
+    ### Largest difference is between the most & least electronegative atoms
+    en = np.nan_to_num(_electronegativity(electronegativity))
+    present = X > 0
+    en_max = np.where(present, en, -np.inf).max(axis=1)
+    en_min = np.where(present, en, np.inf).min(axis=1)
+    features['max_delta_en'] = np.where(has_bonds, en_max - en_min, 0.0)
+    features['max_ionic_character'] = ionic_character(features['max_delta_en'])
+    for value in features.values():
+        value[missing] = np.nan
+    return features
+
+def _electronegativity(electronegativity:np.ndarray=None) -> np.ndarray:
+    if electronegativity is None:
+        return database.get_property_array('Electronegativity')
+    return np.asarray(electronegativity, dtype=np.float64)
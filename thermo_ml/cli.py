@@ -0,0 +1,274 @@
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from thermo_ml import arrow, bonds, composition, mass, parse
+
+
+### Sub-commands
+#   key = command, value = help text
+COMMANDS = {
+    'parse': 'Atom counts of every formula, one column per element',
+    'featurize': 'Molar mass & bond features of every formula',
+    'molar-mass': 'Molar mass (g/mol) of every formula',
+}
+# Output formats by file extension
+CSV_EXTENSIONS = ('.csv', '.txt')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def main(argv=None) -> int:
+    """Command line batch processor
+
+    e.g.
+        python -m thermo_ml parse formulas.csv -o atoms.parquet --jobs 8
+        python -m thermo_ml featurize formulas.csv -o features.arrow
+
+    Reads the input in chunks of "--chunk-size" rows, processes
+    chunks on "--jobs" processes and writes results in input order.
+    Rows that fail (e.g. syntax errors) are written to an error
+    file instead of stopping the job; output & error files of a
+    previous run are replaced. Throughput is reported on stderr.
+
+    Args:
+        argv (list of str, optional): Command line arguments.
+            Defaults to None, meaning sys.argv[1:].
+
+    Returns:
+        int: Exit status
+    """
+    args = _parser().parse_args(argv)
+    start = time.perf_counter()
+    elements = _elements(args.elements)
+    chunks = _read_chunks(args.input, args.column, args.chunk_size)
+    n_rows = n_errors = 0
+    errors_path = args.errors or _errors_path(args.output)
+    try:
+        writer = _Writer(args.output)
+        errors = _Writer(errors_path)
+    except (ImportError, ValueError) as err:
+        raise SystemExit(f'thermo_ml: error: {err}')
+    # Files are created on first write, so none of a previous run may remain
+    for path in (args.output, errors_path):
+        if os.path.exists(path) and not _same_file(path, args.input):
+            os.remove(path)
+    progress = not args.quiet and sys.stderr.isatty()
+    try:
+        for output, failed in _process_chunks(args.command, chunks, args.column,
+                                              elements, args.jobs):
+            if len(output):
+                writer.write(output)
+            if len(failed):
+                errors.write(failed)
+            n_rows += len(output) + len(failed)
+            n_errors += len(failed)
+            if progress:
+                _report(n_rows, n_errors, start, end='\r')
+    finally:
+        writer.close()
+        errors.close()
+    if not args.quiet:
+        _report(n_rows, n_errors, start, end='\n')
+    return 0
+
+def process(command:str, formulas:list, elements:tuple=composition.ELEMENTS,
+            first_row:int=0):
+    """Run a command on a list of formulas, keeping failed rows apart
+
+    Args:
+        command (str): One of COMMANDS.
+        formulas (list of str): Chemical formulas.
+        elements (tuple, optional): Element columns of the
+            'parse' command. Defaults to all elements.
+        first_row (int, optional): Row number of formulas[0]
+            in the input. Defaults to 0.
+
+    Raises:
+        ValueError: Unknown command
+
+    Returns:
+        pd.DataFrame: Results, one row per valid formula
+        pd.DataFrame: Failed rows ('row', 'formula', 'error')
+    """
+    if command not in COMMANDS:
+        raise ValueError(f'Unknown command "{command}", expected one of {list(COMMANDS)}')
+    ### Parse each unique formula once, catching errors per row
+    parsed = {}
+    for formula in set(formulas):
+        try:
+            atoms = parse.atoms(formula)
+            unknown = [a for a in atoms if a not in composition.ELEMENT_INDEX]
+            if unknown:
+                raise ValueError(f"Atom '{unknown[0]}' doesn't exist.")
+            parsed[formula] = atoms
+        except Exception as err: # SyntaxError, ValueError & failed parses
+            parsed[formula] = err
+    rows = np.arange(first_row, first_row + len(formulas))
+    ok = np.array([isinstance(parsed[f], dict) for f in formulas], dtype=bool)
+    failed = pd.DataFrame({
+        'row': rows[~ok],
+        'formula': [f for f, o in zip(formulas, ok) if not o],
+        'error': [f'{type(parsed[f]).__name__}: {parsed[f]}'
+                  for f, o in zip(formulas, ok) if not o],
+    })
+    valid = [f for f, o in zip(formulas, ok) if o]
+    compositions = [parsed[f] for f in valid]
+    ### Results of valid rows
+    output = {'row': rows[ok], 'formula': valid}
+    if command == 'parse':
+        X = composition.to_matrix(compositions, normalize=False)
+        for e in elements:
+            output[e] = X[:, composition.ELEMENT_INDEX[e]]
+    elif command == 'molar-mass':
+        output['molar_mass'] = mass.molar_masses(compositions)
+    elif command == 'featurize':
+        output['molar_mass'] = mass.molar_masses(compositions)
+        output['n_atoms'] = composition.to_matrix(compositions, normalize=False).sum(axis=1)
+        output.update(bonds.bond_features(compositions))
+    return pd.DataFrame(output), failed
+
+def _process_chunks(command, chunks, column, elements, jobs):
+    """Yield processed chunks in input order, at most 2 x jobs in flight"""
+    first_rows = _first_rows(chunks)
+    if jobs == 1:
+        for first_row, chunk in first_rows:
+            yield process(command, chunk[column].tolist(), elements, first_row)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = collections.deque()
+        for first_row, chunk in first_rows:
+            pending.append(pool.submit(process, command, chunk[column].tolist(),
+                                       elements, first_row))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _read_chunks(path:str, column:str, chunk_size:int):
+    """Chunks of the formula column of a CSV file (or '-' for stdin)
+
+    Raises:
+        SystemExit: File can't be read or lacks the column
+    """
+    source = sys.stdin if path == '-' else path
+    try:
+        chunks = iter(pd.read_csv(source, usecols=lambda name: name == column,
+                                  dtype={column: str}, keep_default_na=False,
+                                  chunksize=chunk_size))
+        first = next(chunks, None)
+    except (OSError, ValueError) as err: # incl. missing & empty files
+        raise SystemExit(f'thermo_ml: error: cannot read {path}: {err}')
+    if first is None or column not in first.columns:
+        raise SystemExit(f"thermo_ml: error: {path} has no column '{column}', "
+                         'choose it with --column')
+    return itertools.chain([first], chunks)
+
+def _same_file(a:str, b:str) -> bool:
+    return b != '-' and os.path.exists(b) and os.path.samefile(a, b)
+
+def _first_rows(chunks):
+    """Yield (row number of first row, chunk)"""
+    first_row = 0
+    for chunk in chunks:
+        yield first_row, chunk
+        first_row += len(chunk)
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='thermo_ml',
+        description='Batch process chemical formulas from a CSV file.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help in COMMANDS.items():
+        sub = subparsers.add_parser(command, help=help, description=help)
+        sub.add_argument('input', help='CSV file with a column of formulas ("-" for stdin)')
+        sub.add_argument('-o', '--output', required=True,
+                         help='Output file, .parquet or .arrow (need pyarrow), or .csv')
+        sub.add_argument('--column', default='formula',
+                         help='Column holding the formulas (default: formula)')
+        sub.add_argument('--jobs', type=int, default=1,
+                         help='Number of processes (default: 1)')
+        sub.add_argument('--chunk-size', type=int, default=10_000,
+                         help='Rows per chunk (default: 10000)')
+        sub.add_argument('--errors', default=None,
+                         help='CSV file of failed rows '
+                              '(default: <output>.errors.csv)')
+        sub.add_argument('--quiet', action='store_true',
+                         help="Don't report progress on stderr")
+        if command == 'parse':
+            sub.add_argument('--elements', default=None,
+                             help='Comma separated element columns (default: all)')
+        else:
+            sub.set_defaults(elements=None)
+    return parser
+
+def _elements(elements:str=None) -> tuple:
+    """Element columns from a comma separated list"""
+    if not elements:
+        return composition.ELEMENTS
+    elements = tuple(e.strip() for e in elements.split(','))
+    unknown = [e for e in elements if e not in composition.ELEMENT_INDEX]
+    if unknown:
+        raise SystemExit(f"thermo_ml: error: unknown elements {unknown}")
+    return elements
+
+def _errors_path(output:str) -> str:
+    return os.path.splitext(output)[0] + '.errors.csv'
+
+def _report(n_rows:int, n_errors:int, start:float, end:str):
+    seconds = time.perf_counter() - start
+    rate = n_rows / seconds if seconds > 0 else float('inf')
+    print(f'{n_rows} rows ({n_errors} failed) in {seconds:.2f} s, '
+          f'{rate:,.0f} rows/s', end=end, file=sys.stderr, flush=True)
+
+
+class _Writer:
+    def __init__(self, path:str):
+        """Append DataFrames to a CSV, Parquet or Arrow IPC file, created on first write
+
+        Raises:
+            ValueError: Unknown file extension
+            ImportError: Parquet or Arrow output without pyarrow
+        """
+        self.path = path
+        self.extension = os.path.splitext(path)[1].lower()
+        if self.extension in PARQUET_EXTENSIONS:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError('Writing Parquet requires pyarrow '
+                                  '(pip install pyarrow), or use a .csv output.') from None
+            self._pa = pyarrow
+        elif self.extension in arrow.IPC_EXTENSIONS:
+            self._ipc = arrow.IPCWriter(path)
+        elif self.extension not in CSV_EXTENSIONS:
+            raise ValueError(f'Unknown output format "{self.extension}", expected one of '
+                             f'{CSV_EXTENSIONS + PARQUET_EXTENSIONS + arrow.IPC_EXTENSIONS}')
+        self._writer = None
+        self._header = True
+
+    def write(self, df:pd.DataFrame):
+        if self.extension in CSV_EXTENSIONS:
+            df.to_csv(self.path, mode='w' if self._header else 'a',
+                      header=self._header, index=False)
+            self._header = False
+            return
+        if self.extension in arrow.IPC_EXTENSIONS:
+            self._ipc.write(df)
+            return
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pa.parquet.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self.extension in arrow.IPC_EXTENSIONS:
+            self._ipc.close()
+        if self._writer is not None:
+            self._writer.close()
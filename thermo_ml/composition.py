@@ -0,0 +1,359 @@
+import os
+
+import numpy as np
+from thermo_ml import parse, profiling
+
+
+### Atomic symbols ordered by atomic number (index = Z - 1)
+ELEMENTS = (
+    'H', 'He', 'Li', 'Be', 'B', 'C', 'N', 'O', 'F', 'Ne',
+    'Na', 'Mg', 'Al', 'Si', 'P', 'S', 'Cl', 'Ar', 'K', 'Ca',
+    'Sc', 'Ti', 'V', 'Cr', 'Mn', 'Fe', 'Co', 'Ni', 'Cu', 'Zn',
+    'Ga', 'Ge', 'As', 'Se', 'Br', 'Kr', 'Rb', 'Sr', 'Y', 'Zr',
+    'Nb', 'Mo', 'Tc', 'Ru', 'Rh', 'Pd', 'Ag', 'Cd', 'In', 'Sn',
+    'Sb', 'Te', 'I', 'Xe', 'Cs', 'Ba', 'La', 'Ce', 'Pr', 'Nd',
+    'Pm', 'Sm', 'Eu', 'Gd', 'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb',
+    'Lu', 'Hf', 'Ta', 'W', 'Re', 'Os', 'Ir', 'Pt', 'Au', 'Hg',
+    'Tl', 'Pb', 'Bi', 'Po', 'At', 'Rn', 'Fr', 'Ra', 'Ac', 'Th',
+    'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk', 'Cf', 'Es', 'Fm',
+    'Md', 'No', 'Lr', 'Rf', 'Db', 'Sg', 'Bh', 'Hs', 'Mt', 'Ds',
+    'Rg', 'Cn', 'Nh', 'Fl', 'Mc', 'Lv', 'Ts', 'Og',
+)
+# key = atomic symbol, value = column index in composition arrays
+ELEMENT_INDEX = {symbol: i for i, symbol in enumerate(ELEMENTS)}
+N_ELEMENTS = len(ELEMENTS)
+
+
+def parse_formulas(formulas, exact:bool=False) -> list:
+    """Parse many chemical formulas, each unique formula only once
+
+    Args:
+        formulas (iterable of str|dict): Chemical formulas
+            (e.g. ['CaO·H2O', 'SiO2']). Dictionaries of
+            atom counts are passed through as they are.
+        exact (bool, optional): Compute counts without
+            rounding errors (see "parse.atoms"). Defaults to False.
+
+    Returns:
+        list of dicts: e.g. [{'Ca': 1.0, 'O': 2.0, 'H': 2.0}, ...]
+    """
+    cache = {}
+    compositions = []
+    for formula in formulas:
+        if isinstance(formula, dict):
+            compositions.append(formula)
+            continue
+        if formula not in cache:
+            cache[formula] = parse.atoms(formula, exact=exact)
+        compositions.append(cache[formula])
+    if profiling.ENABLED:
+        profiling.count('composition.formulas', len(compositions))
+        profiling.count('composition.unique_formulas', len(cache))
+    return compositions
+
+def hill_formula(atoms:dict) -> str:
+    """Canonical formula of a composition in Hill order
+
+    C first, H second, then the other elements alphabetically;
+    without C, all elements alphabetically. Counts of 1 are
+    left out (e.g. {'O': 2, 'H': 2, 'Ca': 1} -> 'CaH2O2').
+
+    Args:
+        atoms (dict): key=atomic symbol, value=atom count
+            (e.g. output of "parse.atoms").
+
+    Returns:
+        str: Canonical formula
+    """
+    order = sorted(atoms)
+    if 'C' in atoms:
+        order = ['C'] + (['H'] if 'H' in atoms else []) + \
+                [a for a in order if a not in ('C', 'H')]
+    return ''.join(a if atoms[a] == 1 else f'{a}{float(atoms[a]):g}' for a in order)
+
+def to_matrix(formulas, normalize:bool=True) -> np.ndarray:
+    """Dense composition matrix of many formulas
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas or dictionaries of atom counts.
+        normalize (bool, optional): If True, rows are atomic
+            fractions summing to 1. Otherwise raw atom counts.
+            Defaults to True.
+
+    Raises:
+        ValueError: Unknown atomic symbol
+
+    Returns:
+        np.ndarray: Array of shape (n_formulas, N_ELEMENTS),
+            where column i is the element ELEMENTS[i].
+    """
+    return as_batch(formulas).to_matrix(normalize)
+
+def to_csr(formulas):
+    """Sparse (CSR) composition arrays of many formulas
+
+    Only elements present in a formula are stored, so memory
+    grows with the number of atoms rather than N_ELEMENTS.
+    Elements of formula i are element_ids[offsets[i]:offsets[i+1]].
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas or dictionaries of atom counts.
+
+    Raises:
+        ValueError: Unknown atomic symbol
+
+    Returns:
+        np.ndarray: int64 offsets of length n_formulas + 1
+        np.ndarray: uint8 element ids (column in "ELEMENTS")
+        np.ndarray: float64 atom counts
+    """
+    batch = as_batch(formulas)
+    return batch.offsets, batch.element_ids, batch.counts
+
+def as_batch(formulas) -> 'CompositionBatch':
+    """CompositionBatch of many formulas (batches are returned as they are)
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas or dictionaries of atom counts.
+
+    Raises:
+        ValueError: Unknown atomic symbol
+
+    Returns:
+        CompositionBatch: Parsed compositions
+    """
+    if isinstance(formulas, CompositionBatch):
+        return formulas
+    compositions = parse_formulas(formulas)
+    lengths = np.fromiter((len(c) for c in compositions),
+                          dtype=np.int64, count=len(compositions))
+    offsets = np.zeros(len(compositions) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    atoms = [atom for c in compositions for atom in c]
+    try:
+        element_ids = np.fromiter((ELEMENT_INDEX[atom] for atom in atoms),
+                                  dtype=np.uint8, count=len(atoms))
+    except KeyError as err:
+        raise ValueError(f"Atom '{err.args[0]}' doesn't exist.") from None
+    counts = np.fromiter((n for c in compositions for n in c.values()),
+                         dtype=np.float64, count=len(atoms))
+    return CompositionBatch(offsets, element_ids, counts)
+
+def row_ids(offsets:np.ndarray) -> np.ndarray:
+    """Formula (row) index of each stored element of CSR arrays"""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+class CompositionBatch:
+    # File names of the arrays in a saved batch
+    _FILES = ('offsets.npy', 'element_ids.npy', 'counts.npy')
+
+    def __init__(self, offsets:np.ndarray, element_ids:np.ndarray, counts:np.ndarray):
+        """Many compositions stored as three flat (CSR) arrays
+
+        Elements of composition i are
+        element_ids[offsets[i]:offsets[i+1]] with atom counts
+        counts[offsets[i]:offsets[i+1]], each element at most
+        once per composition. Memory is 9 bytes per element
+        present plus 8 per composition, instead of a dict each.
+
+        Args:
+            offsets (np.ndarray): int64 array of length
+                n_compositions + 1, starting at 0.
+            element_ids (np.ndarray): uint8 column in "ELEMENTS".
+            counts (np.ndarray): float64 atom counts.
+
+        Raises:
+            ValueError: Inconsistent arrays
+        """
+        # asanyarray keeps memory maps as they are
+        self.offsets = np.asanyarray(offsets, dtype=np.int64)
+        self.element_ids = np.asanyarray(element_ids, dtype=np.uint8)
+        self.counts = np.asanyarray(counts, dtype=np.float64)
+        if (self.offsets.ndim != 1 or len(self.offsets) == 0 or self.offsets[0] != 0
+                or self.offsets[-1] != len(self.element_ids)
+                or (np.diff(self.offsets) < 0).any()):
+            raise ValueError('Offsets must start at 0, never decrease '
+                             'and end at the number of element ids.')
+        if self.element_ids.shape != self.counts.shape:
+            raise ValueError(f'Expected as many counts as element ids, instead got '
+                             f'{self.counts.shape} and {self.element_ids.shape}')
+        if len(self.element_ids) and self.element_ids.max() >= N_ELEMENTS:
+            raise ValueError(f'Element ids must be < {N_ELEMENTS}')
+
+    @classmethod
+    def from_formulas(cls, formulas) -> 'CompositionBatch':
+        """Parse many formulas (see "as_batch")"""
+        return as_batch(formulas)
+
+    @classmethod
+    def from_matrix(cls, matrix:np.ndarray) -> 'CompositionBatch':
+        """Batch of the non-zero entries of a dense (n, N_ELEMENTS) matrix"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        rows, element_ids = np.nonzero(matrix)
+        offsets = np.zeros(len(matrix) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(matrix)), out=offsets[1:])
+        return cls(offsets, element_ids, matrix[rows, element_ids])
+
+    @classmethod
+    def concatenate(cls, batches) -> 'CompositionBatch':
+        """Stack the compositions of many batches one after another"""
+        batches = list(batches)
+        if not batches:
+            return cls(np.zeros(1, dtype=np.int64), [], [])
+        starts = np.cumsum([0] + [len(b.element_ids) for b in batches[:-1]])
+        offsets = np.concatenate([[0]] + [b.offsets[1:] + start
+                                          for b, start in zip(batches, starts)])
+        return cls(offsets,
+                   np.concatenate([b.element_ids for b in batches]),
+                   np.concatenate([b.counts for b in batches]))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __repr__(self):
+        return f'CompositionBatch(n_compositions={len(self)}, n_entries={len(self.counts)})'
+
+    def __getitem__(self, index):
+        """dict for an integer, CompositionBatch for a slice, mask or index array"""
+        if isinstance(index, (int, np.integer)):
+            i = range(len(self))[index]
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            return {ELEMENTS[e]: float(n) for e, n
+                    in zip(self.element_ids[start:stop], self.counts[start:stop])}
+        if isinstance(index, slice) and index.step in (None, 1):
+            # Contiguous rows are views, nothing is copied
+            start, stop, _ = index.indices(len(self))
+            stop = max(start, stop)
+            first, last = self.offsets[start], self.offsets[stop]
+            return CompositionBatch(self.offsets[start:stop + 1] - first,
+                                    self.element_ids[first:last],
+                                    self.counts[first:last])
+        return self.take(np.arange(len(self))[index])
+
+    def take(self, rows) -> 'CompositionBatch':
+        """New batch of the given rows (in that order)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = np.diff(self.offsets)[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Position of every kept entry in the flat arrays
+        positions = (np.repeat(self.offsets[rows] - offsets[:-1], lengths)
+                     + np.arange(offsets[-1]))
+        return CompositionBatch(offsets, self.element_ids[positions], self.counts[positions])
+
+    @property
+    def row_ids(self) -> np.ndarray:
+        """Composition (row) index of every entry"""
+        return row_ids(self.offsets)
+
+    @property
+    def n_atoms(self) -> np.ndarray:
+        """Total atom count of every composition"""
+        return np.bincount(self.row_ids, weights=self.counts, minlength=len(self))
+
+    def normalize(self) -> 'CompositionBatch':
+        """Atomic fractions, summing to 1 per composition"""
+        totals = self.n_atoms[self.row_ids]
+        counts = np.divide(self.counts, totals,
+                           out=np.zeros_like(self.counts), where=totals != 0)
+        return CompositionBatch(self.offsets, self.element_ids, counts)
+
+    def scale(self, factors) -> 'CompositionBatch':
+        """Multiply counts by a number or by one factor per composition"""
+        factors = np.asarray(factors, dtype=np.float64)
+        if factors.ndim:
+            factors = factors[self.row_ids]
+        return CompositionBatch(self.offsets, self.element_ids, self.counts * factors)
+
+    def add(self, other:'CompositionBatch') -> 'CompositionBatch':
+        """Merge two batches of equal length, composition by composition
+
+        e.g. CaO + H2O = CaH2O2. Counts of elements present
+        in both are summed; elements are sorted by atomic number.
+
+        Raises:
+            ValueError: Batches of different lengths
+        """
+        other = as_batch(other)
+        if len(other) != len(self):
+            raise ValueError(f'Cannot add batches of {len(self)} '
+                             f'and {len(other)} compositions')
+        rows = np.concatenate([self.row_ids, other.row_ids])
+        keys = rows * N_ELEMENTS + np.concatenate([self.element_ids, other.element_ids])
+        keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, other.counts]),
+                             minlength=len(keys))
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // N_ELEMENTS, minlength=len(self)), out=offsets[1:])
+        return CompositionBatch(offsets, keys % N_ELEMENTS, counts)
+
+    __add__ = add
+
+    def contains(self, elements, how:str='any') -> np.ndarray:
+        """Bool mask of compositions containing the given elements
+
+        Args:
+            elements (list of str): Atomic symbols (e.g. ['Ca', 'Si']).
+            how (str, optional): 'any' of the elements, 'all' of
+                them, or 'only' them and no other. Defaults to 'any'.
+
+        Raises:
+            ValueError: Unknown atomic symbol or "how"
+        """
+        wanted = np.zeros(N_ELEMENTS, dtype=bool)
+        for e in elements:
+            if e not in ELEMENT_INDEX:
+                raise ValueError(f"Atom '{e}' doesn't exist.")
+            wanted[ELEMENT_INDEX[e]] = True
+        hits = np.bincount(self.row_ids, weights=wanted[self.element_ids],
+                           minlength=len(self))
+        if how == 'any':
+            return hits > 0
+        if how == 'all':
+            return hits == wanted.sum()
+        if how == 'only':
+            return hits == np.diff(self.offsets)
+        raise ValueError(f"Expected how to be 'any', 'all' or 'only', instead got {how!r}")
+
+    def filter_by_element(self, elements, how:str='any') -> 'CompositionBatch':
+        """Compositions containing the given elements (see "contains")"""
+        return self.take(np.flatnonzero(self.contains(elements, how)))
+
+    def to_matrix(self, normalize:bool=False) -> np.ndarray:
+        """Dense array of shape (n_compositions, N_ELEMENTS)"""
+        matrix = np.zeros((len(self), N_ELEMENTS), dtype=np.float64)
+        matrix[self.row_ids, self.element_ids] = self.counts
+        if normalize:
+            totals = matrix.sum(axis=1, keepdims=True)
+            np.divide(matrix, totals, out=matrix, where=totals > 0)
+        return matrix
+
+    def to_dicts(self) -> list:
+        """Compositions as dictionaries, e.g. [{'Ca': 1.0, 'O': 1.0}, ...]"""
+        symbols = [ELEMENTS[e] for e in self.element_ids.tolist()]
+        counts = self.counts.tolist()
+        offsets = self.offsets.tolist()
+        return [dict(zip(symbols[a:b], counts[a:b]))
+                for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def save(self, path:str):
+        """Write the arrays as .npy files into directory "path" """
+        os.makedirs(path, exist_ok=True)
+        for name, arr in zip(self._FILES, (self.offsets, self.element_ids, self.counts)):
+            np.save(os.path.join(path, name), arr)
+
+    @classmethod
+    def load(cls, path:str, mmap_mode:str='r') -> 'CompositionBatch':
+        """Read a batch written by "save"
+
+        Args:
+            path (str): Directory.
+            mmap_mode (str, optional): See "np.load". The default
+                'r' maps the files read-only instead of reading them.
+        """
+        return cls(*(np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+                     for name in cls._FILES))
@@ -1,5 +1,17 @@
 from ._base import (
     get_fundamental_constants,
     get_atoms,
-    Atoms
-    )
\ No newline at end of file
+    get_property_array,
+    get_electron_configs,
+    get_ionization_energies,
+    Atoms,
+    SUBSHELLS,
+    N_IONIZATION_ENERGIES
+    )
+from ._async import (
+    DatasetLoader,
+    load_datasets
+    )
+from ._store import (
+    CompoundStore
+    )
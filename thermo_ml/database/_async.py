@@ -0,0 +1,215 @@
+import asyncio
+import concurrent.futures
+
+from thermo_ml.database._base import (
+    _shared_atoms,
+    get_electron_configs,
+    get_fundamental_constants,
+    get_ionization_energies,
+)
+
+
+### Datasets loaded by default
+#   key = dataset name, value = blocking function returning it.
+#   "atoms" fills the per-process Atoms instance, so synchronous
+#   callers (e.g. "get_property_array") reuse it once loaded.
+DATASETS = {
+    'atoms': _shared_atoms,
+    'constants': get_fundamental_constants,
+    'electron_configs': get_electron_configs,
+    'ionization_energies': get_ionization_energies,
+}
+# key = dataset name, value = datasets to load before it
+DEPENDENCIES = {
+    'electron_configs': ('atoms',),
+    'ionization_energies': ('atoms',),
+}
+
+
+class DatasetLoader:
+    def __init__(self, datasets:dict=None, dependencies:dict=None, executor=None):
+        """Load datasets concurrently without blocking the event loop
+
+        e.g.
+            async def startup():
+                loader = DatasetLoader().start()
+                # Parsing needs no dataset, serve it right away
+                ...
+                atoms = await loader.get('atoms')
+
+        Each blocking load (file reads, decoding) runs on a thread
+        pool; independent datasets load at the same time, and a
+        dataset waits only for its own dependencies. Every dataset
+        has a readiness future, so a server can start handling
+        requests that don't need the heavier tables while they
+        load.
+
+        Args:
+            datasets (dict, optional): key=name, value=blocking
+                function returning the dataset. Defaults to None,
+                meaning DATASETS.
+            dependencies (dict, optional): key=name, value=names of
+                the datasets to load first. Defaults to None,
+                meaning DEPENDENCIES when datasets is None.
+            executor (concurrent.futures.Executor, optional):
+                Executor of the blocking loads. Defaults to None,
+                meaning a thread pool of one thread per dataset,
+                shut down once all are loaded.
+
+        Raises:
+            ValueError: Dependency on an unknown dataset
+        """
+        self.datasets = dict(DATASETS if datasets is None else datasets)
+        if dependencies is None and datasets is None:
+            dependencies = DEPENDENCIES
+        self.dependencies = {name: tuple(d) for name, d in (dependencies or {}).items()}
+        for name, depends in self.dependencies.items():
+            unknown = [d for d in (name, *depends) if d not in self.datasets]
+            if unknown:
+                raise ValueError(f"Dataset '{unknown[0]}' doesn't exist.")
+        self.executor = executor
+        self._futures = {}
+        self._tasks = []
+
+    def add(self, name:str, function, depends:tuple=()):
+        """Register another dataset (e.g. a model store) before "start"
+
+        Args:
+            name (str): Dataset name.
+            function (callable): Blocking function returning it.
+            depends (tuple of str, optional): Datasets to load
+                first. Defaults to ().
+        """
+        unknown = [d for d in depends if d not in self.datasets]
+        if unknown:
+            raise ValueError(f"Dataset '{unknown[0]}' doesn't exist.")
+        self.datasets[name] = function
+        if depends:
+            self.dependencies[name] = tuple(depends)
+
+    def start(self, names:list=None) -> 'DatasetLoader':
+        """Schedule the loads on the running event loop and return at once
+
+        Args:
+            names (list of str, optional): Datasets to load, with
+                their dependencies. Defaults to None, meaning all.
+
+        Raises:
+            RuntimeError: No running event loop
+            ValueError: Unknown dataset
+
+        Returns:
+            DatasetLoader: self
+        """
+        loop = asyncio.get_running_loop()
+        names = self._with_dependencies(self.datasets if names is None else names)
+        names = [n for n in names if n not in self._futures]
+        if not names:
+            return self
+        executor = self.executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(names), thread_name_prefix='thermo_ml-load')
+        for name in names:
+            self._futures[name] = loop.create_future()
+        tasks = [loop.create_task(self._load(name, executor)) for name in names]
+        if self.executor is None:
+            asyncio.gather(*tasks).add_done_callback(
+                lambda _: executor.shutdown(wait=False))
+        self._tasks += tasks
+        return self
+
+    def ready(self, name:str) -> asyncio.Future:
+        """Readiness future of a dataset, its result being the dataset
+
+        Awaiting it raises the exception of a failed load, or
+        CancelledError if the load was cancelled (e.g. the loop is
+        shutting down). Don't cancel it; it is shared by all
+        callers.
+
+        Raises:
+            ValueError: Dataset isn't being loaded
+        """
+        if name not in self._futures:
+            raise ValueError(f"Dataset '{name}' isn't loading, call \"start\" first.")
+        return self._futures[name]
+
+    def is_ready(self, name:str) -> bool:
+        """True once a dataset loaded successfully"""
+        future = self._futures.get(name)
+        return (future is not None and future.done() and not future.cancelled()
+                and future.exception() is None)
+
+    def status(self) -> dict:
+        """key=dataset name, value='pending', 'ready', 'failed' or 'cancelled'
+        (e.g. health checks)"""
+        status = {}
+        for name, future in self._futures.items():
+            if not future.done():
+                status[name] = 'pending'
+            elif future.cancelled():
+                status[name] = 'cancelled'
+            else:
+                status[name] = 'ready' if future.exception() is None else 'failed'
+        return status
+
+    async def get(self, name:str):
+        """Wait for a dataset and return it"""
+        return await self.ready(name)
+
+    async def wait(self, names:list=None) -> dict:
+        """Wait for many datasets (default: all started ones)
+
+        Returns:
+            dict: key=dataset name, value=dataset
+        """
+        names = list(self._futures) if names is None else list(names)
+        values = await asyncio.gather(*(self.ready(name) for name in names))
+        return dict(zip(names, values))
+
+    async def _load(self, name:str, executor):
+        future = self._futures[name]
+        try:
+            for dependency in self.dependencies.get(name, ()):
+                await self._futures[dependency]
+            value = await asyncio.get_running_loop().run_in_executor(
+                executor, self.datasets[name])
+        except asyncio.CancelledError: # e.g. loop shutdown, waiters mustn't hang
+            future.cancel()
+            raise
+        except Exception as err: # incl. failed dependencies
+            if not future.done():
+                future.set_exception(err)
+        else:
+            if not future.done():
+                future.set_result(value)
+
+    def _with_dependencies(self, names) -> list:
+        """Names & all their dependencies, dependencies first"""
+        ordered = []
+        def visit(name, path=()):
+            if name not in self.datasets:
+                raise ValueError(f"Dataset '{name}' doesn't exist.")
+            if name in path:
+                raise ValueError(f'Circular dependency of datasets {path + (name,)}')
+            if name in ordered:
+                return
+            for dependency in self.dependencies.get(name, ()):
+                visit(dependency, path + (name,))
+            ordered.append(name)
+        for name in names:
+            visit(name)
+        return ordered
+
+
+def load_datasets(names:list=None, executor=None) -> DatasetLoader:
+    """Start loading the default datasets on the running event loop
+
+    Args:
+        names (list of str, optional): Datasets of DATASETS to load.
+            Defaults to None, meaning all.
+        executor (concurrent.futures.Executor, optional): See
+            "DatasetLoader". Defaults to None.
+
+    Returns:
+        DatasetLoader: Loader with the readiness futures
+    """
+    return DatasetLoader(executor=executor).start(names)
@@ -1,6 +1,11 @@
 #%%
+import functools
+import hashlib
 from importlib import resources
+import numpy as np
 import pandas as pd
+from thermo_ml import profiling
+from thermo_ml.composition import N_ELEMENTS
 
 
 ### Note: Data types and their values
@@ -79,6 +84,15 @@ DTYPES_PROPERTIES = {
     'Electron afﬁnity (eV)': 'float32'
 }
 
+### Packed columns
+#   Subshells of the 'Electron config - *' columns, in table order
+SUBSHELLS = ('1s', '2s', '2p', '3s', '3p', '3d', '4s', '4p', '4d', '4f',
+             '5s', '5p', '5d', '5f', '6s', '6p', '6d', '7s', '7p')
+# Number of 'Ionization energy (eV) - *' columns
+N_IONIZATION_ENERGIES = 21
+ELECTRON_CONFIG_PREFIX = 'Electron config - '
+IONIZATION_ENERGY_PREFIX = 'Ionization energy (eV) - '
+
 def get_fundamental_constants() -> pd.DataFrame():
     """Load fundamental constants of physics & chemistry
     
@@ -124,6 +138,73 @@ def get_atoms(atoms:str=None,
     A = Atoms()
     return A.get_atoms(atoms, properties)
 
+def get_property_array(property:str) -> np.ndarray:
+    """Get one atomic property of all atoms as an array
+
+    The atomic properties table is loaded once
+    and shared by all calls.
+
+    Args:
+        property (str): Atomic property
+            (e.g. 'Electronegativity').
+
+    Returns:
+        np.ndarray: float64 array of length N_ELEMENTS
+            indexed by atomic number - 1 (see
+            "thermo_ml.composition.ELEMENTS").
+            NaN where the property is unknown.
+    """
+    return _shared_atoms().get_property_array(property)
+
+@functools.lru_cache(maxsize=None)
+def get_electron_configs():
+    """Electron configuration of all atoms as a dense matrix
+
+    The 19 'Electron config - *' columns are packed once and
+    shared by all calls (read-only arrays).
+
+    Returns:
+        np.ndarray: uint8 electron counts of shape
+            (N_ELEMENTS, len(SUBSHELLS)), rows indexed by
+            atomic number - 1, 0 for empty subshells.
+        np.ndarray: bool mask, same shape, True where the
+            table holds a value.
+    """
+    configs, mask = _shared_atoms().get_property_matrix(ELECTRON_CONFIG_PREFIX)
+    if configs.shape[1] != len(SUBSHELLS):
+        raise ValueError(f'Expected {len(SUBSHELLS)} electron config columns, '
+                         f'instead got {configs.shape[1]}')
+    configs = np.where(mask, configs, 0).astype(np.uint8)
+    return _read_only(configs), _read_only(mask)
+
+@functools.lru_cache(maxsize=None)
+def get_ionization_energies():
+    """Successive ionization energies of all atoms as a dense matrix
+
+    The 21 'Ionization energy (eV) - *' columns are packed once
+    and shared by all calls (read-only arrays).
+
+    Returns:
+        np.ndarray: float32 energies (eV) of shape
+            (N_ELEMENTS, N_IONIZATION_ENERGIES), column i holding
+            the (i+1)th ionization energy, NaN if unknown.
+        np.ndarray: bool mask, same shape, True where known.
+    """
+    energies, mask = _shared_atoms().get_property_matrix(IONIZATION_ENERGY_PREFIX)
+    if energies.shape[1] != N_IONIZATION_ENERGIES:
+        raise ValueError(f'Expected {N_IONIZATION_ENERGIES} ionization energy '
+                         f'columns, instead got {energies.shape[1]}')
+    return _read_only(energies.astype(np.float32)), _read_only(mask)
+
+def _read_only(array:np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+@functools.lru_cache(maxsize=None)
+def _shared_atoms():
+    """Atoms instance loaded once per process"""
+    return Atoms()
+
 class Atoms:
     def __init__(self):
         self._df = self._load_data()
@@ -156,6 +237,21 @@ class Atoms:
         return pd.DataFrame(dict_of_atomic_properties.items(), 
                             columns=['Index', 'Property'])
 
+    @property
+    def table_hash(self) -> str:
+        """SHA-256 hash of the atomic properties table
+
+        Used to make sure models are used with the same
+        table they were trained on (see "thermo_ml.ml").
+
+        Returns:
+            str: Hex digest of column names and values
+        """
+        sha = hashlib.sha256()
+        sha.update('\x1f'.join(map(str, self._df.columns)).encode('utf-8'))
+        sha.update(pd.util.hash_pandas_object(self._df, index=True).values.tobytes())
+        return sha.hexdigest()
+
     def get_atoms(self, 
                   atoms:str=None, 
                   properties:str=None
@@ -190,6 +286,57 @@ class Atoms:
         df = self._filter_data(self._df, atoms, properties)
         return df
     
+    def get_property_array(self, property:str) -> np.ndarray:
+        """Get one atomic property of all atoms as an array
+
+        Args:
+            property (str): Atomic property
+                (e.g. 'Electronegativity').
+
+        Raises:
+            ValueError: Specified property doesn't exist
+
+        Returns:
+            np.ndarray: float64 array of length N_ELEMENTS
+                indexed by atomic number - 1 (see
+                "thermo_ml.composition.ELEMENTS").
+                NaN where the property is unknown.
+        """
+        if property not in self._df.columns:
+            raise ValueError(f"Property '{property}' doesn't exist.")
+        z = pd.to_numeric(self._df['Z'], errors='coerce')
+        values = pd.to_numeric(self._df[property], errors='coerce')
+        mask = z.between(1, N_ELEMENTS)
+        array = np.full(N_ELEMENTS, np.nan)
+        array[z[mask].to_numpy(dtype=np.int64) - 1] = values[mask].to_numpy(dtype=np.float64)
+        return array
+
+    def get_property_matrix(self, prefix:str):
+        """Get all atomic properties starting with a prefix as a matrix
+
+        Args:
+            prefix (str): Start of the property names
+                (e.g. 'Ionization energy (eV) - ').
+
+        Raises:
+            ValueError: No property starts with the prefix
+
+        Returns:
+            np.ndarray: float64 array of shape (N_ELEMENTS,
+                n_properties), columns in table order,
+                NaN where a property is unknown.
+            np.ndarray: bool mask, same shape, True where known.
+        """
+        properties = [c for c in self._df.columns if str(c).startswith(prefix)]
+        if not properties:
+            raise ValueError(f"No property starts with '{prefix}'.")
+        z = pd.to_numeric(self._df['Z'], errors='coerce')
+        values = self._df[properties].apply(pd.to_numeric, errors='coerce')
+        mask = z.between(1, N_ELEMENTS)
+        matrix = np.full((N_ELEMENTS, len(properties)), np.nan)
+        matrix[z[mask].to_numpy(dtype=np.int64) - 1] = values[mask].to_numpy(dtype=np.float64)
+        return matrix, np.isfinite(matrix)
+
     def _assert_all_values_exist(self, atoms, properties):
         """Make sure all user-specified values are valid
 
@@ -267,6 +414,7 @@ class Atoms:
         return missing_vals
             
     @staticmethod
+    @profiling.timed('database.load_data_seconds')
     def _load_data() -> pd.DataFrame:
         """Load atomic properties dataset
 
@@ -306,6 +454,7 @@ class Atoms:
         return df
 
     @staticmethod
+    @profiling.timed('database.filter_data_seconds')
     def _filter_data(df:pd.DataFrame, 
                      atoms:list, 
                      properties:list
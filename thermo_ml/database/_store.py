@@ -0,0 +1,428 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import pandas as pd
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+### Layout of a compound store directory
+#   manifest.json     segments (file, first & last version, rows), next version
+#   changelog.jsonl   one line per append / compaction
+#   cursors/<consumer>.json   last version the consumer processed
+#   cursors/<consumer>.lock   held while the consumer commits
+#   segment_<first version>_<last version>.jsonl   one record per line
+STORE_FORMAT = 1
+# Segments with fewer rows are merged by "compact"
+COMPACT_ROWS = 10_000
+# Columns of every row, which property names can't reuse
+RECORD_KEYS = ('version', 'formula', 'source')
+
+
+class CompoundStore:
+    def __init__(self, path:str):
+        """Append-only, versioned store of compound records
+
+        e.g.
+            store = CompoundStore('compounds')
+            store.append([{'formula': 'CaO', 'source': 'lab',
+                           'properties': {'dHf (kJ/mol)': -635.1}}])
+            rows, version = store.pending('featurizer')
+            features = bonds.bond_features(rows['formula'])
+            store.commit('featurizer', version)
+
+        Every appended record gets the next version number, so
+        consumers (parser, featurizer, model trainer) only process
+        the rows after the last version they saw, instead of the
+        whole corpus. Each append writes a new immutable segment
+        file; small segments are merged by "compact", which can
+        run in a background thread ("start_compaction"). Files
+        are replaced atomically, so a crash never leaves a
+        half-written segment or manifest behind.
+
+        One process appends to a store at a time; any number of
+        threads & processes may read it and commit cursors (each
+        consumer has its own cursor file, locked while committed).
+
+        Args:
+            path (str): Store directory, created if missing.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._compactor = None
+        self._compaction_error = None
+        if not os.path.exists(self._file('manifest.json')):
+            _write_json_atomic(self._file('manifest.json'),
+                               {'format': STORE_FORMAT, 'next_version': 1, 'segments': []})
+        self._manifest_stat = None
+        self._refresh()
+
+    @property
+    def version(self) -> int:
+        """Version of the last appended row (0 if empty)"""
+        return self._refresh()['next_version'] - 1
+
+    @property
+    def segments(self) -> list:
+        """Segments as dicts of 'file', 'first_version', 'last_version', 'n_rows'"""
+        return [dict(s) for s in self._refresh()['segments']]
+
+    def __len__(self) -> int:
+        return sum(s['n_rows'] for s in self._refresh()['segments'])
+
+    def append(self, records:list) -> tuple:
+        """Append compound records as one new segment
+
+        Args:
+            records (list of dict): Each with a 'formula' (str),
+                optionally a 'source' (str) and 'properties' (dict
+                of JSON serializable values, e.g. measurements).
+
+        Raises:
+            ValueError: Invalid record
+
+        Returns:
+            tuple: (first version, last version) of the new rows,
+                (version + 1, version) if records is empty
+        """
+        rows = [_validate(record) for record in records]
+        with self._lock:
+            self._refresh()
+            first = self._manifest['next_version']
+            if not rows:
+                return first, first - 1
+            last = first + len(rows) - 1
+            for version, row in zip(range(first, last + 1), rows):
+                row['version'] = version
+            segment = _segment_name(first, last)
+            _write_lines_atomic(self._file(segment), rows)
+            manifest = dict(self._manifest, next_version=last + 1,
+                            segments=self._manifest['segments'] + [
+                                {'file': segment, 'first_version': first,
+                                 'last_version': last, 'n_rows': len(rows)}])
+            self._write_manifest(manifest)
+            self._log({'action': 'append', 'first_version': first,
+                       'last_version': last, 'segment': segment})
+        return first, last
+
+    def rows_since(self, version:int=0) -> pd.DataFrame:
+        """Rows appended after a version
+
+        Only segments holding newer rows are read. Appends and
+        compactions of other instances (e.g. the writer process)
+        are picked up through the manifest.
+
+        Args:
+            version (int, optional): Last version already processed.
+                Defaults to 0, meaning all rows.
+
+        Returns:
+            pd.DataFrame: Columns 'version', 'formula', 'source' and
+                one per property, in version order
+        """
+        for _ in range(3):
+            segments = [s for s in self._refresh()['segments']
+                        if s['last_version'] > version]
+            try:
+                rows = [row for s in segments for row in self._read_segment(s['file'])
+                        if row['version'] > version]
+                break
+            except FileNotFoundError: # merged by a compaction meanwhile
+                continue
+        else:
+            raise RuntimeError(f'Segments of "{self.path}" keep changing while read.')
+        records = [{'version': row['version'], 'formula': row['formula'],
+                    'source': row.get('source'), **row.get('properties', {})}
+                   for row in rows]
+        return pd.DataFrame.from_records(records, columns=None if records else list(RECORD_KEYS))
+
+    def cursor(self, consumer:str) -> int:
+        """Last version a consumer committed (0 if none)"""
+        path = self._cursor_file(consumer)
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['version']
+
+    def pending(self, consumer:str) -> tuple:
+        """Rows a consumer hasn't processed yet
+
+        Returns:
+            pd.DataFrame: See "rows_since"
+            int: Version to "commit" once they are processed
+        """
+        version = self.version
+        rows = self.rows_since(self.cursor(consumer))
+        return rows[rows['version'] <= version], version
+
+    def commit(self, consumer:str, version:int):
+        """Record that a consumer processed all rows up to a version
+
+        Commits of the same consumer are serialized across
+        processes by a lock file, so none is lost or goes back.
+
+        Raises:
+            ValueError: Version beyond the store's, or going back
+        """
+        path = self._cursor_file(consumer)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, _file_lock(path[:-len('.json')] + '.lock'):
+            current = self.cursor(consumer)
+            if version > self.version:
+                raise ValueError(f'Version {version} is beyond the last one ({self.version}).')
+            if version < current:
+                raise ValueError(f"Cursor of '{consumer}' is at {current}, "
+                                 f"it can't go back to {version}.")
+            _write_json_atomic(path, {'consumer': consumer, 'version': version})
+
+    def changelog(self, since_version:int=0) -> list:
+        """Appends & compactions touching rows after a version
+
+        Returns:
+            list of dict: 'action' ('append' or 'compact'),
+                'first_version', 'last_version', 'time' (UNIX),
+                'segment' (file written)
+        """
+        path = self._file('changelog.jsonl')
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return [e for e in entries if e['last_version'] > since_version]
+
+    def compact(self, min_rows:int=COMPACT_ROWS) -> int:
+        """Merge runs of consecutive small segments into one each
+
+        Rows keep their versions. Merged segments are written
+        before the manifest switches to them; the small ones are
+        deleted afterwards.
+
+        Args:
+            min_rows (int, optional): Segments with fewer rows are
+                merged, up to about min_rows rows per merged
+                segment. Defaults to COMPACT_ROWS.
+
+        Returns:
+            int: Number of segments removed
+        """
+        with self._compact_lock:
+            return self._compact(min_rows)
+
+    def _compact(self, min_rows:int) -> int:
+        ### Plan runs of small segments (appends only add segments at the end)
+        runs, run, run_rows = [], [], 0
+        for segment in self._refresh()['segments']:
+            small = segment['n_rows'] < min_rows
+            if small and run_rows < min_rows:
+                run.append(segment)
+                run_rows += segment['n_rows']
+                continue
+            if len(run) > 1:
+                runs.append(run)
+            run, run_rows = ([segment], segment['n_rows']) if small else ([], 0)
+        if len(run) > 1:
+            runs.append(run)
+        if not runs:
+            return 0
+        ### Write merged segments outside the lock, appends carry on
+        merged = {}
+        for run in runs:
+            first, last = run[0]['first_version'], run[-1]['last_version']
+            rows = [row for s in run for row in self._read_segment(s['file'])]
+            name = _segment_name(first, last)
+            _write_lines_atomic(self._file(name), rows)
+            merged[run[0]['file']] = ({'file': name, 'first_version': first,
+                                       'last_version': last, 'n_rows': len(rows)},
+                                      {s['file'] for s in run})
+        ### Swap them in
+        with self._lock:
+            self._refresh()
+            replaced = set().union(*(files for _, files in merged.values()))
+            segments = []
+            for segment in self._manifest['segments']:
+                if segment['file'] in merged:
+                    segments.append(merged[segment['file']][0])
+                elif segment['file'] not in replaced:
+                    segments.append(segment)
+            manifest = dict(self._manifest, segments=segments)
+            self._write_manifest(manifest)
+            for new, _ in merged.values():
+                self._log({'action': 'compact', 'first_version': new['first_version'],
+                           'last_version': new['last_version'], 'segment': new['file']})
+        kept = {s['file'] for s in segments}
+        for name in replaced - kept:
+            os.remove(self._file(name))
+        return len(replaced) - len(merged)
+
+    def start_compaction(self, interval:float=60.0, min_rows:int=COMPACT_ROWS):
+        """Run "compact" every "interval" seconds in a daemon thread
+
+        A failed compaction (e.g. disk full) doesn't stop the
+        thread, it retries at the next interval; the last error is
+        raised by "stop_compaction".
+        """
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._stop.clear()
+        self._compaction_error = None
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.compact(min_rows)
+                except Exception as err:
+                    self._compaction_error = err
+        self._compactor = threading.Thread(target=run, name='thermo_ml-compaction',
+                                           daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self):
+        """Stop the background compaction, waiting for a running one
+
+        Raises:
+            RuntimeError: Last background compaction failed
+        """
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        error, self._compaction_error = self._compaction_error, None
+        if error is not None:
+            raise RuntimeError(f'Background compaction of "{self.path}" failed: {error}') from error
+
+    def close(self):
+        self.stop_compaction()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _file(self, name:str) -> str:
+        return os.path.join(self.path, name)
+
+    def _refresh(self) -> dict:
+        """Manifest, re-read if another instance replaced the file"""
+        stat = os.stat(self._file('manifest.json'))
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._manifest_stat:
+            self._manifest = self._read_manifest()
+            self._manifest_stat = key
+        return self._manifest
+
+    def _write_manifest(self, manifest:dict):
+        _write_json_atomic(self._file('manifest.json'), manifest)
+        stat = os.stat(self._file('manifest.json'))
+        self._manifest = manifest
+        self._manifest_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read_manifest(self) -> dict:
+        with open(self._file('manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format', STORE_FORMAT) > STORE_FORMAT:
+            raise ValueError(f'Store format {manifest["format"]} of "{self.path}" '
+                             f'is newer than supported ({STORE_FORMAT}).')
+        return manifest
+
+    def _read_segment(self, name:str) -> list:
+        with open(self._file(name), encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _cursor_file(self, consumer:str) -> str:
+        if not isinstance(consumer, str) or not consumer:
+            raise ValueError(f'Expected a non-empty consumer name, instead got {consumer!r}')
+        return self._file(os.path.join('cursors', urllib.parse.quote(consumer, safe='') + '.json'))
+
+    def _log(self, entry:dict):
+        entry = dict(entry, time=time.time())
+        with open(self._file('changelog.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+def _validate(record:dict) -> dict:
+    """Stored form of a record: formula, source & properties"""
+    if not isinstance(record, dict) or not isinstance(record.get('formula'), str):
+        raise ValueError(f'Expected a dict with a "formula" string, instead got {record!r}')
+    properties = record.get('properties') or {}
+    if not isinstance(properties, dict):
+        raise ValueError(f'Expected "properties" to be a dict, instead got {properties!r}')
+    reserved = [key for key in properties if key in RECORD_KEYS]
+    if reserved:
+        raise ValueError(f"Property name '{reserved[0]}' is reserved.")
+    row = {'formula': record['formula'], 'source': record.get('source'),
+           'properties': properties}
+    try:
+        json.dumps(row)
+    except TypeError as err:
+        raise ValueError(f'Record is not JSON serializable: {err}') from None
+    return row
+
+def _segment_name(first:int, last:int) -> str:
+    return f'segment_{first:012d}_{last:012d}.jsonl'
+
+def _write_json_atomic(path:str, obj):
+    _write_atomic(path, json.dumps(obj))
+
+def _write_lines_atomic(path:str, rows:list):
+    _write_atomic(path, ''.join(json.dumps(row) + '\n' for row in rows))
+
+def _write_atomic(path:str, text:str):
+    """Replace a file by a durable one
+
+    The text goes to a uniquely named temp file in the same
+    directory (concurrent writers never share it), which is
+    flushed to disk before being renamed over the target.
+    """
+    folder, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    _fsync_dir(folder)
+
+def _fsync_dir(folder:str):
+    """Persist a rename (directories can't be opened on Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextlib.contextmanager
+def _file_lock(path:str):
+    """Exclusive lock of a file, blocking until other processes release it"""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
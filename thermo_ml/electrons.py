@@ -0,0 +1,180 @@
+import functools
+
+import numpy as np
+from thermo_ml import composition, database
+
+
+### Orbital types of the subshells in "database.SUBSHELLS"
+ORBITALS = ('s', 'p', 'd', 'f')
+# Electrons a subshell of each orbital type holds
+CAPACITY = {'s': 2, 'p': 6, 'd': 10, 'f': 14}
+# Atomic numbers of the noble gases, whose configurations are the cores
+NOBLE_GASES = (2, 10, 18, 36, 54, 86, 118)
+
+
+def valence_table(electron_configs:np.ndarray=None):
+    """Valence electrons & holes of every element, by orbital type
+
+    Valence electrons are those beyond the configuration of the
+    preceding noble gas (e.g. Zn = [Ar] 3d10 4s2 has 10 d and
+    2 s valence electrons). Holes are the missing electrons of
+    the partially filled valence subshells (e.g. 4 d holes
+    for Fe = [Ar] 3d6 4s2).
+
+    Args:
+        electron_configs (np.ndarray, optional): Array of shape
+            (N_ELEMENTS, len(database.SUBSHELLS)) of electron counts,
+            NaN or 0 for empty subshells. Defaults to the packed
+            'Electron config' columns of "database.Atoms", in
+            which case the tables are computed once and cached.
+
+    Returns:
+        np.ndarray: Valence electrons of shape (N_ELEMENTS, 4),
+            columns in the order of ORBITALS
+        np.ndarray: Holes of valence subshells, same shape.
+            Both NaN for elements of unknown configuration.
+    """
+    if electron_configs is None:
+        return _default_valence_table()
+    return _valence_table(np.asarray(electron_configs, dtype=np.float64))
+
+@functools.lru_cache(maxsize=None)
+def _default_valence_table():
+    configs, mask = database.get_electron_configs()
+    valence, unfilled = _valence_table(np.where(mask, configs, np.nan))
+    # Cached arrays are shared by all callers
+    valence.flags.writeable = False
+    unfilled.flags.writeable = False
+    return valence, unfilled
+
+def _valence_table(configs:np.ndarray):
+    shape = (composition.N_ELEMENTS, len(database.SUBSHELLS))
+    if configs.shape != shape:
+        raise ValueError(f'Expected electron_configs of shape {shape}, '
+                         f'instead got shape {configs.shape}')
+    known = np.isfinite(configs).any(axis=1)
+    configs = np.nan_to_num(configs)
+    ### Subtract the core, i.e. the last noble gas before each element
+    noble = np.array(NOBLE_GASES)
+    core = np.searchsorted(noble, np.arange(1, composition.N_ELEMENTS + 1)) - 1
+    has_core = core >= 0
+    core_rows = noble[core[has_core]] - 1
+    valence_configs = configs.copy()
+    valence_configs[has_core] -= configs[core_rows]
+    np.maximum(valence_configs, 0, out=valence_configs)
+    known[has_core] &= known[core_rows]
+    ### Sum subshells by orbital type
+    types = np.array([ORBITALS.index(s[-1]) for s in database.SUBSHELLS])
+    one_hot = (types[:, None] == np.arange(len(ORBITALS))).astype(np.float64)
+    capacity = np.array([CAPACITY[s[-1]] for s in database.SUBSHELLS], dtype=np.float64)
+    holes = np.where(valence_configs > 0, capacity - valence_configs, 0.0)
+    valence = valence_configs @ one_hot
+    unfilled = holes @ one_hot
+    valence[~known] = np.nan
+    unfilled[~known] = np.nan
+    return valence, unfilled
+
+def cumulative_ionization_energies(ionization_energies:np.ndarray=None) -> np.ndarray:
+    """Energy to remove the first q electrons of every element
+
+    Args:
+        ionization_energies (np.ndarray, optional): Array of shape
+            (N_ELEMENTS, n) of the 1st, 2nd ... nth ionization
+            energies (eV), NaN if unknown. Defaults to the packed
+            'Ionization energy (eV)' columns of "database.Atoms".
+
+    Returns:
+        np.ndarray: float64 array of shape (N_ELEMENTS, n + 1), column
+            q holding the sum of the first q ionization energies
+            (eV), column 0 being 0. NaN from the first unknown one.
+    """
+    if ionization_energies is None:
+        ionization_energies = database.get_ionization_energies()[0]
+    ionization_energies = np.asarray(ionization_energies, dtype=np.float64)
+    if ionization_energies.ndim != 2 or len(ionization_energies) != composition.N_ELEMENTS:
+        raise ValueError(f'Expected ionization_energies of shape ({composition.N_ELEMENTS}, n), '
+                         f'instead got shape {ionization_energies.shape}')
+    cumulative = np.zeros((len(ionization_energies), ionization_energies.shape[1] + 1))
+    np.cumsum(ionization_energies, axis=1, out=cumulative[:, 1:])
+    return cumulative
+
+def valence_features(formulas, electron_configs:np.ndarray=None) -> dict:
+    """Atomic-fraction weighted valence electrons & holes of many formulas
+
+    Formulas containing an element of unknown electron
+    configuration get NaN.
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas (e.g. ['CaO', 'Fe2O3']) or dictionaries of
+            atom counts.
+        electron_configs (np.ndarray, optional): See
+            "valence_table". Defaults to None.
+
+    Returns:
+        dict: key=feature name, value=np.ndarray of length n_formulas
+            'mean_<o>_valence': mean valence electrons in o orbitals
+                (o in ORBITALS)
+            'mean_valence': mean valence electrons
+            'mean_<o>_unfilled': mean holes in o orbitals
+            'mean_unfilled': mean holes
+    """
+    valence, unfilled = valence_table(electron_configs)
+    batch = composition.as_batch(formulas).normalize()
+    features = {}
+    for name, table in (('valence', valence), ('unfilled', unfilled)):
+        sums = _weighted_sums(batch, table)
+        for i, orbital in enumerate(ORBITALS):
+            features[f'mean_{orbital}_{name}'] = sums[:, i]
+        features[f'mean_{name}'] = sums.sum(axis=1)
+    return features
+
+def ionization_features(formulas, charges=1, ionization_energies:np.ndarray=None) -> dict:
+    """Cumulative ionization energy of the atoms of many formulas
+
+    Fractional charges (e.g. mean oxidation states such as 8/3
+    in Fe3O4) are interpolated between the two whole charges
+    around them. Negative charges cost nothing. Charges beyond
+    the known ionization energies give NaN.
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas or dictionaries of atom counts.
+        charges (float|np.ndarray, optional): Charge of every atom,
+            or array of one charge per (formula, element) entry of
+            "composition.as_batch(formulas)". Defaults to 1.
+        ionization_energies (np.ndarray, optional): See
+            "cumulative_ionization_energies". Defaults to None.
+
+    Returns:
+        dict: key=feature name, value=np.ndarray of length n_formulas
+            'mean_cumulative_ie': atomic-fraction weighted mean (eV)
+            'max_cumulative_ie': largest over the elements (eV)
+    """
+    cumulative = cumulative_ionization_energies(ionization_energies)
+    batch = composition.as_batch(formulas)
+    ids = batch.element_ids.astype(np.intp)
+    charges = np.broadcast_to(np.asarray(charges, dtype=np.float64), ids.shape)
+    charges = np.maximum(charges, 0.0)
+    n_max = cumulative.shape[1] - 1
+    low = np.minimum(np.floor(charges), n_max).astype(np.intp)
+    high = np.minimum(low + 1, n_max)
+    fraction = charges - low
+    energies = np.where(fraction > 0,
+                        (1.0 - fraction) * cumulative[ids, low] + fraction * cumulative[ids, high],
+                        cumulative[ids, low])
+    energies[charges > n_max] = np.nan
+    fractions = batch.normalize().counts
+    mean = np.bincount(batch.row_ids, weights=fractions * energies, minlength=len(batch))
+    maximum = np.full(len(batch), np.nan)
+    nonempty = np.diff(batch.offsets) > 0
+    if len(energies):
+        # np.maximum propagates NaN of unknown energies
+        maximum[nonempty] = np.maximum.reduceat(energies, batch.offsets[:-1][nonempty])
+    return {'mean_cumulative_ie': mean, 'max_cumulative_ie': maximum}
+
+def _weighted_sums(batch:composition.CompositionBatch, table:np.ndarray) -> np.ndarray:
+    """Per formula sums of counts x table rows of its elements"""
+    rows = table[batch.element_ids] * batch.counts[:, None]
+    return np.stack([np.bincount(batch.row_ids, weights=rows[:, j], minlength=len(batch))
+                     for j in range(table.shape[1])], axis=1)
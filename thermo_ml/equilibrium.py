@@ -0,0 +1,543 @@
+import numpy as np
+from thermo_ml import composition
+
+
+GAS_CONSTANT = 8.314462618 # J/(mol K)
+# Standard pressure that gas G(T) refer to (bar)
+STANDARD_PRESSURE = 1.0
+
+
+def gibbs_energy(coefficients, temperatures) -> np.ndarray:
+    """CALPHAD-style Gibbs energy G(T) of many species
+
+    G = a + b T + c T ln(T) + d T^2 + e T^3 + f / T
+
+    Args:
+        coefficients (array-like): Shape (n_species, 6) of
+            [a, b, c, d, e, f] per species (J/mol).
+            Missing trailing coefficients count as 0.
+        temperatures (array-like): Temperatures (K).
+
+    Returns:
+        np.ndarray: G of shape (n_temperatures, n_species) in J/mol
+    """
+    coefficients = np.atleast_2d(np.asarray(coefficients, dtype=np.float64))
+    coefficients = np.pad(coefficients, [(0, 0), (0, 6 - coefficients.shape[1])])
+    T = np.asarray(temperatures, dtype=np.float64)[:, None]
+    terms = np.stack([np.ones_like(T), T, T * np.log(T), T**2, T**3, 1.0 / T], axis=-1)
+    return (terms * coefficients[None, :, :]).sum(axis=-1)
+
+
+class EquilibriumResult:
+    def __init__(self, species, phases, elements, temperatures,
+                 amounts, gibbs, potentials, converged):
+        """Equilibrium state over a grid of temperatures x compositions
+
+        Attributes:
+            species (tuple): Species names.
+            phases (tuple): 'gas' or 'condensed' per species.
+            elements (tuple): Atomic symbols.
+            temperatures (np.ndarray): Shape (n_temperatures,)
+            amounts (np.ndarray): Moles of each species per mole
+                of atoms of the input composition, shape
+                (n_temperatures, n_compositions, n_species).
+            gibbs (np.ndarray): Total Gibbs energy (J) per mole
+                of atoms, shape (n_temperatures, n_compositions).
+            potentials (np.ndarray): Chemical potentials of the
+                elements (J/mol), shape (n_temperatures,
+                n_compositions, n_elements). NaN for elements
+                absent from a composition.
+            converged (np.ndarray): Bool, shape
+                (n_temperatures, n_compositions). False for points
+                that are infeasible (an element no species can
+                hold) or didn't converge; their values are NaN.
+        """
+        self.species = species
+        self.phases = phases
+        self.elements = elements
+        self.temperatures = temperatures
+        self.amounts = amounts
+        self.gibbs = gibbs
+        self.potentials = potentials
+        self.converged = converged
+
+    def stable(self, threshold:float=1e-8) -> np.ndarray:
+        """Bool mask of species present, same shape as "amounts"
+
+        Args:
+            threshold (float, optional): Minimum amount.
+                Defaults to 1e-8.
+        """
+        return self.amounts > threshold
+
+    def mole_fractions(self) -> np.ndarray:
+        """Mole fractions of gas species within the gas phase"""
+        gas = np.array([p == 'gas' for p in self.phases])
+        amounts = np.where(gas, self.amounts, 0.0)
+        totals = amounts.sum(axis=-1, keepdims=True)
+        return np.divide(amounts, totals, out=np.zeros_like(amounts), where=totals > 0)
+
+
+class EquilibriumSolver:
+    def __init__(self, gases:dict=None, condensed:dict=None, gibbs:dict=None):
+        """Gibbs energy minimizer for an ideal gas + stoichiometric condensed phases
+
+        The minimum is found through its convex dual, i.e. the
+        chemical potentials of the elements, with a log-barrier
+        Newton method. Each Newton step is a small
+        (n_elements x n_elements) linear system, so all points of
+        a temperature x composition grid are stepped together in
+        one vectorized array operation.
+
+        Args:
+            gases (dict|list, optional): Gas species, key=name,
+                value=chemical formula (e.g. {'H2O(g)': 'H2O'}).
+                A list of formulas uses them as names.
+                Defaults to None.
+            condensed (dict|list, optional): Stoichiometric condensed
+                phases (e.g. {'C(s)': 'C', 'CaO(s)': 'CaO'}).
+                Defaults to None.
+            gibbs (dict): key=species name, value=either a list
+                of CALPHAD coefficients (see "gibbs_energy") or a
+                function of a temperature array returning G (J/mol).
+                Gas G refer to STANDARD_PRESSURE.
+
+        Raises:
+            ValueError: Missing G(T) for a species
+        """
+        gases = _as_named(gases)
+        condensed = _as_named(condensed)
+        self.species = tuple(gases) + tuple(condensed)
+        self.phases = ('gas',) * len(gases) + ('condensed',) * len(condensed)
+        if len(set(self.species)) != len(self.species):
+            raise ValueError('Species names must be unique across phases, '
+                             f'instead got {self.species}')
+        gibbs = gibbs or {}
+        missing = [s for s in self.species if s not in gibbs]
+        if missing:
+            raise ValueError(f'Missing G(T) for species {missing}')
+        self.gibbs = {s: gibbs[s] for s in self.species}
+        ### Element x species matrix
+        formulas = list(gases.values()) + list(condensed.values())
+        matrix = composition.to_matrix(formulas, normalize=False)
+        self._element_ids = np.flatnonzero(matrix.any(axis=0))
+        self.elements = tuple(composition.ELEMENTS[i] for i in self._element_ids)
+        self.matrix = matrix[:, self._element_ids].T
+        self._is_gas = np.array([p == 'gas' for p in self.phases])
+
+    def species_gibbs(self, temperatures) -> np.ndarray:
+        """G(T) of all species, shape (n_temperatures, n_species) in J/mol"""
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        columns = []
+        for s in self.species:
+            g = self.gibbs[s]
+            if callable(g):
+                columns.append(np.broadcast_to(g(temperatures), temperatures.shape))
+            else:
+                columns.append(gibbs_energy([g], temperatures)[:, 0])
+        return np.stack(columns, axis=-1)
+
+    def solve(self, temperatures, compositions, pressure:float=1.0,
+              warm_start:bool=True, warm_stride:int=8, tol:float=1e-9,
+              max_iter:int=200) -> EquilibriumResult:
+        """Equilibrium at every temperature x composition of a grid
+
+        Args:
+            temperatures (array-like): Temperatures (K).
+            compositions (iterable of str|dict): Overall
+                compositions (e.g. ['CO2', 'C2O3', {'H': 2, 'O': 1}]).
+            pressure (float, optional): Total pressure (bar).
+                Defaults to 1.0.
+            warm_start (bool, optional): If True, every
+                "warm_stride"-th temperature is solved from scratch
+                first. All other points then start from the
+                solution interpolated between the two solved
+                temperatures around them, and solve the equilibrium
+                conditions directly for the phases present there
+                (see "_refine"). Points where that doesn't give the
+                minimum (e.g. a phase boundary in between) are
+                solved from scratch. If False, the whole grid is
+                solved in one call from scratch. Defaults to True.
+            warm_stride (int, optional): Spacing of the
+                temperatures solved from scratch. Defaults to 8.
+            tol (float, optional): Duality gap (in units of RT per
+                mole of atoms) at which a point is converged.
+                Defaults to 1e-9.
+            max_iter (int, optional): Max. Newton steps per barrier
+                stage. Defaults to 200.
+
+        Returns:
+            EquilibriumResult: Equilibrium state of every grid point
+        """
+        T = np.atleast_1d(np.asarray(temperatures, dtype=np.float64))
+        ### Element amounts of each composition (per mole of atoms)
+        X = composition.to_matrix(compositions)
+        unknown = np.delete(X, self._element_ids, axis=1).sum(axis=1) > 0
+        b = X[:, self._element_ids]
+        ### Reduced chemical potentials mu/RT, shape (n_T, n_species)
+        mu = self.species_gibbs(T) / (GAS_CONSTANT * T[:, None])
+        mu = mu + np.where(self._is_gas, np.log(pressure / STANDARD_PRESSURE), 0.0)
+        n_T, n_c, n_e = len(T), len(b), len(self.elements)
+        n_s = len(self.species)
+        mu_grid = np.broadcast_to(mu[:, None, :], (n_T, n_c, n_s))
+        b_grid = np.broadcast_to(b[None, :, :], (n_T, n_c, n_e))
+        lam = np.full((n_T, n_c, n_e), np.nan)
+        amounts = np.full((n_T, n_c, n_s), np.nan)
+        converged = np.zeros((n_T, n_c), dtype=bool)
+        ### Coarse pass from scratch, then everything else in one
+        #   call starting from the coarse temperatures around it
+        coarse = np.zeros(n_T, dtype=bool)
+        coarse[::warm_stride if warm_start else 1] = True
+        coarse[-1] = True
+        for k, rows in enumerate([coarse, ~coarse]):
+            if not rows.any():
+                continue
+            lam0 = amounts0 = None
+            if k == 1:
+                # Linear in T between the coarse neighbours: amounts
+                # keep the mass balance, potentials (RT lam) are smooth
+                coarse_idx = np.flatnonzero(coarse)
+                hi = np.searchsorted(coarse_idx, np.flatnonzero(rows))
+                lo, hi = coarse_idx[hi - 1], coarse_idx[hi]
+                w = ((T[rows] - T[lo]) / (T[hi] - T[lo]))[:, None, None]
+                potentials = lam * T[:, None, None]
+                lam0 = ((1 - w) * potentials[lo] + w * potentials[hi]) / T[rows][:, None, None]
+                lam0 = lam0.reshape(-1, n_e)
+                amounts0 = ((1 - w) * amounts[lo] + w * amounts[hi]).reshape(-1, n_s)
+            lam_k, amounts_k, converged_k = self._solve_points(
+                mu_grid[rows].reshape(-1, n_s), b_grid[rows].reshape(-1, n_e),
+                lam0=lam0, amounts0=amounts0, tol=tol, max_iter=max_iter)
+            lam[rows] = lam_k.reshape(-1, n_c, n_e)
+            amounts[rows] = amounts_k.reshape(-1, n_c, n_s)
+            converged[rows] = converged_k.reshape(-1, n_c)
+        ### Infeasible compositions
+        converged[:, unknown] = False
+        amounts[~converged] = np.nan
+        lam[~converged] = np.nan
+        ### G = RT sum(n_i mu_i) with mu_i incl. ln(x_i) for gases
+        RT = GAS_CONSTANT * T[:, None]
+        gibbs = RT * np.einsum('tce,ce->tc', np.nan_to_num(lam, nan=0.0), b)
+        gibbs[~converged] = np.nan
+        potentials = RT[:, :, None] * np.where(b[None, :, :] > 0, lam, np.nan)
+        return EquilibriumResult(self.species, self.phases, self.elements, T,
+                                 amounts, gibbs, potentials, converged)
+
+    def _solve_points(self, mu:np.ndarray, b:np.ndarray, lam0:np.ndarray=None,
+                      amounts0:np.ndarray=None, tol:float=1e-9, max_iter:int=200,
+                      t0:float=1.0, t_factor:float=20.0):
+        """Log-barrier Newton method on the dual, vectorized over points
+
+        Dual problem per point:
+            maximize    b.lam
+            subject to  logsumexp_(gas i) (A_i.lam - mu_i) <= 0
+                        A_j.lam <= mu_j   (condensed j)
+        Primal amounts follow from the barrier multipliers.
+
+        Args:
+            mu (np.ndarray): mu/RT, shape (n_points, n_species)
+            b (np.ndarray): Element amounts, shape (n_points, n_elements)
+            lam0 (np.ndarray, optional): Start (e.g. neighbouring
+                grid point). Defaults to None.
+            amounts0 (np.ndarray, optional): Species amounts of the
+                start, telling which phases are present. If given
+                with lam0, "_refine" is tried first and the barrier
+                method only runs (from scratch) for the points it
+                doesn't solve. Defaults to None.
+
+        Returns:
+            np.ndarray: lam, shape (n_points, n_elements)
+            np.ndarray: Species amounts, shape (n_points, n_species)
+            np.ndarray: Bool converged, shape (n_points,)
+        """
+        A = self.matrix
+        n_points, n_e = b.shape
+        if lam0 is not None and amounts0 is not None:
+            lam, amounts, converged = self._refine(lam0, amounts0, mu, b, tol=tol)
+            rest = np.flatnonzero(~converged)
+            if len(rest):
+                lam[rest], amounts[rest], converged[rest] = self._solve_points(
+                    mu[rest], b[rest], tol=tol, max_iter=max_iter,
+                    t0=t0, t_factor=t_factor)
+            return lam, amounts, converged
+        ### Species & elements taking part at each point
+        active_e, gas, cond = self._active(b)
+        # Every element present must fit in some species
+        feasible = np.all(~active_e | (((gas | cond).astype(float) @ A.T) > 0), axis=1)
+        has_gas = gas.any(axis=1)
+        n_constraints = has_gas + cond.sum(axis=1)
+        ### Feasible start
+        lam = np.zeros((n_points, n_e)) if lam0 is None else np.nan_to_num(lam0).copy()
+        lam[~active_e] = 0.0
+        lam = self._pull_back(lam, mu, gas, cond, active_e)
+        t = np.full(n_points, t0)
+        t[n_constraints == 0] = np.inf
+        done = ~feasible | (n_constraints / t < tol)
+        converged = np.zeros(n_points, dtype=bool)
+        ### Barrier stages
+        while not done.all():
+            idx = np.flatnonzero(~done)
+            lam[idx], ok = self._newton(lam[idx], t[idx], mu[idx], b[idx],
+                                        gas[idx], cond[idx], active_e[idx], max_iter)
+            converged[idx] = ok
+            done[idx[~ok]] = True
+            t[idx] *= t_factor
+            done[idx] |= n_constraints[idx] / t[idx] < tol
+        converged &= feasible
+        converged[n_constraints == 0] = False
+        amounts = self._amounts(lam, t / t_factor, mu, b, gas, cond)
+        return lam, amounts, converged
+
+    def _active(self, b:np.ndarray) -> tuple:
+        """Bool masks of the elements, gas & condensed species at each point"""
+        active_e = b > 0
+        active_s = ~((~active_e) @ (self.matrix > 0)) # all elements present
+        return active_e, active_s & self._is_gas, active_s & ~self._is_gas
+
+    def _refine(self, lam0, amounts0, mu, b, tol:float=1e-9, residual:float=1e-12,
+                max_iter:int=20):
+        """Newton's method on the equilibrium conditions, phases fixed
+
+        With the phases present at the start (condensed species
+        & the gas phase) taken as the equilibrium ones, the
+        minimum of G solves, per point,
+            A_j.lam = mu_j                          condensed j present
+            logsumexp_(gas i) (A_i.lam - mu_i) = 0  if gas present
+            N A x(lam) + sum_j n_j A_j = b          mass balance
+        for lam, the moles of gas N and of condensed phases n_j,
+        where x are the gas mole fractions. From a nearby start
+        this takes a few steps instead of a barrier method's
+        hundred. A point counts as solved only if the result is
+        the minimum, i.e. N, n_j >= 0 and no other phase would
+        lower G (A_j.lam <= mu_j, logsumexp <= 0 if no gas).
+
+        Args:
+            tol (float, optional): Smallest amount of a phase
+                present, and margin of the optimality checks.
+                Defaults to 1e-9.
+            residual (float, optional): Max. residual of the
+                conditions when converged. Defaults to 1e-12.
+
+        Returns:
+            np.ndarray: lam, shape (n_points, n_elements)
+            np.ndarray: Species amounts, shape (n_points, n_species)
+            np.ndarray: Bool solved, shape (n_points,)
+        """
+        A = self.matrix
+        n_points, n_e = b.shape
+        n_s = A.shape[1]
+        active_e, gas, cond = self._active(b)
+        # Starts from unsolved neighbours are left to the barrier method
+        usable = np.isfinite(lam0).all(axis=1) & np.isfinite(amounts0).all(axis=1)
+        amounts0 = np.nan_to_num(amounts0)
+        ### Phases present at the start; unknowns [lam, N, n]
+        n_gas = np.where(gas, amounts0, 0.0).sum(axis=1)
+        has_gas = n_gas > tol
+        present = cond & (amounts0 > tol)
+        lam = np.where(active_e, np.nan_to_num(lam0), 0.0)
+        N = np.where(has_gas, n_gas, 0.0)
+        n = np.where(present, amounts0, 0.0)
+        rows_e, rows_s = np.arange(n_e), n_e + 1 + np.arange(n_s)
+        todo = usable.copy()
+        for _ in range(max_iter):
+            idx = np.flatnonzero(todo)
+            if len(idx) == 0:
+                break
+            z = lam[idx] @ A - mu[idx]
+            f = _logsumexp(np.where(gas[idx], z, -np.inf))
+            with np.errstate(invalid='ignore', over='ignore'):
+                x = np.where(gas[idx], np.exp(z - f[:, None]), 0.0)
+            u = x @ A.T
+            ### Residuals
+            r = np.zeros((len(idx), n_e + 1 + n_s))
+            r[:, rows_e] = np.where(active_e[idx], N[idx, None] * u + n[idx] @ A.T - b[idx],
+                                    lam[idx])
+            r[:, n_e] = np.where(has_gas[idx], f, N[idx])
+            r[:, rows_s] = np.where(present[idx], z, n[idx])
+            converged = np.abs(r).max(axis=1) <= residual
+            todo[idx[converged]] = False
+            idx, r, x, u = idx[~converged], r[~converged], x[~converged], u[~converged]
+            if len(idx) == 0:
+                break
+            ### Jacobian, identity rows for fixed unknowns
+            J = np.zeros((len(idx), n_e + 1 + n_s, n_e + 1 + n_s))
+            centered = A[None, :, :] - u[:, :, None]
+            C = np.einsum('ps,pes,pks->pek', x, centered, centered)
+            e, g, p = active_e[idx], has_gas[idx], present[idx]
+            J[:, :n_e, :n_e] = np.where(e[:, :, None], N[idx, None, None] * C,
+                                        np.eye(n_e)[None])
+            J[:, :n_e, n_e] = np.where(e, u, 0.0)
+            J[:, :n_e, n_e + 1:] = np.where(e[:, :, None] & p[:, None, :], A[None], 0.0)
+            J[:, n_e, :n_e] = np.where(g[:, None], u, 0.0)
+            J[:, n_e, n_e] = ~g
+            J[:, n_e + 1:, :n_e] = np.where(p[:, :, None], A.T[None], 0.0)
+            J[:, rows_s, rows_s] = ~p
+            try:
+                step = np.linalg.solve(J, -r[:, :, None])[:, :, 0]
+            except np.linalg.LinAlgError: # phases not independent
+                step = (np.linalg.pinv(J) @ -r[:, :, None])[:, :, 0]
+            lam[idx] += step[:, :n_e]
+            N[idx] += step[:, n_e]
+            n[idx] += step[:, n_e + 1:]
+        ### Optimal (& finite) only
+        z = lam @ A - mu
+        f = _logsumexp(np.where(gas, z, -np.inf))
+        with np.errstate(invalid='ignore', over='ignore'):
+            x = np.where(gas, np.exp(z - f[:, None]), 0.0)
+            solved = usable & ~todo & np.isfinite(lam).all(axis=1) & (N >= 0) & (n >= 0).all(axis=1)
+            solved &= ~(cond & ~present & (z > tol)).any(axis=1)
+            solved &= has_gas | ~gas.any(axis=1) | (f <= tol)
+        amounts = N[:, None] * x + n
+        return lam, amounts, solved
+
+    def _amounts(self, lam, t, mu, b, gas, cond) -> np.ndarray:
+        """Species amounts at the solution of the dual
+
+        The gas composition follows from lam. The barrier multipliers
+        tell which condensed phases are present; the amounts of those
+        and of the gas are then fixed by mass balance (least squares),
+        which is far more accurate than the multipliers themselves.
+        """
+        A = self.matrix
+        z = lam @ A - mu
+        f = _logsumexp(np.where(gas, z, -np.inf))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            x = np.where(gas, np.exp(z - f[:, None]), 0.0)
+            present = cond & (1.0 / (t[:, None] * -z) > 1e3 / t[:, None])
+        ### Columns: gas phase (composition x), then condensed phases
+        columns = np.concatenate([(x @ A.T)[:, :, None],
+                                  A[None, :, :] * present[:, None, :]], axis=2)
+        moles = (np.linalg.pinv(columns) @ b[:, :, None])[:, :, 0]
+        moles = np.maximum(np.nan_to_num(moles), 0.0)
+        amounts = moles[:, :1] * x
+        amounts += np.where(present, moles[:, 1:], 0.0)
+        return amounts
+
+    def _newton(self, lam, t, mu, b, gas, cond, active_e, max_iter):
+        """Minimize the barrier function at fixed t for a set of points"""
+        logs = self._log_barrier(lam, mu, gas, cond)
+        active = np.ones(len(lam), dtype=bool)
+        for _ in range(max_iter):
+            idx = np.flatnonzero(active)
+            if len(idx) == 0:
+                break
+            grad, step = self._newton_step(lam[idx], t[idx], mu[idx], b[idx],
+                                           gas[idx], cond[idx], active_e[idx])
+            decrement = -(grad * step).sum(axis=1)
+            # Converged points stop here, as well as those whose step
+            # is lost in rounding (at large t, t b.lam dwarfs the rest)
+            tiny = np.abs(step).max(axis=1) <= 1e-12 * (1.0 + np.abs(lam[idx]).max(axis=1))
+            finished = (np.abs(decrement) < 1e-9) | tiny
+            active[idx[finished]] = False
+            idx, step, decrement = idx[~finished], step[~finished], decrement[~finished]
+            ### Backtracking line search (feasibility & sufficient decrease)
+            #   The change of the barrier function is computed term by
+            #   term, since t * b.lam dwarfs it at large t.
+            linear = (b[idx] * step).sum(axis=1)
+            alpha = np.ones(len(idx))
+            accepted = np.zeros(len(idx), dtype=bool)
+            for _ in range(60):
+                todo = np.flatnonzero(~accepted)
+                if len(todo) == 0:
+                    break
+                j = idx[todo]
+                trial = lam[j] + alpha[todo, None] * step[todo]
+                logs_trial = self._log_barrier(trial, mu[j], gas[j], cond[j])
+                change = -t[j] * alpha[todo] * linear[todo] + (logs_trial - logs[j])
+                ok = change <= -0.25 * alpha[todo] * decrement[todo]
+                lam[j[ok]] = trial[ok]
+                logs[j[ok]] = logs_trial[ok]
+                accepted[todo[ok]] = True
+                alpha[todo[~ok]] *= 0.5
+            # No progress possible: as good as floating point allows
+            active[idx[~accepted]] = False
+        return lam, ~active
+
+    def _log_barrier(self, lam, mu, gas, cond) -> np.ndarray:
+        """Logarithmic barrier terms, +inf outside the feasible region"""
+        z = lam @ self.matrix - mu
+        f = _logsumexp(np.where(gas, z, -np.inf))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = -np.where(gas.any(axis=1), np.log(-f), 0.0)
+            logs -= np.where(cond, np.log(-z), 0.0).sum(axis=1)
+        infeasible = (gas.any(axis=1) & ~(f < 0)) | (cond & ~(z < 0)).any(axis=1)
+        logs[infeasible | np.isnan(logs)] = np.inf
+        return logs
+
+    def _newton_step(self, lam, t, mu, b, gas, cond, active_e):
+        """Gradient of the barrier function & Newton step
+
+        The Hessian is K + u u^T / f^2, where u is the gradient of
+        the gas constraint f. Close to the optimum f -> 0 and the rank
+        one term dwarfs K, which can be nearly singular itself. A
+        Householder reflection turns u into the first axis, so that
+        the huge term sits alone on the diagonal where elimination
+        handles it accurately.
+
+        Returns:
+            np.ndarray: Gradient, shape (n_points, n_elements)
+            np.ndarray: Newton step, same shape
+        """
+        A = self.matrix
+        n_e = A.shape[0]
+        z = lam @ A - mu
+        has_gas = gas.any(axis=1)
+        f = _logsumexp(np.where(gas, z, -np.inf))
+        f = np.where(has_gas, f, -1.0) # any value, gas terms are zeroed
+        x = np.where(gas, np.exp(z - f[:, None]), 0.0)
+        u = x @ A.T
+        inv_s = np.where(cond, 1.0 / np.where(cond, -z, 1.0), 0.0)
+        grad = -t[:, None] * b + u / -f[:, None] + inv_s @ A.T
+        ### K: covariance of gas species compositions under x, formed
+        #   from centered columns (A diag(x) A^T - u u^T cancels badly
+        #   when one species dominates), plus the condensed phases
+        centered = A[None, :, :] - u[:, :, None]
+        K = np.einsum('ps,pes,pks->pek', x / -f[:, None], centered, centered)
+        K += np.einsum('ps,es,ks->pek', inv_s**2, A, A)
+        # Elements absent from a point don't move
+        eye = np.eye(n_e)[None]
+        K += eye * (~active_e)[:, :, None]
+        ### Reflection Q (symmetric, orthogonal) with Q u = -sign(u_0) |u| e_0
+        norm_u = np.linalg.norm(u, axis=1)
+        w = u / np.where(norm_u > 0, norm_u, 1.0)[:, None]
+        v = w.copy()
+        v[:, 0] += np.where(w[:, 0] >= 0, 1.0, -1.0)
+        Q = eye - 2.0 * v[:, :, None] * v[:, None, :] / (v * v).sum(axis=1)[:, None, None]
+        Q[norm_u == 0] = np.eye(n_e)
+        H = Q @ K @ Q
+        H[:, 0, 0] += (norm_u / f)**2
+        # Directions only trace species constrain are nearly flat
+        ridge = 1e-14 * np.abs(np.diagonal(K, axis1=1, axis2=2)).max(axis=1) + 1e-300
+        H += eye * ridge[:, None, None]
+        y = np.linalg.solve(H, -(Q @ grad[:, :, None]))
+        step = (Q @ y)[:, :, 0]
+        return grad, step
+
+    def _pull_back(self, lam, mu, gas, cond, active_e) -> np.ndarray:
+        """Shift lam down until strictly inside the feasible region
+
+        All matrix entries are >= 0, so lowering every active
+        element potential by c lowers A_i.lam by c * sum(A_i).
+        """
+        A = self.matrix
+        atoms = np.maximum(active_e.astype(float) @ A, 1e-12)
+        z = lam @ A - mu
+        n_gas = np.maximum(gas.sum(axis=1, keepdims=True), 1)
+        need = np.where(gas, (z + np.log(n_gas) + 1.0) / atoms, -np.inf)
+        need = np.maximum(need, np.where(cond, (z + 1.0) / atoms, -np.inf))
+        shift = np.maximum(need.max(axis=1, initial=-np.inf), 0.0)
+        return lam - shift[:, None] * active_e
+
+def _logsumexp(z:np.ndarray) -> np.ndarray:
+    """logsumexp over the last axis, -inf for rows of all -inf"""
+    z_max = z.max(axis=-1, initial=-np.inf)
+    safe_max = np.where(np.isfinite(z_max), z_max, 0.0)
+    with np.errstate(divide='ignore'):
+        return safe_max + np.log(np.exp(z - safe_max[..., None]).sum(axis=-1))
+
+def _as_named(species) -> dict:
+    """{name: formula} from a dict or a list of formulas"""
+    if species is None:
+        return {}
+    if isinstance(species, dict):
+        return dict(species)
+    return {s: s for s in species}
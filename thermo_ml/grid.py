@@ -0,0 +1,279 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+### Tables shared with worker processes
+#   key = table name, value = read-only np.ndarray view of shared memory
+_TABLES = {}
+# Shared memory blocks attached by a worker (kept alive while it runs)
+_BLOCKS = []
+
+
+class GridSweep:
+    def __init__(self, function, tables:dict=None, n_jobs:int=None,
+                 tile_size:int=256, checkpoint_dir:str=None):
+        """Evaluate a function over a grid of independent points on many cores
+
+        The grid (e.g. composition x temperature) is cut into tiles
+        of "tile_size" points, each evaluated in one call of
+        "function" on a process pool. Large read-only tables (e.g.
+        element properties, compound G(T)) are put in shared memory
+        once, instead of being pickled with every tile.
+
+        Args:
+            function (callable): function(points, **tables) returning
+                an array with one row per point, where points is a
+                (n_points, n_axes) float64 array. Must be picklable,
+                i.e. defined at the top level of a module.
+            tables (dict, optional): key=name, value=np.ndarray passed
+                to every call of "function" as keyword arguments.
+                Workers receive read-only views. Defaults to None.
+            n_jobs (int, optional): Number of worker processes.
+                1 runs in the calling process. Defaults to None,
+                meaning the number of CPUs.
+            tile_size (int, optional): Points per tile. Defaults to 256.
+            checkpoint_dir (str, optional): Directory where every
+                finished tile is saved. Running the same sweep (same
+                function, tables, points & tile size) again only
+                evaluates the missing tiles. Defaults to None.
+        """
+        self.function = function
+        self.tables = {name: np.ascontiguousarray(table)
+                       for name, table in (tables or {}).items()}
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.checkpoint_dir = checkpoint_dir
+
+    def run(self, axes) -> np.ndarray:
+        """Evaluate every point of the grid spanned by the axes
+
+        Args:
+            axes (list of array-like): Coordinates along each axis
+                (e.g. [x_CaO, temperatures]).
+
+        Returns:
+            np.ndarray: Values of shape (len(axes[0]), len(axes[1]),
+                ..., *shape of one row of "function" output)
+        """
+        axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+        points = grid_points(axes)
+        values = self.evaluate(points, name='grid')
+        return values.reshape(tuple(len(axis) for axis in axes) + values.shape[1:])
+
+    def refine(self, axes, values:np.ndarray, levels:int=4, boundary=None):
+        """Add points only where the answer changes (e.g. phase boundaries)
+
+        Every grid edge whose end points have different values is
+        bisected; the half-edges whose ends still differ are
+        bisected again, "levels" times in total. Each level is
+        evaluated in one parallel sweep. After k levels a boundary
+        is located within 1/2^k of the grid spacing.
+
+        Args:
+            axes (list of array-like): Axes given to "run".
+            values (np.ndarray): Values returned by "run".
+            levels (int, optional): Number of bisections. Defaults to 4.
+            boundary (callable, optional): boundary(a, b) returning a
+                bool array, True where rows a and b lie on different
+                sides of a boundary. Defaults to None, meaning
+                any differing entry (suits labels such as stable
+                phase ids, not continuous properties).
+
+        Returns:
+            np.ndarray: New points, shape (n_new, n_axes)
+            np.ndarray: Their values, one row per point
+        """
+        axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+        values = np.asarray(values)
+        n_axes = len(axes)
+        values_shape = values.shape[n_axes:]
+        boundary = boundary or _differs
+        ### Edges of the grid between points of different values
+        starts, ends, start_values, end_values = [], [], [], []
+        index = np.indices(values.shape[:n_axes]).reshape(n_axes, -1).T
+        for axis in range(n_axes):
+            head = index[index[:, axis] < values.shape[axis] - 1]
+            tail = head.copy()
+            tail[:, axis] += 1
+            a, b = values[tuple(head.T)], values[tuple(tail.T)]
+            changed = boundary(a, b)
+            starts.append(_coordinates(axes, head[changed]))
+            ends.append(_coordinates(axes, tail[changed]))
+            start_values.append(a[changed])
+            end_values.append(b[changed])
+        starts, ends = np.concatenate(starts), np.concatenate(ends)
+        start_values, end_values = np.concatenate(start_values), np.concatenate(end_values)
+        ### Bisect
+        new_points, new_values = [], []
+        for level in range(levels):
+            if len(starts) == 0:
+                break
+            middles = 0.5 * (starts + ends)
+            middle_values = self.evaluate(middles, name=f'refine_{level}')
+            new_points.append(middles)
+            new_values.append(middle_values)
+            # Keep the half(s) still crossing a boundary
+            left = boundary(start_values, middle_values)
+            right = boundary(middle_values, end_values)
+            starts = np.concatenate([starts[left], middles[right]])
+            ends = np.concatenate([middles[left], ends[right]])
+            start_values = np.concatenate([start_values[left], middle_values[right]])
+            end_values = np.concatenate([middle_values[left], end_values[right]])
+        if not new_points:
+            return (np.empty((0, n_axes)),
+                    np.empty((0,) + values_shape, dtype=values.dtype))
+        return np.concatenate(new_points), np.concatenate(new_values)
+
+    def evaluate(self, points:np.ndarray, name:str='points') -> np.ndarray:
+        """Evaluate "function" on arbitrary points, tile by tile
+
+        Args:
+            points (np.ndarray): Shape (n_points, n_axes)
+            name (str, optional): Checkpoint name of this set of
+                points. Defaults to 'points'.
+
+        Raises:
+            ValueError: Checkpoint of the same name holds another
+                function, tables, points or tile size
+
+        Returns:
+            np.ndarray: Values, one row per point
+        """
+        points = np.ascontiguousarray(points, dtype=np.float64)
+        tiles = [points[i:i + self.tile_size]
+                 for i in range(0, len(points), self.tile_size)]
+        results = [None] * len(tiles)
+        checkpoint = self._checkpoint(name, points)
+        if checkpoint:
+            for i in range(len(tiles)):
+                path = _tile_path(checkpoint, i)
+                if os.path.exists(path):
+                    results[i] = np.load(path)
+        todo = [i for i, result in enumerate(results) if result is None]
+        for i, result in self._map(tiles, todo):
+            results[i] = result
+            if checkpoint:
+                _save_atomic(_tile_path(checkpoint, i), result)
+        if not results:
+            return np.empty((0,))
+        return np.concatenate(results)
+
+    def _map(self, tiles:list, todo:list):
+        """Yield (tile index, result) as tiles finish"""
+        if self.n_jobs == 1 or len(todo) <= 1:
+            for i in todo:
+                yield i, np.asarray(self.function(tiles[i], **self.tables))
+            return
+        blocks, specs = _share(self.tables)
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(self.n_jobs, len(todo)),
+                    initializer=_attach, initargs=(specs,)) as pool:
+                futures = {pool.submit(_call, self.function, tiles[i]): i for i in todo}
+                for future in concurrent.futures.as_completed(futures):
+                    yield futures[future], future.result()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def _checkpoint(self, name:str, points:np.ndarray) -> str:
+        """Checkpoint directory of a set of points (None if disabled)"""
+        if self.checkpoint_dir is None:
+            return None
+        directory = os.path.join(self.checkpoint_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            'function': f'{getattr(self.function, "__module__", None)}.'
+                        f'{getattr(self.function, "__qualname__", repr(self.function))}',
+            'tables': _tables_hash(self.tables),
+            'points': hashlib.sha256(points.tobytes()).hexdigest(),
+            'shape': list(points.shape),
+            'tile_size': self.tile_size,
+        }
+        path = os.path.join(directory, 'manifest.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                previous = json.load(f)
+            if previous != manifest:
+                changed = [key for key in manifest if previous.get(key) != manifest[key]]
+                raise ValueError(f'Checkpoint "{directory}" belongs to a different '
+                                 f'{", ".join(changed)}. Use another checkpoint_dir '
+                                 'or delete it.')
+        else:
+            with open(path, 'w') as f:
+                json.dump(manifest, f)
+        return directory
+
+
+def grid_points(axes) -> np.ndarray:
+    """All points of the grid spanned by the axes, last axis varying fastest
+
+    Args:
+        axes (list of array-like): Coordinates along each axis.
+
+    Returns:
+        np.ndarray: Shape (n_points, n_axes)
+    """
+    mesh = np.meshgrid(*[np.asarray(axis, dtype=np.float64) for axis in axes],
+                       indexing='ij')
+    return np.stack([m.ravel() for m in mesh], axis=1)
+
+def _coordinates(axes, index:np.ndarray) -> np.ndarray:
+    """Coordinates of grid points from their integer indices"""
+    return np.stack([axis[index[:, i]] for i, axis in enumerate(axes)], axis=1)
+
+def _differs(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    """True for rows with any differing entry"""
+    return (a != b).reshape(len(a), -1).any(axis=1)
+
+def _tables_hash(tables:dict) -> str:
+    """SHA-256 of the tables' names, dtypes, shapes & contents"""
+    digest = hashlib.sha256()
+    for name in sorted(tables):
+        table = tables[name]
+        digest.update(f'{name}:{table.dtype.str}:{table.shape};'.encode())
+        digest.update(table.tobytes())
+    return digest.hexdigest()
+
+def _tile_path(directory:str, i:int) -> str:
+    return os.path.join(directory, f'tile_{i:06d}.npy')
+
+def _save_atomic(path:str, arr:np.ndarray):
+    """Save so that a crash never leaves a half-written tile behind"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+def _share(tables:dict):
+    """Copy tables into shared memory
+
+    Returns:
+        list: SharedMemory blocks (to unlink when done)
+        dict: key=name, value=(block name, shape, dtype) for "_attach"
+    """
+    blocks, specs = [], {}
+    for name, table in tables.items():
+        block = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+        np.ndarray(table.shape, dtype=table.dtype, buffer=block.buf)[...] = table
+        blocks.append(block)
+        specs[name] = (block.name, table.shape, table.dtype.str)
+    return blocks, specs
+
+def _attach(specs:dict):
+    """Worker initializer: read-only views of the shared tables"""
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        table = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        table.flags.writeable = False
+        _BLOCKS.append(block)
+        _TABLES[name] = table
+
+def _call(function, points:np.ndarray) -> np.ndarray:
+    return np.asarray(function(points, **_TABLES))
@@ -0,0 +1,111 @@
+import numpy as np
+from thermo_ml import composition, database
+
+
+ATOMIC_WEIGHT = 'Atomic weight (a.m.u.)'
+
+
+def molar_masses(formulas, atomic_weights:np.ndarray=None) -> np.ndarray:
+    """Molar masses of many formulas at once
+
+    Computed as a sparse composition x atomic weight product,
+    each unique formula being parsed only once.
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas (e.g. ['CaO', 'SiO2']) or dictionaries of
+            atom counts.
+        atomic_weights (np.ndarray, optional): Array of
+            length N_ELEMENTS in the order of
+            "composition.ELEMENTS". Defaults to the
+            'Atomic weight (a.m.u.)' column of "database.Atoms".
+
+    Returns:
+        np.ndarray: Molar masses (g/mol), NaN if a
+            formula contains an element of unknown weight.
+    """
+    batch = composition.as_batch(formulas)
+    weights = _atomic_weights(atomic_weights)
+    return np.bincount(batch.row_ids,
+                       weights=batch.counts * weights[batch.element_ids],
+                       minlength=len(batch))
+
+def mass_fractions(formulas, atomic_weights:np.ndarray=None):
+    """Elemental mass fractions of many formulas at once
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas or dictionaries of atom counts.
+        atomic_weights (np.ndarray, optional): See
+            "molar_masses". Defaults to None.
+
+    Returns:
+        np.ndarray: int64 offsets of length n_formulas + 1
+        np.ndarray: uint8 element ids (column in "composition.ELEMENTS")
+        np.ndarray: float64 mass fraction of each element,
+            summing to 1 per formula.
+            See "composition.to_csr" for the layout.
+    """
+    batch = composition.as_batch(formulas)
+    weights = _atomic_weights(atomic_weights)
+    masses = composition.CompositionBatch(
+        batch.offsets, batch.element_ids, batch.counts * weights[batch.element_ids])
+    fractions = masses.normalize()
+    return fractions.offsets, fractions.element_ids, fractions.counts
+
+def mass_to_mole_fractions(formulas, mass_fractions:np.ndarray,
+                           atomic_weights:np.ndarray=None) -> np.ndarray:
+    """Convert mass fractions (wt%) of components to mole fractions (mol%)
+
+    Args:
+        formulas (list of str|dict): Formulas of the
+            n_components components (e.g. ['CaO', 'SiO2', 'H2O']).
+        mass_fractions (array-like): Array of shape
+            (..., n_components), e.g. one row per sample.
+            Rows don't need to be normalized.
+        atomic_weights (np.ndarray, optional): See
+            "molar_masses". Defaults to None.
+
+    Returns:
+        np.ndarray: Mole fractions, same shape, rows summing to 1
+    """
+    masses = molar_masses(formulas, atomic_weights)
+    return _normalize(_as_fractions(mass_fractions, masses) / masses)
+
+def mole_to_mass_fractions(formulas, mole_fractions:np.ndarray,
+                           atomic_weights:np.ndarray=None) -> np.ndarray:
+    """Convert mole fractions (mol%) of components to mass fractions (wt%)
+
+    Args:
+        formulas (list of str|dict): Formulas of the
+            n_components components (e.g. ['CaO', 'SiO2', 'H2O']).
+        mole_fractions (array-like): Array of shape
+            (..., n_components), e.g. one row per sample.
+            Rows don't need to be normalized.
+        atomic_weights (np.ndarray, optional): See
+            "molar_masses". Defaults to None.
+
+    Returns:
+        np.ndarray: Mass fractions, same shape, rows summing to 1
+    """
+    masses = molar_masses(formulas, atomic_weights)
+    return _normalize(_as_fractions(mole_fractions, masses) * masses)
+
+def _as_fractions(fractions, masses:np.ndarray) -> np.ndarray:
+    fractions = np.asarray(fractions, dtype=np.float64)
+    if fractions.shape[-1] != len(masses):
+        raise ValueError(f'Expected last axis of length {len(masses)} '
+                         f'(one per formula), instead got shape {fractions.shape}')
+    return fractions
+
+def _normalize(amounts:np.ndarray) -> np.ndarray:
+    return amounts / amounts.sum(axis=-1, keepdims=True)
+
+def _atomic_weights(atomic_weights:np.ndarray=None) -> np.ndarray:
+    if atomic_weights is None:
+        return database.get_property_array(ATOMIC_WEIGHT)
+    atomic_weights = np.asarray(atomic_weights, dtype=np.float64)
+    if atomic_weights.shape != (composition.N_ELEMENTS,):
+        raise ValueError(f'Expected atomic_weights of length {composition.N_ELEMENTS}, '
+                         f'instead got shape {atomic_weights.shape}')
+    return atomic_weights
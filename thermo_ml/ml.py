@@ -1,3 +0,0 @@
-"""
-Soon to be developed - 2020.03.07
-"""
\ No newline at end of file
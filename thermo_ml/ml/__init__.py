@@ -0,0 +1,8 @@
+from ._artifact import (
+    Artifact,
+    save_artifact,
+    load_artifact
+    )
+from ._ensemble import (
+    BootstrapEnsemble
+    )
@@ -0,0 +1,181 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+from thermo_ml import profiling
+
+
+### Binary layout of a model artifact
+#   [magic (8 bytes)][format version (uint32)][header length (uint32)]
+#   [JSON header][padding][array 0][padding][array 1] ...
+#   Every array starts on a multiple of ARTIFACT_ALIGNMENT bytes,
+#   so that it can be viewed straight out of a memory map.
+ARTIFACT_MAGIC = b'THMLART\x00'
+ARTIFACT_VERSION = 1
+ARTIFACT_ALIGNMENT = 64
+_PREAMBLE = struct.Struct('<8sII') # magic, version, header length
+
+
+class Artifact:
+    def __init__(self, model_type:str, arrays:dict,
+                 feature_spec:dict=None,
+                 element_table_hash:str=None,
+                 metadata:dict=None):
+        """Model weights together with what is needed to use them
+
+        Args:
+            model_type (str): Name of the model class
+                (e.g. 'BootstrapEnsemble').
+            arrays (dict): key=array name, value=np.ndarray
+                of model weights.
+            feature_spec (dict, optional): JSON serializable
+                description of the input features
+                (e.g. {'properties': ['Electronegativity']}).
+                Defaults to None.
+            element_table_hash (str, optional): Hash of the
+                atomic properties table the model was trained
+                on (see "Atoms().table_hash"). Defaults to None.
+            metadata (dict, optional): Any other JSON
+                serializable information. Defaults to None.
+        """
+        self.model_type = model_type
+        self.arrays = dict(arrays)
+        self.feature_spec = feature_spec or {}
+        self.element_table_hash = element_table_hash
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        arrays = ', '.join(f'{name}{tuple(arr.shape)}'
+                           for name, arr in self.arrays.items())
+        return f'Artifact(model_type={self.model_type!r}, arrays=[{arrays}])'
+
+    def __getitem__(self, name:str) -> np.ndarray:
+        return self.arrays[name]
+
+    def save(self, path:str):
+        """Write artifact to disk (see "save_artifact")"""
+        save_artifact(path, self)
+
+
+def save_artifact(path:str, artifact:Artifact):
+    """Write model artifact to a single binary file
+
+    Args:
+        path (str): File path (e.g. 'model.tmla').
+        artifact (Artifact): Model artifact to write.
+
+    Raises:
+        ValueError: Array of object dtype cannot be stored raw
+    """
+    ### Lay out arrays one after another on aligned offsets
+    descr = {}
+    arrays = {}
+    offset = 0
+    for name, arr in artifact.arrays.items():
+        arr = np.ascontiguousarray(arr)
+        if arr.dtype.hasobject:
+            raise ValueError(f'Array "{name}" has object dtype, '
+                             'which cannot be stored in an artifact.')
+        offset = _align(offset)
+        descr[name] = {'dtype': arr.dtype.str,
+                       'shape': list(arr.shape),
+                       'offset': offset}
+        arrays[name] = arr
+        offset += arr.nbytes
+    header = {
+        'model_type': artifact.model_type,
+        'feature_spec': artifact.feature_spec,
+        'element_table_hash': artifact.element_table_hash,
+        'metadata': artifact.metadata,
+        'arrays': descr,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+    ### Write preamble, header and arrays
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION,
+                               len(header_bytes)))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.write(b'\x00' * (data_start + descr[name]['offset'] - f.tell()))
+            f.write(arr.data)
+
+@profiling.timed('ml.load_artifact_seconds')
+def load_artifact(path:str,
+                  mmap_mode:bool=True,
+                  element_table_hash:str=None
+                  ) -> Artifact:
+    """Load model artifact written by "save_artifact"
+
+    Args:
+        path (str): File path.
+        mmap_mode (bool, optional): If True, arrays are
+            read-only views into a memory map of the file,
+            so nothing is copied and worker processes
+            share the same pages. If False, arrays are
+            read into memory. Defaults to True.
+        element_table_hash (str, optional): If given,
+            make sure the artifact was built against
+            this atomic properties table. Defaults to None.
+
+    Raises:
+        ValueError: Not an artifact file
+        ValueError: Artifact written by a newer format version
+        ValueError: Element table hash doesn't match
+
+    Returns:
+        Artifact: Loaded model artifact
+    """
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f'"{path}" is not a thermo-ml artifact.')
+        magic, version, header_len = _PREAMBLE.unpack(preamble)
+        if magic != ARTIFACT_MAGIC:
+            raise ValueError(f'"{path}" is not a thermo-ml artifact.')
+        if version > ARTIFACT_VERSION:
+            raise ValueError(f'Artifact format version {version} of "{path}" '
+                             f'is newer than supported ({ARTIFACT_VERSION}).')
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        data_start = _align(_PREAMBLE.size + header_len)
+        if mmap_mode:
+            buffer = _map_file(f)
+        else:
+            buffer = bytearray(f.seek(0, 2))
+            f.seek(0)
+            f.readinto(buffer)
+    ### Check artifact matches the atomic properties table in use
+    if (element_table_hash is not None
+            and header['element_table_hash'] != element_table_hash):
+        raise ValueError(
+            'Artifact was built against a different atomic properties table; '
+            f'expected hash {element_table_hash}, '
+            f'instead got {header["element_table_hash"]}.')
+    ### View arrays (no copy) out of the buffer
+    arrays = {}
+    for name, d in header['arrays'].items():
+        dtype = np.dtype(d['dtype'])
+        count = int(np.prod(d['shape'], dtype=np.int64))
+        if count == 0:
+            arrays[name] = np.empty(d['shape'], dtype=dtype)
+            continue
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count,
+            offset=data_start + d['offset']).reshape(d['shape'])
+    return Artifact(model_type=header['model_type'],
+                    arrays=arrays,
+                    feature_spec=header['feature_spec'],
+                    element_table_hash=header['element_table_hash'],
+                    metadata=header['metadata'])
+
+def _map_file(f):
+    """Memory map an open file read-only (empty files can't be mapped)"""
+    f.seek(0, 2)
+    if f.tell() == 0:
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _align(offset:int) -> int:
+    """Round offset up to the next multiple of ARTIFACT_ALIGNMENT"""
+    return -(-offset // ARTIFACT_ALIGNMENT) * ARTIFACT_ALIGNMENT
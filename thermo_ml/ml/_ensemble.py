@@ -0,0 +1,177 @@
+import concurrent.futures
+import os
+
+import numpy as np
+from thermo_ml.ml._artifact import Artifact
+
+
+# Rows of X weighted at once for a member's Gram matrix (bounds the scratch memory)
+GRAM_BLOCK_ROWS = 4096
+
+
+class BootstrapEnsemble:
+    def __init__(self, n_members:int=100, alpha:float=1.0,
+                 n_jobs:int=None, seed:int=None):
+        """Bootstrap ensemble of ridge regressions, with error bars
+
+        Every member is a ridge regression fitted on a bootstrap
+        resample of the training set. The spread of the members'
+        predictions estimates the uncertainty of the mean.
+
+        Resamples are expressed as integer sample weights, so all
+        members share one read-only feature matrix; weighted rows
+        exist only GRAM_BLOCK_ROWS at a time. Members are
+        fitted in parallel on a thread pool (numpy releases the
+        GIL in its matrix products and solvers).
+
+        Args:
+            n_members (int, optional): Number of bootstrap
+                replicates. Defaults to 100.
+            alpha (float, optional): Ridge penalty of the
+                coefficients (not the intercept). Defaults to 1.0.
+            n_jobs (int, optional): Number of threads. Defaults
+                to None, meaning the number of CPUs.
+            seed (int, optional): Seed of the resamples. Members
+                are the same whatever n_jobs. Defaults to None.
+        """
+        self.n_members = n_members
+        self.alpha = alpha
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.seed = seed
+        self.coef = None
+        self.intercept = None
+
+    def fit(self, X:np.ndarray, y:np.ndarray):
+        """Fit all members
+
+        Args:
+            X (np.ndarray): Features of shape (n_samples, n_features)
+                (e.g. "bonds.bond_features" stacked as columns).
+            y (np.ndarray): Targets of length n_samples
+                (e.g. formation enthalpies).
+
+        Raises:
+            ValueError: X and y don't match
+
+        Returns:
+            BootstrapEnsemble: self
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if X.ndim != 2 or y.shape != (len(X),):
+            raise ValueError(f'Expected X of shape (n_samples, n_features) and y of '
+                             f'length n_samples, instead got shapes {X.shape} and {y.shape}')
+        # Centered once, so per member Gram matrices don't cancel
+        x_mean, y_mean = X.mean(axis=0), y.mean()
+        X = X - x_mean
+        y = y - y_mean
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_members)
+        chunks = np.array_split(np.arange(self.n_members), min(self.n_jobs, self.n_members))
+        coef = np.empty((self.n_members, X.shape[1]))
+        intercept = np.empty(self.n_members)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = {pool.submit(self._fit_members, X, y, [seeds[i] for i in chunk]): chunk
+                       for chunk in chunks}
+            for future in concurrent.futures.as_completed(futures):
+                chunk = futures[future]
+                coef[chunk], intercept[chunk] = future.result()
+        self.coef = coef
+        self.intercept = intercept + y_mean - coef @ x_mean
+        return self
+
+    def _fit_members(self, X:np.ndarray, y:np.ndarray, seeds:list):
+        """Weighted ridge fits of members with the given resample seeds"""
+        n_samples, n_features = X.shape
+        k = len(seeds)
+        gram = np.empty((k, n_features, n_features))
+        rhs = np.empty((k, n_features))
+        means = np.empty((k, n_features))
+        y_means = np.empty(k)
+        for j, seed in enumerate(seeds):
+            # Times each sample is drawn into the resample
+            rows = np.random.default_rng(seed).integers(0, n_samples, n_samples)
+            weights = np.bincount(rows, minlength=n_samples).astype(np.float64)
+            means[j] = weights @ X / n_samples
+            y_means[j] = weights @ y / n_samples
+            # Gram matrix of the resample, X^T W X one block of rows at a time
+            gram[j] = 0
+            for start in range(0, n_samples, GRAM_BLOCK_ROWS):
+                block = X[start:start + GRAM_BLOCK_ROWS]
+                gram[j] += block.T @ (weights[start:start + GRAM_BLOCK_ROWS, None] * block)
+            # Centered on the resample's own means
+            gram[j] -= n_samples * np.outer(means[j], means[j])
+            rhs[j] = X.T @ (weights * y) - n_samples * means[j] * y_means[j]
+        gram += self.alpha * np.eye(n_features)
+        coef = np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+        return coef, y_means - np.einsum('ij,ij->i', coef, means)
+
+    def predict_members(self, X:np.ndarray) -> np.ndarray:
+        """Predictions of every member, shape (n_samples, n_members)"""
+        if self.coef is None:
+            raise ValueError('BootstrapEnsemble is not fitted yet, call "fit" first.')
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.coef.shape[1]:
+            raise ValueError(f'Expected X of shape (n_samples, {self.coef.shape[1]}), '
+                             f'instead got shape {X.shape}')
+        return X @ self.coef.T + self.intercept
+
+    def predict(self, X:np.ndarray, quantiles=(0.05, 0.5, 0.95)) -> dict:
+        """Mean prediction with its uncertainty
+
+        All members are evaluated in a single matrix product.
+
+        Args:
+            X (np.ndarray): Features of shape (n_samples, n_features).
+            quantiles (tuple of float, optional): Quantiles of the
+                member predictions. Defaults to (0.05, 0.5, 0.95).
+
+        Returns:
+            dict:
+                'mean': np.ndarray of length n_samples
+                'std': np.ndarray, standard deviation over members
+                'quantiles': np.ndarray of shape (n_samples, len(quantiles))
+        """
+        predictions = self.predict_members(X)
+        return {
+            'mean': predictions.mean(axis=1),
+            'std': predictions.std(axis=1, ddof=1) if self.n_members > 1
+                   else np.zeros(len(predictions)),
+            'quantiles': np.quantile(predictions, quantiles, axis=1).T,
+        }
+
+    def to_artifact(self, feature_spec:dict=None, element_table_hash:str=None) -> Artifact:
+        """Fitted members as a model artifact (see "ml.save_artifact")
+
+        Args:
+            feature_spec (dict, optional): Description of the
+                input features. Defaults to None.
+            element_table_hash (str, optional): See "Artifact".
+                Defaults to None.
+
+        Returns:
+            Artifact: Arrays 'coef' and 'intercept'
+        """
+        if self.coef is None:
+            raise ValueError('BootstrapEnsemble is not fitted yet, call "fit" first.')
+        return Artifact(model_type=type(self).__name__,
+                        arrays={'coef': self.coef, 'intercept': self.intercept},
+                        feature_spec=feature_spec,
+                        element_table_hash=element_table_hash,
+                        metadata={'alpha': self.alpha, 'seed': self.seed})
+
+    @classmethod
+    def from_artifact(cls, artifact:Artifact):
+        """Ensemble from an artifact written by "to_artifact"
+
+        Raises:
+            ValueError: Artifact holds another model type
+        """
+        if artifact.model_type != cls.__name__:
+            raise ValueError(f'Expected a {cls.__name__} artifact, '
+                             f'instead got {artifact.model_type}')
+        model = cls(n_members=len(artifact['intercept']),
+                    alpha=artifact.metadata.get('alpha', 1.0),
+                    seed=artifact.metadata.get('seed'))
+        model.coef = artifact['coef']
+        model.intercept = artifact['intercept']
+        return model
@@ -0,0 +1,277 @@
+import collections
+import functools
+import math
+import types
+from fractions import Fraction
+
+import numpy as np
+from thermo_ml import composition, electrons
+
+
+### Common oxidation states of the elements
+#   Negative states are listed in order of preference.
+#   Elements missing here (e.g. noble gases) have none.
+OXIDATION_STATES = {
+    'H': (1, -1), 'Li': (1,), 'Be': (2,), 'B': (3,), 'C': (-4, 2, 4),
+    'N': (-3, 3, 5), 'O': (-2,), 'F': (-1,), 'Na': (1,), 'Mg': (2,),
+    'Al': (3,), 'Si': (-4, 4), 'P': (-3, 3, 5), 'S': (-2, 2, 4, 6),
+    'Cl': (-1, 1, 3, 5, 7), 'K': (1,), 'Ca': (2,), 'Sc': (3,),
+    'Ti': (2, 3, 4), 'V': (2, 3, 4, 5), 'Cr': (2, 3, 6), 'Mn': (2, 3, 4, 7),
+    'Fe': (2, 3), 'Co': (2, 3), 'Ni': (2, 3), 'Cu': (1, 2), 'Zn': (2,),
+    'Ga': (3,), 'Ge': (-4, 2, 4), 'As': (-3, 3, 5), 'Se': (-2, 2, 4, 6),
+    'Br': (-1, 1, 3, 5), 'Kr': (2,), 'Rb': (1,), 'Sr': (2,), 'Y': (3,),
+    'Zr': (4,), 'Nb': (3, 5), 'Mo': (4, 6), 'Tc': (4, 7), 'Ru': (3, 4),
+    'Rh': (3,), 'Pd': (2, 4), 'Ag': (1,), 'Cd': (2,), 'In': (3,),
+    'Sn': (-4, 2, 4), 'Sb': (-3, 3, 5), 'Te': (-2, 2, 4, 6),
+    'I': (-1, 1, 3, 5, 7), 'Xe': (2, 4, 6), 'Cs': (1,), 'Ba': (2,),
+    'La': (3,), 'Ce': (3, 4), 'Pr': (3,), 'Nd': (3,), 'Pm': (3,),
+    'Sm': (2, 3), 'Eu': (2, 3), 'Gd': (3,), 'Tb': (3, 4), 'Dy': (3,),
+    'Ho': (3,), 'Er': (3,), 'Tm': (3,), 'Yb': (2, 3), 'Lu': (3,),
+    'Hf': (4,), 'Ta': (5,), 'W': (4, 6), 'Re': (4, 7), 'Os': (4, 8),
+    'Ir': (3, 4), 'Pt': (2, 4), 'Au': (1, 3), 'Hg': (1, 2), 'Tl': (1, 3),
+    'Pb': (2, 4), 'Bi': (3, 5), 'Po': (-2, 2, 4), 'At': (-1, 1),
+    'Fr': (1,), 'Ra': (2,), 'Ac': (3,), 'Th': (4,), 'Pa': (5,),
+    'U': (3, 4, 6), 'Np': (5,), 'Pu': (3, 4), 'Am': (3,), 'Cm': (3,),
+    'Bk': (3,), 'Cf': (3,), 'Es': (3,), 'Fm': (3,), 'Md': (3,),
+    'No': (2,), 'Lr': (3,),
+}
+# Cost (eV) of each step down the preference list of negative states
+ANION_PENALTY = 10.0
+# Cost (eV) of a positive state q of unknown ionization energies,
+# UNKNOWN_IE_COST * q^2 (roughly the cumulative ionization energy)
+UNKNOWN_IE_COST = 10.0
+# Max. atoms of one element (after reducing the composition) whose
+# states are mixed (e.g. Fe3O4 = Fe(2+) 2 Fe(3+) O4). Above, all atoms
+# of an element get the same state.
+MAX_MIXED_ATOMS = 256
+# Largest denominator of fractional counts (e.g. 6.4 = 32/5)
+MAX_DENOMINATOR = 1000
+# Max. number of reduced compositions (and of element options) memoized,
+# least recently used dropped first
+CACHE_SIZE = 10_000
+
+
+class OxidationStateAssigner:
+    def __init__(self, states:dict=None, ionization_energies:np.ndarray=None):
+        """Charge-balanced oxidation states of many compositions
+
+        Among all assignments of allowed states that balance the
+        charge, the one of least cost is chosen. A cation's cost
+        is its cumulative ionization energy up to its state; anions
+        cost nothing in their preferred state. Atoms of one element
+        may take different states of the same sign (mixed valence,
+        e.g. Fe3O4), which ionization energies only favour when
+        needed, as they grow faster than the charge.
+
+        Per element, the cheapest way to reach every total charge
+        is found by dynamic programming. A branch-and-bound search
+        over elements then picks one total charge each, pruning
+        branches that can't balance the charge or beat the best
+        assignment so far. Results are memoized by reduced
+        composition (e.g. Fe6O8 is solved as Fe3O4), up to
+        CACHE_SIZE compositions.
+
+        Args:
+            states (dict, optional): key=atomic symbol, value=allowed
+                oxidation states. Defaults to OXIDATION_STATES.
+            ionization_energies (np.ndarray, optional): Array of shape
+                (N_ELEMENTS, n) of the 1st, 2nd ... nth ionization
+                energies (eV), NaN if unknown. Defaults to the
+                packed ionization energies of "database.Atoms".
+        """
+        self.states = dict(OXIDATION_STATES if states is None else states)
+        # Cumulative IE up to charge q is column q (column 0 is 0)
+        self.cumulative_ie = electrons.cumulative_ionization_energies(ionization_energies)
+        # key = reduced composition, value = read-only oxidation states or None
+        self.cache = collections.OrderedDict()
+        self._element_options = collections.OrderedDict()
+
+    def assign(self, formulas) -> list:
+        """Oxidation state of every element of many compositions
+
+        Args:
+            formulas (iterable of str|dict|CompositionBatch): Chemical
+                formulas (e.g. ['Fe3O4', 'CaSO4']) or dictionaries
+                of atom counts (e.g. output of "parse.atoms").
+
+        Returns:
+            list of Mapping|None: Read-only mapping (shared by the
+                memo), key=atomic symbol, value=mean oxidation state
+                (e.g. {'Fe': 2.667, 'O': -2.0}), or None if no
+                charge-balanced assignment exists (incl. unknown
+                elements). Single-element compositions get 0.
+        """
+        if isinstance(formulas, composition.CompositionBatch):
+            compositions = formulas.to_dicts()
+        else:
+            compositions = composition.parse_formulas(formulas)
+        results = []
+        for counts in compositions:
+            key = _reduced(counts)
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            else:
+                states = self._solve(key)
+                self.cache[key] = None if states is None else types.MappingProxyType(states)
+                _trim(self.cache)
+            results.append(self.cache[key])
+        return results
+
+    def state_costs(self, element:str) -> dict:
+        """Cost (eV) of every allowed state of an element
+
+        Raises:
+            ValueError: Unknown element
+        """
+        if element not in composition.ELEMENT_INDEX:
+            raise ValueError(f"Atom '{element}' doesn't exist.")
+        costs = {}
+        z = composition.ELEMENT_INDEX[element]
+        negative = [q for q in self.states.get(element, ()) if q < 0]
+        for q in self.states.get(element, ()):
+            if q < 0:
+                costs[q] = ANION_PENALTY * negative.index(q)
+            elif q == 0:
+                costs[q] = 0.0
+            elif q < self.cumulative_ie.shape[1] and np.isfinite(self.cumulative_ie[z, q]):
+                costs[q] = float(self.cumulative_ie[z, q])
+            else:
+                costs[q] = UNKNOWN_IE_COST * q**2
+        return costs
+
+    def _solve(self, key:tuple):
+        """Least-cost charge-balanced states of a reduced composition"""
+        if any(element not in composition.ELEMENT_INDEX for element, _ in key):
+            return None
+        if len(key) == 1:
+            return {key[0][0]: 0.0}
+        options = []
+        for element, n in key:
+            charges, costs = self._options(element, n)
+            if len(charges) == 0:
+                return None
+            order = np.argsort(costs, kind='stable')
+            options.append((element, n, charges[order], costs[order]))
+        # Elements with the widest spread of costs first, so that
+        # good assignments (and tight bounds) are found early
+        options.sort(key=lambda o: -(o[3][-1] - o[3][0]))
+        n_elements = len(options)
+        # Bounds of what the elements after position i can add
+        min_cost = np.zeros(n_elements + 1)
+        min_charge = np.zeros(n_elements + 1, dtype=np.int64)
+        max_charge = np.zeros(n_elements + 1, dtype=np.int64)
+        for i in range(n_elements - 1, -1, -1):
+            _, _, charges, costs = options[i]
+            min_cost[i] = min_cost[i + 1] + costs[0]
+            min_charge[i] = min_charge[i + 1] + charges.min()
+            max_charge[i] = max_charge[i + 1] + charges.max()
+        best = {'cost': math.inf, 'charges': None}
+        chosen = [0] * n_elements
+
+        def search(i, charge, cost):
+            if i == n_elements:
+                if charge == 0 and cost < best['cost']:
+                    best['cost'], best['charges'] = cost, list(chosen)
+                return
+            _, _, charges, costs = options[i]
+            rest_min, rest_max = min_charge[i + 1], max_charge[i + 1]
+            for q, c in zip(charges.tolist(), costs.tolist()):
+                # Costs are sorted, nothing cheaper further down the list
+                if cost + c + min_cost[i + 1] >= best['cost']:
+                    break
+                remaining = -(charge + q)
+                if rest_min <= remaining <= rest_max:
+                    chosen[i] = q
+                    search(i + 1, charge + q, cost + c)
+
+        search(0, 0, 0.0)
+        if best['charges'] is None:
+            return None
+        states = {element: total / n for (element, n, _, _), total
+                  in zip(options, best['charges'])}
+        return {element: states[element] for element, _ in key}
+
+    def _options(self, element:str, n:int):
+        """Total charges n atoms of an element can take & least cost of each
+
+        Returns:
+            np.ndarray: int64 total charges
+            np.ndarray: float64 least cost of each
+        """
+        if (element, n) in self._element_options:
+            self._element_options.move_to_end((element, n))
+            return self._element_options[element, n]
+        costs = self.state_costs(element)
+        if not costs:
+            result = np.empty(0, dtype=np.int64), np.empty(0)
+        elif n > MAX_MIXED_ATOMS or len(costs) == 1:
+            # Same state for all atoms
+            result = (np.array([n * q for q in costs], dtype=np.int64),
+                      np.array([n * c for c in costs.values()]))
+        else:
+            # Atoms of an element are either all cations or all anions
+            anions = {q: c for q, c in costs.items() if q <= 0}
+            cations = {q: c for q, c in costs.items() if q > 0}
+            charges, least = zip(*[_mixed_options(states, n)
+                                   for states in (anions, cations) if states])
+            result = np.concatenate(charges), np.concatenate(least)
+        self._element_options[element, n] = result
+        _trim(self._element_options)
+        return result
+
+
+def assign_oxidation_states(formulas) -> list:
+    """Oxidation states of many compositions (see "OxidationStateAssigner")
+
+    Uses the default states & ionization energies; results are
+    cached across calls.
+
+    Args:
+        formulas (iterable of str|dict|CompositionBatch): Chemical
+            formulas (e.g. ['Fe3O4', 'CaSO4']) or dictionaries of
+            atom counts.
+
+    Returns:
+        list of dict|None: See "OxidationStateAssigner.assign"
+    """
+    return _default_assigner().assign(formulas)
+
+@functools.lru_cache(maxsize=None)
+def _default_assigner() -> OxidationStateAssigner:
+    return OxidationStateAssigner()
+
+def _trim(cache:collections.OrderedDict):
+    """Drop the least recently used entries beyond CACHE_SIZE"""
+    while len(cache) > CACHE_SIZE:
+        cache.popitem(last=False)
+
+def _mixed_options(costs:dict, n:int):
+    """Least cost of every total charge of n atoms, each in any allowed state
+
+    Dynamic programming over atoms: after k atoms, best[t] is the
+    least cost of total charge t + k * q_min.
+    """
+    states = np.array(list(costs), dtype=np.int64)
+    state_costs = np.array(list(costs.values()))
+    q_min, span = states.min(), states.max() - states.min()
+    best = np.zeros(1)
+    for _ in range(n):
+        new = np.full(len(best) + span, np.inf)
+        for q, c in zip(states - q_min, state_costs):
+            np.minimum(new[q:q + len(best)], best + c, out=new[q:q + len(best)])
+        best = new
+    finite = np.isfinite(best)
+    return np.flatnonzero(finite) + n * q_min, best[finite]
+
+def _reduced(counts:dict) -> tuple:
+    """Composition as sorted (symbol, count) with smallest whole counts
+
+    e.g. {'Fe': 6, 'O': 8} --> (('Fe', 3), ('O', 4)),
+         {'Ca': 6.4, 'O': 1} --> (('Ca', 32), ('O', 5))
+    """
+    fractions = {atom: Fraction(n).limit_denominator(MAX_DENOMINATOR)
+                 for atom, n in counts.items() if n > 0}
+    scale = math.lcm(*(f.denominator for f in fractions.values())) if fractions else 1
+    whole = {atom: int(f * scale) for atom, f in fractions.items()}
+    divisor = math.gcd(*whole.values()) if whole else 1
+    return tuple(sorted((atom, n // divisor) for atom, n in whole.items()))
@@ -0,0 +1,114 @@
+import functools
+
+import numpy as np
+from thermo_ml import composition
+
+
+### Oxide basis commonly used for cement and slag chemistry
+CEMENT_OXIDES = ('CaO', 'SiO2', 'Al2O3', 'Fe2O3', 'MgO', 'SO3', 'Na2O', 'K2O', 'H2O')
+
+
+class OxideBasis:
+    def __init__(self, oxides):
+        """Express compositions as amounts of oxides (or any other basis species)
+
+        The element x oxide matrix B and its pseudo-inverse are
+        computed once, so decomposing any number of compositions
+        is a single matrix product, amounts = X pinv(B)^T.
+
+        Args:
+            oxides (list of str): Basis species
+                (e.g. ['CaO', 'SiO2', 'H2O']).
+
+        Raises:
+            ValueError: Basis species are linearly dependent
+        """
+        self.oxides = tuple(oxides)
+        batch = composition.as_batch(self.oxides)
+        # Columns of the element x oxide matrix
+        self.element_ids = np.unique(batch.element_ids)
+        self._column = np.full(composition.N_ELEMENTS, -1, dtype=np.int64)
+        self._column[self.element_ids] = np.arange(len(self.element_ids))
+        self.matrix = np.zeros((len(self.element_ids), len(self.oxides)))
+        self.matrix[self._column[batch.element_ids], batch.row_ids] = batch.counts
+        if np.linalg.matrix_rank(self.matrix) < len(self.oxides):
+            raise ValueError(f'Basis {self.oxides} is linearly dependent, '
+                             'amounts would not be unique.')
+        self.pinv = np.linalg.pinv(self.matrix)
+
+    @property
+    def elements(self) -> tuple:
+        """Atomic symbols spanned by the basis"""
+        return tuple(composition.ELEMENTS[i] for i in self.element_ids)
+
+    def decompose(self, formulas) -> dict:
+        """Decompose many compositions into amounts of the basis oxides
+
+        Args:
+            formulas (iterable of str|dict|CompositionBatch): Chemical
+                formulas (e.g. ['Ca9Si6O18(OH)6·8H2O']) or dictionaries
+                of atom counts.
+
+        Returns:
+            dict:
+                'amounts': np.ndarray (n_formulas, n_oxides) of
+                    least-squares moles of oxide per formula unit.
+                    Negative if the composition lies outside the
+                    cone of the basis (e.g. missing oxygen).
+                'fractions': np.ndarray, same shape, amounts
+                    as mole fractions of oxides.
+                'residuals': np.ndarray (n_formulas, n_elements) of
+                    atom counts not explained by the basis, for
+                    the elements in 'elements'.
+                'residual_norm': np.ndarray (n_formulas,) Euclidean
+                    norm of 'residuals'. 0 means exact decomposition.
+                'elements': tuple of atomic symbols of 'residuals',
+                    those of the basis followed by any other
+                    element found in the compositions.
+        """
+        batch = composition.as_batch(formulas)
+        ### Elements outside the basis go to extra residual columns
+        extra_ids = np.setdiff1d(batch.element_ids, self.element_ids)
+        column = self._column.copy()
+        column[extra_ids] = len(self.element_ids) + np.arange(len(extra_ids))
+        X = np.zeros((len(batch), len(self.element_ids) + len(extra_ids)))
+        # Each atom once per formula
+        X[batch.row_ids, column[batch.element_ids]] = batch.counts
+        ### Least squares amounts & what's left over
+        n_basis = len(self.element_ids)
+        amounts = X[:, :n_basis] @ self.pinv.T
+        residuals = X.copy()
+        residuals[:, :n_basis] -= amounts @ self.matrix.T
+        totals = amounts.sum(axis=1, keepdims=True)
+        fractions = np.divide(amounts, totals,
+                              out=np.full_like(amounts, np.nan),
+                              where=totals != 0)
+        elements = self.elements + tuple(composition.ELEMENTS[i] for i in extra_ids)
+        return {
+            'amounts': amounts,
+            'fractions': fractions,
+            'residuals': residuals,
+            'residual_norm': np.linalg.norm(residuals, axis=1),
+            'elements': elements,
+        }
+
+def decompose(formulas, oxides=CEMENT_OXIDES) -> dict:
+    """Decompose many compositions into amounts of oxides
+
+    The basis (and its pseudo-inverse) is built once per
+    distinct list of oxides and reused by later calls.
+
+    Args:
+        formulas (iterable of str|dict): Chemical formulas
+            or dictionaries of atom counts.
+        oxides (list of str, optional): Basis species.
+            Defaults to CEMENT_OXIDES.
+
+    Returns:
+        dict: See "OxideBasis.decompose"
+    """
+    return _cached_basis(tuple(oxides)).decompose(formulas)
+
+@functools.lru_cache(maxsize=64)
+def _cached_basis(oxides:tuple) -> OxideBasis:
+    return OxideBasis(oxides)
@@ -1,4 +1,8 @@
+import functools
 import re
+from fractions import Fraction
+
+from thermo_ml import profiling
 
 ### Regular expressions for numbers
 REGEX_NUM = r'(\d+(?:\.\d+)?)' # optional numbers (e.g. 6.4, 6)
@@ -35,7 +39,8 @@ REGEX_RIGHT_DELIMITER = r'(\]|\))' + REGEX_NUM_OPTIONAL # right-parantheses w/ o
 #regex_dot_separator = r'(\•|\∙|\·){1}' + REGEX_NUM_OPTIONAL # dot w/ optional number '•4', in '•4H2O'
 
 
-def atoms(chemical_formula):
+@profiling.timed('parse.atoms_seconds')
+def atoms(chemical_formula, exact:bool=False):
     """Parse chemical formula into atoms and corresponding stoichiometric numbers.
 
     Based on Extended Backus-Naur Formalism (EBNF).
@@ -43,12 +48,16 @@ def atoms(chemical_formula):
 
     Args:
         chemical_formula (str): chemical formula (e.g. 'COOH(C(CH3)2)3CH3')
+        exact (bool, optional): If True, counts are computed as
+            integers/fractions and only converted to floats at the
+            end, so that e.g. '(H0.1)3' gives exactly the same
+            counts as 'H0.3'. Defaults to False.
     
     Returns:
         dict: Dictionary where key=atom and value=count.
     """
     # Get atom counts
-    CP = ChemParser()
+    CP = ChemParser(exact=exact)
     stack = CP.atoms(chemical_formula, stack=[{}])
     # Error case
     if len(stack) != 1:
@@ -57,12 +66,27 @@ def atoms(chemical_formula):
             'Please contact bundes_liga.atok@hotmail.co.jp \n'
             'Output = {stack}')
     dict_of_atom_counts = stack[0]
+    if exact:
+        # Floats only at the output
+        return {atom: float(count) for atom, count in dict_of_atom_counts.items()}
     return dict_of_atom_counts
 
+@functools.lru_cache(maxsize=4096)
+def _exact_number(number:str):
+    """Exact value of a number string (e.g. '2' --> 2, '6.4' --> Fraction(32, 5))"""
+    if '.' in number:
+        return Fraction(number)
+    return int(number)
+
 
 class ChemParser:
-    def __init__(self):
+    def __init__(self, exact:bool=False):
         """Parse chemical formula into atoms and corresponding stoichiometric numbers.
+
+        Args:
+            exact (bool, optional): If True, counts are ints or
+                "fractions.Fraction" (e.g. 32/5 for '6.4') instead
+                of floats, free of rounding errors. Defaults to False.
         """
         # Compile all regex into regex object to perform pattern matching
         self.re_atom = re.compile(REGEX_ATOM)
@@ -73,8 +97,12 @@ class ChemParser:
         self.re_right = re.compile(REGEX_RIGHT_DELIMITER)
         self.re_left_paran = re.compile(REGEX_LEFT_PARAN)
         #self.re_dot   = re.compile(regex_dot_separator)
+        # Number type of counts
+        self.exact = exact
+        self._number = _exact_number if exact else float
+        self._one = 1 if exact else 1.0
         # Multiple for counts (e.g. 8 for '•8(H2O)', 2 for '2(SiO2)')
-        self._multiple = 1.0
+        self._multiple = self._one
         
     def atoms(self, formula, stack=[{}], n_open_parantheses=0):
         """Parse chemical formula into atoms and corresponding stoichiometric numbers.
@@ -158,6 +186,8 @@ class ChemParser:
             list: Updated "stack"
             int: Updated "n_open_parantheses"
         """
+        if profiling.ENABLED:
+            profiling.count('parse.tokens')
         ### Evaluate match
         match_atom  = self.re_atom.match(formula)
         match_left  = self.re_left.match(formula)
@@ -296,9 +326,8 @@ class ChemParser:
             number = formula[ match_num_at_end.start():]
         else:
             # Else num = 1 (e.g. 'C' --> 'C' & '1')
-            string = formula
-            number = 1.0
-        return string, float(number)
+            return formula, self._one
+        return string, self._number(number)
             
     def _extract_atoms(self, formula):
         """Example: 'COOH(C(CH3)2)3CH3' --> 'C', '1', 'OOH(C(CH3)2)3CH3'
@@ -343,9 +372,9 @@ class ChemParser:
         # If parantheses in left delimiter, take note
         contains_left_paranthesis = bool(self.re_left_paran.search(left_delim))
         # Get number in the left delimiter, if any
-        self._multiple = 1.0
+        self._multiple = self._one
         if self.re_num.search(left_delim):
-            self._multiple = float(self.re_num.search(left_delim).group())
+            self._multiple = self._number(self.re_num.search(left_delim).group())
         return left_delim, tail, contains_left_paranthesis
     
     def _extract_right_delimiter(self, formula):
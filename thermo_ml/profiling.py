@@ -0,0 +1,211 @@
+import bisect
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+
+### Instrumentation of hot paths (parsing, database, model loading)
+#   Off by default; enable with the environment variable
+#   THERMO_ML_PROFILE=1, "enable()" or "with profile():".
+#   When off, an instrumented call costs one global flag check.
+ENV_VAR = 'THERMO_ML_PROFILE'
+ENABLED = os.environ.get(ENV_VAR, '').lower() not in ('', '0', 'false', 'no')
+# Upper bounds of histogram buckets of timers (seconds)
+TIME_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0, 100.0)
+
+_LOCK = threading.Lock()
+# key = metric name, value = count
+_COUNTERS = {}
+# key = metric name, value = Histogram
+_HISTOGRAMS = {}
+
+
+class Histogram:
+    def __init__(self, buckets=TIME_BUCKETS):
+        """Distribution of observed values in cumulative buckets
+
+        Args:
+            buckets (tuple of float, optional): Sorted upper
+                bounds of the buckets, an implicit +inf bucket
+                is added. Defaults to TIME_BUCKETS.
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def observe(self, value:float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.buckets + (float('inf'),), self.bucket_counts):
+            cumulative += n
+            buckets[_format_bound(bound)] = cumulative
+        return {'count': self.count, 'sum': self.sum,
+                'min': self.min if self.count else None,
+                'max': self.max if self.count else None,
+                'buckets': buckets}
+
+
+def enable():
+    """Start recording metrics"""
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    """Stop recording metrics (recorded ones are kept)"""
+    global ENABLED
+    ENABLED = False
+
+def reset():
+    """Forget all recorded metrics"""
+    with _LOCK:
+        _COUNTERS.clear()
+        _HISTOGRAMS.clear()
+
+@contextlib.contextmanager
+def profile(reset_metrics:bool=True):
+    """Record metrics within a "with" block
+
+    e.g.
+        with profiling.profile():
+            parse.atoms('Ca(OH)2')
+        print(profiling.to_prometheus())
+
+    Args:
+        reset_metrics (bool, optional): Forget metrics recorded
+            before the block. Defaults to True.
+    """
+    global ENABLED
+    previous = ENABLED
+    if reset_metrics:
+        reset()
+    ENABLED = True
+    try:
+        yield
+    finally:
+        ENABLED = previous
+
+def count(name:str, value:float=1):
+    """Add to a counter (no-op when profiling is off)"""
+    if not ENABLED:
+        return
+    with _LOCK:
+        _COUNTERS[name] = _COUNTERS.get(name, 0) + value
+
+def observe(name:str, value:float, buckets=TIME_BUCKETS):
+    """Add a value to a histogram (no-op when profiling is off)
+
+    Args:
+        name (str): Metric name (e.g. 'parse.formula_length').
+        value (float): Observed value.
+        buckets (tuple of float, optional): Bucket bounds, used
+            when the histogram is first created.
+            Defaults to TIME_BUCKETS.
+    """
+    if not ENABLED:
+        return
+    with _LOCK:
+        if name not in _HISTOGRAMS:
+            _HISTOGRAMS[name] = Histogram(buckets)
+        _HISTOGRAMS[name].observe(value)
+
+def timer(name:str):
+    """Context manager timing its block into histogram "name" (seconds)"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name)
+
+def timed(name:str):
+    """Decorator timing every call of a function (see "timer")"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def snapshot() -> dict:
+    """All recorded metrics as a plain dictionary
+
+    Returns:
+        dict:
+            'counters': key=name, value=count
+            'histograms': key=name, value=dict of 'count', 'sum',
+                'min', 'max' and 'buckets' (key=upper bound,
+                value=cumulative count)
+    """
+    with _LOCK:
+        return {
+            'counters': dict(_COUNTERS),
+            'histograms': {name: h.to_dict() for name, h in _HISTOGRAMS.items()},
+        }
+
+def to_json(**kwargs) -> str:
+    """Recorded metrics as JSON (kwargs go to "json.dumps")"""
+    return json.dumps(snapshot(), **kwargs)
+
+def to_prometheus(prefix:str='thermo_ml') -> str:
+    """Recorded metrics in the Prometheus text exposition format
+
+    Counters are named <prefix>_<name>_total and histograms
+    <prefix>_<name>, with dots in names replaced by underscores.
+
+    Args:
+        prefix (str, optional): Prefix of metric names.
+            Defaults to 'thermo_ml'.
+    """
+    metrics = snapshot()
+    lines = []
+    for name, value in sorted(metrics['counters'].items()):
+        metric = _metric_name(prefix, name) + '_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+    for name, h in sorted(metrics['histograms'].items()):
+        metric = _metric_name(prefix, name)
+        lines.append(f'# TYPE {metric} histogram')
+        for bound, n in h['buckets'].items():
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {n}')
+        lines += [f'{metric}_sum {h["sum"]}', f'{metric}_count {h["count"]}']
+    return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name:str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+# Shared by all timers while profiling is off
+_NULL_TIMER = contextlib.nullcontext()
+
+def _metric_name(prefix:str, name:str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', f'{prefix}_{name}' if prefix else name)
+
+def _format_bound(bound:float) -> str:
+    return '+Inf' if bound == float('inf') else repr(float(bound))
@@ -0,0 +1,246 @@
+import collections
+import types
+
+import numpy as np
+from thermo_ml import composition
+
+
+### Reference states of elements that aren't monatomic
+#   (all other elements are referenced as single atoms, e.g. 'Ca')
+REFERENCE_STATES = {
+    'H': 'H2', 'N': 'N2', 'O': 'O2', 'F': 'F2',
+    'Cl': 'Cl2', 'Br': 'Br2', 'I': 'I2',
+}
+# Relative tolerance below which singular values
+# and coefficients are considered zero
+TOLERANCE = 1e-9
+# Decimals balanced coefficients are rounded to
+DECIMALS = 9
+
+# Max. number of balanced reactions kept, least recently used dropped first
+CACHE_SIZE = 10_000
+
+# key = canonical reaction, value = Reaction, least recently used first
+_CACHE = collections.OrderedDict()
+
+
+class Reaction:
+    def __init__(self, reactants:dict, products:dict, error:str=None):
+        """Balanced chemical reaction
+
+        Reactions are immutable (they are shared by the cache of
+        "balance"): reactants and products are read-only mappings.
+
+        Args:
+            reactants (dict): key=species, value=coefficient
+            products (dict): key=species, value=coefficient
+            error (str, optional): Why the reaction couldn't
+                be balanced. Coefficients are empty if so.
+                Defaults to None.
+        """
+        self._reactants = types.MappingProxyType(dict(reactants))
+        self._products = types.MappingProxyType(dict(products))
+        self._error = error
+
+    @property
+    def reactants(self) -> types.MappingProxyType:
+        """key=species, value=coefficient (read-only)"""
+        return self._reactants
+
+    @property
+    def products(self) -> types.MappingProxyType:
+        """key=species, value=coefficient (read-only)"""
+        return self._products
+
+    @property
+    def error(self) -> str:
+        """Why the reaction couldn't be balanced, None if it was"""
+        return self._error
+
+    @property
+    def ok(self) -> bool:
+        """Whether the reaction was balanced"""
+        return self.error is None
+
+    def __repr__(self):
+        if not self.ok:
+            return f'Reaction(error={self.error!r})'
+        return f'Reaction({self})'
+
+    def __str__(self):
+        if not self.ok:
+            return self.error
+        def side(species):
+            terms = [(f'{c:g}', s) for s, c in species.items()]
+            return ' + '.join(s if c == '1' else f'{c} {s}' for c, s in terms)
+        return f'{side(self.reactants)} -> {side(self.products)}'
+
+
+def balance(reactions) -> list:
+    """Balance many reactions at once
+
+    Each reaction's element x species matrix is built and
+    its nullspace found by SVD, all reactions with the same
+    matrix shape in one batched call. Results are cached per
+    canonical reaction (sorted species on each side), up to
+    CACHE_SIZE reactions.
+
+    Args:
+        reactions (iterable): Pairs of (reactants, products),
+            each a list of formulas
+            (e.g. [(['CaO', 'SiO2'], ['Ca2SiO4']), ...]).
+
+    Returns:
+        list of Reaction: One per input, in the same order.
+            Coefficients are normalized so that the first
+            product (in alphabetical order) has coefficient 1.
+            Reactions that can't be balanced are returned with
+            "error" set, and species with zero coefficients
+            are left out.
+    """
+    keys = [_canonical(reactants, products) for reactants, products in reactions]
+    results = {}
+    for key in keys:
+        if key in _CACHE and key not in results:
+            _CACHE.move_to_end(key)
+            results[key] = _CACHE[key]
+    todo = list(dict.fromkeys(key for key in keys if key not in results))
+    ### Parse all species involved once
+    species = sorted({s for key in todo for side in key for s in side})
+    try:
+        species_compositions = dict(zip(species, composition.parse_formulas(species)))
+    except (SyntaxError, ValueError):
+        species_compositions = {}
+        for s in species:
+            try:
+                species_compositions[s] = composition.parse_formulas([s])[0]
+            except (SyntaxError, ValueError) as err:
+                species_compositions[s] = err
+    ### Group reactions by shape of their element x species matrix
+    groups = {}
+    for key in todo:
+        reactants, products = key
+        invalid = [s for s in reactants + products
+                   if isinstance(species_compositions[s], Exception)]
+        if invalid:
+            results[key] = Reaction({}, {}, error=(
+                f'Could not parse {invalid}: {species_compositions[invalid[0]]}'))
+            continue
+        if not reactants or not products:
+            results[key] = Reaction({}, {}, error='Reaction needs reactants and products')
+            continue
+        matrix = _reaction_matrix(reactants, products, species_compositions)
+        groups.setdefault(matrix.shape, []).append((key, matrix))
+    for group in groups.values():
+        matrices = np.stack([matrix for _, matrix in group])
+        coefficients, errors = _solve_nullspaces(matrices)
+        for (key, _), coef, error in zip(group, coefficients, errors):
+            results[key] = _make_reaction(key, coef, error)
+    for key in todo:
+        _CACHE[key] = results[key]
+    while len(_CACHE) > CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    return [results[key] for key in keys]
+
+def formation_reactions(formulas, reference=None) -> list:
+    """Balanced formation reactions of many compounds
+
+    Args:
+        formulas (iterable of str): Chemical formulas of
+            compounds (e.g. ['Ca2SiO4', 'CaCO3']).
+        reference (list of str, optional): Species to form
+            the compounds from (e.g. ['CaO', 'SiO2', 'CO2']).
+            For each compound, those made only of its elements
+            are used. Defaults to None, meaning the reference
+            states of the elements (see REFERENCE_STATES).
+
+    Returns:
+        list of Reaction: See "balance"
+    """
+    formulas = list(formulas)
+    reactions = []
+    if reference is not None:
+        reference = list(reference)
+        reference_elements = [set(c) for c in composition.parse_formulas(reference)]
+    for formula in formulas:
+        try:
+            elements = set(composition.parse_formulas([formula])[0])
+        except (SyntaxError, ValueError):
+            # Parsing error is reported by "balance"
+            reactions.append(([], [formula]))
+            continue
+        if reference is None:
+            reactants = [REFERENCE_STATES.get(e, e) for e in elements]
+        else:
+            reactants = [s for s, e in zip(reference, reference_elements)
+                         if e <= elements and s != formula]
+        reactions.append((reactants, [formula]))
+    return balance(reactions)
+
+def clear_cache():
+    """Forget previously balanced reactions"""
+    _CACHE.clear()
+
+def _canonical(reactants, products) -> tuple:
+    """Cache key of a reaction (order of species doesn't matter)"""
+    return tuple(sorted(set(reactants))), tuple(sorted(set(products)))
+
+def _reaction_matrix(reactants, products, species_compositions) -> np.ndarray:
+    """Element x species matrix, products counted negative"""
+    species = reactants + products
+    elements = sorted({e for s in species for e in species_compositions[s]})
+    row = {e: i for i, e in enumerate(elements)}
+    matrix = np.zeros((len(elements), len(species)))
+    for j, s in enumerate(species):
+        sign = 1.0 if j < len(reactants) else -1.0
+        for e, count in species_compositions[s].items():
+            matrix[row[e], j] = sign * count
+    return matrix
+
+def _solve_nullspaces(matrices:np.ndarray):
+    """Nullspace vector of a stack of element x species matrices
+
+    Args:
+        matrices (np.ndarray): Shape (n_reactions, n_elements, n_species)
+
+    Returns:
+        np.ndarray: Coefficients of shape (n_reactions, n_species)
+        list of str|None: Error message per reaction
+    """
+    n_reactions, n_elements, n_species = matrices.shape
+    _, singular_values, vh = np.linalg.svd(matrices, full_matrices=True)
+    # Rank of each matrix
+    scale = np.abs(matrices).max(axis=(1, 2), keepdims=False)
+    tol = TOLERANCE * max(n_elements, n_species) * scale
+    rank = (singular_values > tol[:, None]).sum(axis=1)
+    nullity = n_species - rank
+    # Last right singular vector spans the nullspace when nullity == 1
+    coefficients = vh[:, -1, :].copy()
+    errors = []
+    for i in range(n_reactions):
+        if nullity[i] == 0:
+            errors.append('Reaction cannot be balanced with the given species')
+        elif nullity[i] > 1:
+            errors.append(f'Reaction has {nullity[i]} independent balances, '
+                          'add or remove species to make it unique')
+        else:
+            errors.append(None)
+    return coefficients, errors
+
+def _make_reaction(key:tuple, coefficients:np.ndarray, error:str) -> Reaction:
+    """Normalize nullspace vector into a Reaction (or report why not)"""
+    if error:
+        return Reaction({}, {}, error=error)
+    reactants, products = key
+    # First product gets coefficient 1
+    pivot = coefficients[len(reactants)]
+    if abs(pivot) < TOLERANCE:
+        return Reaction({}, {}, error=f'{products[0]} cannot be formed from {list(reactants)}')
+    # Round off SVD noise (e.g. 1.9999999999999993 -> 2.0)
+    coefficients = np.round(coefficients / pivot, DECIMALS) + 0.0
+    if (coefficients < 0).any():
+        wrong_side = [s for s, c in zip(reactants + products, coefficients) if c < 0]
+        return Reaction({}, {}, error=f'{wrong_side} would have to change sides')
+    return Reaction(
+        {s: float(c) for s, c in zip(reactants, coefficients) if c > 0},
+        {s: float(c) for s, c in zip(products, coefficients[len(reactants):]) if c > 0})
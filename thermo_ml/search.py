@@ -0,0 +1,392 @@
+import bisect
+import os
+import re
+
+import numpy as np
+from thermo_ml import composition, database, parse
+
+
+### Ranking of matches
+#   Exact name/formula matches rank first, then prefix matches
+#   (shorter keys first), then trigram matches by similarity.
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+# Max. postings read to collect fuzzy match candidates per query
+MAX_CANDIDATE_POSTINGS = 10_000
+# Candidates holding most of the rarest query trigrams, which are scored
+MAX_CANDIDATES = 256
+# Characters of a name, formula or query the trigrams are taken from
+MAX_TRIGRAM_CHARS = 256
+# Characters (incl. padding) encoded at once while building the trigram index
+BUILD_CHUNK_CHARS = 4_000_000
+# Bits of one character in a trigram code (Unicode fits in 21)
+_CHAR_BITS = 21
+
+
+class SearchIndex:
+    def __init__(self, names:list, formulas:list=None):
+        """Search compounds & elements by name, partial name or formula
+
+        e.g.
+            index = SearchIndex(['portlandite', 'calcite'], ['Ca(OH)2', 'CaCO3'])
+            index.search('calc')
+            index.search('CaH2O2') # formulas match whatever the notation
+
+        Three kinds of lookup are combined:
+            - prefix: sorted keys (lower case names, formulas as
+              written) are binary searched, like walking a trie
+            - canonical formula: queries that parse as a formula
+              match entries of the same Hill formula
+            - trigram: names & formulas containing enough of the
+              query's 3-letter substrings (tolerates typos and
+              words in any order), ranked by the mean of the
+              fraction of the query's trigrams found and the
+              Jaccard similarity of the trigram sets
+
+        All strings and postings are flat numpy arrays, so an
+        index of millions of entries is saved as a few .npy files
+        and memory mapped back in no time (see "save", "load").
+
+        Args:
+            names (list of str): Name of every entry
+                (e.g. 'calcium silicate hydrate').
+            formulas (list of str, optional): Formula of every
+                entry, None or '' if unknown. Defaults to None.
+
+        Raises:
+            ValueError: As many formulas as names are needed
+        """
+        names = [name or '' for name in names]
+        formulas = [f or '' for f in (formulas if formulas is not None else [''] * len(names))]
+        if len(formulas) != len(names):
+            raise ValueError(f'Expected as many formulas as names, instead '
+                             f'got {len(formulas)} and {len(names)}')
+        self._names = _Strings.from_list(names)
+        self._formulas = _Strings.from_list(formulas)
+        canonical = _canonical_formulas(formulas)
+        self._keys = {
+            'name': _SortedKeys.from_list([n.lower() for n in names]),
+            'formula': _SortedKeys.from_list(formulas),
+            'canonical': _SortedKeys.from_list(canonical),
+        }
+        (self._vocabulary, self._posting_offsets,
+         self._postings, self._n_trigrams) = _trigram_index(names, formulas)
+
+    @classmethod
+    def from_elements(cls, names:list=None) -> 'SearchIndex':
+        """Index of all elements, searchable by name or symbol
+
+        Args:
+            names (list of str, optional): Element names in the
+                order of "composition.ELEMENTS". Defaults to the
+                'Name' column of "database.Atoms".
+        """
+        names, symbols = element_entries(names)
+        return cls(names, symbols)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, i:int) -> dict:
+        return {'name': self._names[i], 'formula': self._formulas[i]}
+
+    def search(self, query:str, limit:int=10, min_similarity:float=0.3) -> list:
+        """Best matching entries of a query
+
+        Args:
+            query (str): Name, partial name, formula or partial
+                formula (e.g. 'calcium sil', 'Ca(OH)2', 'CaSi').
+            limit (int, optional): Max. number of results.
+                Defaults to 10.
+            min_similarity (float, optional): Min. fraction of the
+                query's trigrams a fuzzy match holds. Defaults to 0.3.
+
+        Returns:
+            list of dict: Best first, with keys 'id' (entry
+                index), 'name', 'formula' and 'score'
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        scores = {}
+        ### Prefix & exact matches
+        for kind, key in (('name', query.lower()), ('formula', query)):
+            for i, score in self._keys[kind].prefix(key, limit):
+                scores[i] = max(scores.get(i, 0.0), score)
+        canonical = _canonical_formulas([query])[0]
+        if canonical:
+            for i, _ in self._keys['canonical'].prefix(canonical, limit, exact=True):
+                scores[i] = EXACT_SCORE
+        ### Fuzzy matches, which rank below any prefix match
+        if len(scores) < limit:
+            ids, fuzzy = self._trigram_matches(query, min_similarity)
+            best = np.lexsort((ids, -fuzzy))[:limit]
+            ids, fuzzy = ids[best], fuzzy[best]
+            for i, score in zip(ids.tolist(), fuzzy.tolist()):
+                scores[i] = max(scores.get(i, 0.0), score)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{'id': int(i), **self[i], 'score': float(score)} for i, score in best]
+
+    def _trigram_matches(self, query:str, min_similarity:float):
+        """Entries holding enough of the query's trigrams, and their score"""
+        codes = np.unique(_trigram_codes([_padded(query)])[1])
+        n_query = len(codes)
+        n_shared_min = max(1, int(np.ceil(min_similarity * n_query)))
+        slots = np.searchsorted(self._vocabulary, codes)
+        known = slots < len(self._vocabulary)
+        known[known] = self._vocabulary[slots[known]] == codes[known]
+        slots = slots[known]
+        if len(slots) < n_shared_min:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        starts = self._posting_offsets[slots]
+        ends = self._posting_offsets[slots + 1]
+        sizes = ends - starts
+        # An entry holding n_shared_min of the query's trigrams holds
+        # one of the len - n_shared_min + 1 rarest ones, so only those
+        # are read, up to MAX_CANDIDATE_POSTINGS (rare trigrams first)
+        rarest = np.argsort(sizes, kind='stable')[:len(slots) - n_shared_min + 1]
+        n_read = max(1, np.searchsorted(np.cumsum(sizes[rarest]), MAX_CANDIDATE_POSTINGS,
+                                        side='right'))
+        candidates, hits = np.unique(np.concatenate(
+            [self._postings[starts[j]:ends[j]][:MAX_CANDIDATE_POSTINGS]
+             for j in rarest[:n_read]]), return_counts=True)
+        if len(candidates) > MAX_CANDIDATES:
+            # Only those holding the most of the rare trigrams read are scored
+            best = np.sort(np.argpartition(-hits, MAX_CANDIDATES - 1)[:MAX_CANDIDATES])
+            candidates, hits = candidates[best], hits[best]
+        # Lists read whole already counted, only a single rarest list is cut
+        if sizes[rarest[0]] <= MAX_CANDIDATE_POSTINGS:
+            shared = hits.astype(np.int64)
+            unread = np.ones(len(slots), dtype=bool)
+            unread[rarest[:n_read]] = False
+            starts, ends = starts[unread], ends[unread]
+        else:
+            shared = np.zeros(len(candidates), dtype=np.int64)
+        for start, end in zip(starts, ends):
+            postings = self._postings[start:end]
+            if len(postings) < len(candidates):
+                # Look the postings up among the candidates
+                found = np.searchsorted(candidates, postings)
+                inside = found < len(candidates)
+                found = found[inside]
+                shared[found[candidates[found] == postings[inside]]] += 1
+            else:
+                found = np.searchsorted(postings, candidates)
+                found[found == len(postings)] = 0
+                shared += postings[found] == candidates
+        keep = shared >= n_shared_min
+        candidates, shared = candidates[keep], shared[keep]
+        jaccard = shared / (n_query + self._n_trigrams[candidates] - shared)
+        return candidates.astype(np.int64), 0.5 * (shared / n_query + jaccard)
+
+    def save(self, path:str):
+        """Write the index as .npy files into directory "path" """
+        os.makedirs(path, exist_ok=True)
+        arrays = {'vocabulary': self._vocabulary, 'posting_offsets': self._posting_offsets,
+                  'postings': self._postings, 'n_trigrams': self._n_trigrams}
+        for name, strings in (('names', self._names), ('formulas', self._formulas)):
+            arrays[f'{name}_data'], arrays[f'{name}_offsets'] = strings.data, strings.offsets
+        for kind, keys in self._keys.items():
+            arrays[f'{kind}_keys_data'] = keys.strings.data
+            arrays[f'{kind}_keys_offsets'] = keys.strings.offsets
+            arrays[f'{kind}_keys_ids'] = keys.ids
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), arr)
+
+    @classmethod
+    def load(cls, path:str, mmap_mode:str='r') -> 'SearchIndex':
+        """Read an index written by "save"
+
+        Args:
+            path (str): Directory.
+            mmap_mode (str, optional): See "np.load". The default
+                'r' maps the files read-only instead of reading them.
+        """
+        # Plain ndarray views of the maps skip np.memmap's per-slice overhead
+        load = lambda name: np.load(os.path.join(path, f'{name}.npy'),
+                                    mmap_mode=mmap_mode).view(np.ndarray)
+        index = cls.__new__(cls)
+        index._names = _Strings(load('names_data'), load('names_offsets'))
+        index._formulas = _Strings(load('formulas_data'), load('formulas_offsets'))
+        index._keys = {kind: _SortedKeys(_Strings(load(f'{kind}_keys_data'),
+                                                  load(f'{kind}_keys_offsets')),
+                                         load(f'{kind}_keys_ids'))
+                       for kind in ('name', 'formula', 'canonical')}
+        index._vocabulary = load('vocabulary')
+        index._posting_offsets = load('posting_offsets')
+        index._postings = load('postings')
+        index._n_trigrams = load('n_trigrams')
+        return index
+
+
+def element_entries(names:list=None):
+    """Names & symbols of all elements, for a "SearchIndex"
+
+    Args:
+        names (list of str, optional): Element names in the
+            order of "composition.ELEMENTS". Defaults to the
+            'Name' column of "database.Atoms".
+
+    Returns:
+        list of str: Element names ('' if unknown)
+        list of str: Atomic symbols
+    """
+    if names is None:
+        df = database.get_atoms(properties=['Z', 'Name'])
+        by_z = {int(z): str(name) for z, name in zip(df['Z'], df['Name'])
+                if isinstance(name, str)}
+        names = [by_z.get(z, '') for z in range(1, composition.N_ELEMENTS + 1)]
+    if len(names) != composition.N_ELEMENTS:
+        raise ValueError(f'Expected {composition.N_ELEMENTS} element names, '
+                         f'instead got {len(names)}')
+    return list(names), list(composition.ELEMENTS)
+
+
+class _Strings:
+    def __init__(self, data:np.ndarray, offsets:np.ndarray):
+        """Strings stored as concatenated UTF-8 bytes and int64 offsets"""
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, strings:list) -> '_Strings':
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i:int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def lengths(self, start:int, stop:int) -> np.ndarray:
+        """Byte lengths of strings start ... stop - 1"""
+        return np.diff(self.offsets[start:stop + 1])
+
+
+class _SortedKeys:
+    def __init__(self, strings:_Strings, ids:np.ndarray):
+        """Sorted search keys (strings) and the entry id of each"""
+        self.strings = strings
+        self.ids = ids
+
+    @classmethod
+    def from_list(cls, keys:list) -> '_SortedKeys':
+        order = sorted((i for i, key in enumerate(keys) if key), key=keys.__getitem__)
+        return cls(_Strings.from_list([keys[i] for i in order]),
+                   np.array(order, dtype=np.int64))
+
+    def prefix(self, key:str, limit:int, exact:bool=False) -> list:
+        """Up to "limit" (entry id, score) of keys equal to or starting with key
+
+        Exact matches come first, then the shortest keys.
+        """
+        strings = self.strings
+        start = bisect.bisect_left(range(len(strings)), key, key=strings.__getitem__)
+        stop = bisect.bisect_left(range(start, len(strings)), key + '\U0010ffff',
+                                  key=strings.__getitem__) + start
+        if exact:
+            stop = bisect.bisect_right(range(start, stop), key,
+                                       key=strings.__getitem__) + start
+        lengths = strings.lengths(start, stop)
+        if stop - start > limit:
+            best = np.argpartition(lengths, limit - 1)[:limit]
+        else:
+            best = np.arange(stop - start)
+        n_bytes = len(key.encode('utf-8'))
+        return [(int(self.ids[start + j]),
+                 EXACT_SCORE if lengths[j] == n_bytes else PREFIX_SCORE + n_bytes / lengths[j])
+                for j in best]
+
+
+def _canonical_formulas(formulas:list) -> list:
+    """Hill formula of every formula, '' if it doesn't parse"""
+    cache = {'': ''}
+    for formula in formulas:
+        if formula in cache:
+            continue
+        atoms = _flat_atoms(formula)
+        try:
+            atoms = atoms or parse.atoms(formula)
+        except Exception: # SyntaxError, ValueError & failed parses
+            atoms = {}
+        if any(a not in composition.ELEMENT_INDEX for a in atoms):
+            atoms = {}
+        cache[formula] = composition.hill_formula(atoms) if atoms else ''
+    return [cache[formula] for formula in formulas]
+
+def _flat_atoms(formula:str) -> dict:
+    """Atom counts of a flat formula (e.g. 'Ca2SiO4'), {} for any other"""
+    if not _FLAT_FORMULA.fullmatch(formula):
+        return {}
+    atoms = {}
+    for atom, count in _FLAT_ATOM.findall(formula):
+        atoms[atom] = atoms.get(atom, 0.0) + (float(count) if count else 1.0)
+    return atoms if all(atoms.values()) else {}
+
+# Formulas without groups, hydrates or charges, parsed without "parse.atoms"
+_FLAT_FORMULA = re.compile(r'(?:[A-Z][a-z]?(?:\d+(?:\.\d+)?)?)+')
+_FLAT_ATOM = re.compile(r'([A-Z][a-z]?)(\d+(?:\.\d+)?)?')
+
+def _padded(text:str) -> str:
+    """Lower case text padded so that word starts & ends make trigrams
+
+    Only the first MAX_TRIGRAM_CHARS characters are kept.
+    """
+    return f'  {text[:MAX_TRIGRAM_CHARS].lower()} '
+
+def _trigram_codes(texts:list, row_ids=None):
+    """int64 code of every trigram of every text
+
+    Returns:
+        np.ndarray: Row (or row_ids[row]) of each trigram
+        np.ndarray: Trigram codes, 3 x 21 bits of code points
+    """
+    width = max(3, max(map(len, texts), default=0))
+    chars = np.array(texts, dtype=f'U{width}').view(np.uint32).reshape(len(texts), width)
+    chars = chars.astype(np.int64)
+    codes = (chars[:, :-2] << 2 * _CHAR_BITS) | (chars[:, 1:-1] << _CHAR_BITS) | chars[:, 2:]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    valid = np.arange(width - 2) < (lengths - 2)[:, None]
+    rows = np.broadcast_to(np.arange(len(texts))[:, None], codes.shape)[valid]
+    if row_ids is not None:
+        rows = row_ids[rows]
+    return rows, codes[valid]
+
+def _trigram_index(names:list, formulas:list):
+    """Inverted index of the trigrams of names & formulas
+
+    Returns:
+        np.ndarray: Sorted unique trigram codes (vocabulary)
+        np.ndarray: int64 offsets of the postings of each trigram
+        np.ndarray: int32 entry ids, ascending per trigram
+        np.ndarray: uint16 number of distinct trigrams per entry
+    """
+    rows, codes = [], []
+    for texts in (names, formulas):
+        texts = [_padded(t) for t in texts]
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        # Texts of similar lengths are encoded together (little padding),
+        # at most BUILD_CHUNK_CHARS characters at a time
+        order = np.argsort(lengths, kind='stable')
+        order = order[lengths[order] > 3]
+        chunk_size = BUILD_CHUNK_CHARS // (MAX_TRIGRAM_CHARS + 3)
+        for start in range(0, len(order), chunk_size):
+            chunk_ids = order[start:start + chunk_size]
+            r, c = _trigram_codes([texts[i] for i in chunk_ids], chunk_ids)
+            rows.append(r)
+            codes.append(c)
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+    ### Unique (trigram, entry) pairs, sorted by trigram then entry
+    order = np.lexsort((rows, codes))
+    rows, codes = rows[order], codes[order]
+    new = np.ones(len(codes), dtype=bool)
+    new[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+    rows, codes = rows[new], codes[new]
+    vocabulary, starts = np.unique(codes, return_index=True)
+    offsets = np.append(starts, len(codes)).astype(np.int64)
+    n_trigrams = np.bincount(rows, minlength=len(names)).astype(np.uint16)
+    return vocabulary, offsets, rows.astype(np.int32), n_trigrams
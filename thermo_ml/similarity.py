@@ -0,0 +1,315 @@
+import numpy as np
+from thermo_ml import composition
+
+
+# Inserts scanned outside the tree before it is rebuilt, min. & fraction
+TREE_REBUILD_MIN = 1024
+TREE_REBUILD_FRACTION = 0.1
+# Max. floats of the query x leaf box bounds computed at once
+TREE_BOUNDS_FLOATS = 1 << 22
+# Neighbouring tree leaves bounded by one box, to skip far leaves at once
+LEAVES_PER_GROUP = 32
+
+
+class CompositionIndex:
+    def __init__(self,
+                 element_features:np.ndarray=None,
+                 block_size:int=1024,
+                 tree:bool=None,
+                 leaf_size:int=64):
+        """Nearest-neighbour index over compositions
+
+        Compositions are stored as rows of a contiguous float32
+        matrix. Queries are answered exactly, either
+            - by a KD-tree: the vectors are split at the median of
+              their widest dimension down to leaves of at most
+              "leaf_size" vectors. A query scans the leaves whose
+              bounding box is closer than the k-th distance found
+              in the nearest boxes. Suits few dimensions, i.e.
+              element features.
+            - by a blocked scan, using |a - b|^2 = |a|^2 + |b|^2
+              - 2 a.b so that all distances of a block of queries
+              come out of a single matrix product. Suits sparse
+              118-dimensional atomic fractions, on which tree
+              pruning degrades to a full scan.
+
+        Args:
+            element_features (np.ndarray, optional): Array of
+                shape (N_ELEMENTS, n_features) of atomic
+                properties (e.g. electronegativity, radius)
+                in the order of "composition.ELEMENTS".
+                If given, a formula is represented by the
+                fraction-weighted mean of these features.
+                NaN marks unknown properties (e.g. the
+                electronegativity of He); formulas holding
+                such an element can't be added or queried.
+                If None, by its atomic fractions.
+                Defaults to None.
+            block_size (int, optional): Number of queries
+                per matrix product. Bounds peak memory to
+                block_size x len(index) floats.
+                Defaults to 1024.
+            tree (bool, optional): Use a KD-tree. Defaults to None,
+                meaning a tree with element_features and a blocked
+                scan over atomic fractions.
+            leaf_size (int, optional): Max. vectors per tree leaf.
+                Defaults to 64.
+        """
+        if element_features is not None:
+            element_features = np.asarray(element_features, dtype=np.float32)
+            if element_features.ndim != 2 or len(element_features) != composition.N_ELEMENTS:
+                raise ValueError('Expected element_features of shape '
+                                 f'({composition.N_ELEMENTS}, n_features), '
+                                 f'instead got {element_features.shape}')
+        self.element_features = element_features
+        self.block_size = block_size
+        self.tree = element_features is not None if tree is None else tree
+        self.leaf_size = max(2, leaf_size)
+        n_dims = (composition.N_ELEMENTS if element_features is None
+                  else element_features.shape[1])
+        self._vectors = np.zeros((0, n_dims), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self.keys = []
+        # Leaf vector ids (-1 padded) & box corners, group box corners
+        self._leaves = None
+        self._groups = None
+        self._n_tree = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Indexed vectors, one row per inserted formula"""
+        return self._vectors[:self._size]
+
+    def vectorize(self, formulas) -> np.ndarray:
+        """Vectors of formulas as stored in the index
+
+        Args:
+            formulas (iterable of str|dict): Chemical
+                formulas or dictionaries of atom counts.
+
+        Returns:
+            np.ndarray: Array of shape (n_formulas, n_dims),
+                NaN for features unknown of an element present
+        """
+        fractions = composition.to_matrix(formulas).astype(np.float32)
+        if self.element_features is None:
+            return fractions
+        # Unknown features of absent elements mustn't spoil the mean (0 * NaN)
+        known = np.isfinite(self.element_features)
+        vectors = fractions @ np.where(known, self.element_features, 0)
+        vectors[(fractions > 0) @ ~known] = np.nan
+        return vectors
+
+    def _vectorize_finite(self, formulas:list) -> np.ndarray:
+        """Vectors of formulas, all features known
+
+        Raises:
+            ValueError: Formula with an element of unknown features
+        """
+        vectors = self.vectorize(formulas)
+        unknown = ~np.isfinite(vectors).all(axis=1)
+        if unknown.any():
+            examples = [formulas[i] for i in np.flatnonzero(unknown)[:3]]
+            raise ValueError(f'{unknown.sum()} formula(s) hold elements of unknown '
+                             f'element_features, e.g. {examples}')
+        return vectors
+
+    def add(self, formulas, keys:list=None):
+        """Insert formulas into the index
+
+        Storage grows geometrically, so that
+        repeated small inserts stay cheap. With a tree,
+        new vectors are scanned until the next query
+        finds enough of them to rebuild it.
+
+        Args:
+            formulas (iterable of str|dict): Chemical
+                formulas or dictionaries of atom counts.
+            keys (list, optional): Labels returned by
+                "query" for these formulas (e.g. compound
+                names or database ids). Defaults to the
+                formulas themselves.
+
+        Raises:
+            ValueError: Formula with an element of unknown
+                element_features
+        """
+        formulas = list(formulas)
+        keys = formulas if keys is None else list(keys)
+        if len(keys) != len(formulas):
+            raise ValueError(f'Expected {len(formulas)} keys, '
+                             f'instead got {len(keys)}')
+        vectors = self._vectorize_finite(formulas)
+        self._reserve(self._size + len(vectors))
+        end = self._size + len(vectors)
+        self._vectors[self._size:end] = vectors
+        self._sq_norms[self._size:end] = np.einsum('ij,ij->i', vectors, vectors)
+        self._size = end
+        self.keys.extend(keys)
+
+    def query(self, formulas, k:int=5):
+        """Find the k most similar indexed formulas of each query
+
+        Args:
+            formulas (iterable of str|dict): Chemical
+                formulas or dictionaries of atom counts.
+            k (int, optional): Number of neighbours.
+                Defaults to 5.
+
+        Raises:
+            ValueError: Empty index, or formula with an element
+                of unknown element_features
+
+        Returns:
+            np.ndarray: Euclidean distances of shape (n_queries, k),
+                sorted from nearest to farthest.
+            np.ndarray: Row indices of the neighbours in the index,
+                same shape. Use "keys" to map them to labels.
+        """
+        if self._size == 0:
+            raise ValueError('Index is empty, "add" formulas first.')
+        queries = self._vectorize_finite(list(formulas))
+        k = min(k, self._size)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        query_block = self._query_block
+        block_size = self.block_size
+        if self.tree:
+            n_new = self._size - self._n_tree
+            if n_new > max(TREE_REBUILD_MIN, TREE_REBUILD_FRACTION * self._n_tree):
+                self._build_tree()
+                n_new = 0
+            query_block = self._query_tree_block
+            n_groups = len(self._groups[0]) if self._groups is not None else 0
+            n_floats = (n_groups + LEAVES_PER_GROUP + n_new) * self._vectors.shape[1]
+            block_size = max(1, min(block_size, TREE_BOUNDS_FLOATS // n_floats))
+        for start in range(0, len(queries), block_size):
+            stop = start + block_size
+            distances[start:stop], indices[start:stop] = query_block(
+                queries[start:stop], k)
+        return distances, indices
+
+    def _build_tree(self):
+        """KD-tree over all vectors: leaves of median splits, their boxes
+        and the boxes of groups of LEAVES_PER_GROUP neighbouring leaves"""
+        vectors = self.vectors
+        order = np.arange(self._size)
+        nodes, leaves = [(0, self._size)], []
+        while nodes:
+            start, stop = nodes.pop()
+            if stop - start <= self.leaf_size:
+                leaves.append(start)
+                continue
+            points = vectors[order[start:stop]]
+            dim = np.argmax(points.max(axis=0) - points.min(axis=0))
+            middle = (stop - start) // 2
+            order[start:stop] = order[start:stop][
+                np.argpartition(points[:, dim], middle)]
+            nodes += [(start, start + middle), (start + middle, stop)]
+        # In tree order, so consecutive leaves are close to each other
+        starts = np.sort(np.array(leaves, dtype=np.int64))
+        sizes = np.diff(np.append(starts, self._size))
+        rows = np.repeat(np.arange(len(starts)), sizes)
+        ids = np.full((len(starts), self.leaf_size), -1, dtype=np.int64)
+        ids[rows, np.arange(self._size) - starts[rows]] = order
+        sorted_vectors = vectors[order]
+        lower = np.minimum.reduceat(sorted_vectors, starts)
+        upper = np.maximum.reduceat(sorted_vectors, starts)
+        groups = np.arange(0, len(starts), LEAVES_PER_GROUP)
+        self._leaves = (ids, lower, upper)
+        self._groups = (np.minimum.reduceat(lower, groups), np.maximum.reduceat(upper, groups))
+        self._n_tree = self._size
+
+    def _query_tree_block(self, queries:np.ndarray, k:int):
+        """Exact k-NN of a block of query vectors through the KD-tree"""
+        new = np.arange(self._n_tree, self._size)
+        if self._leaves is None:
+            return self._nearest(queries, np.broadcast_to(new, (len(queries), len(new))), k)
+        ids, lower, upper = self._leaves
+        group_bounds = _box_distances(queries, *self._groups)
+        ### k-th distance among the nearest leaves of the nearest group (& new vectors)
+        leaves = (np.argmin(group_bounds, axis=1)[:, None] * LEAVES_PER_GROUP
+                  + np.arange(LEAVES_PER_GROUP))
+        valid = leaves < len(ids)
+        leaves[~valid] = 0
+        leaf_bounds = _box_distances(queries, lower[leaves], upper[leaves])
+        leaf_bounds[~valid] = np.inf
+        n_probe = min(LEAVES_PER_GROUP, -(-k // (self.leaf_size // 2)))
+        probe = np.argpartition(leaf_bounds, n_probe - 1, axis=1)[:, :n_probe]
+        candidates = np.where(np.take_along_axis(valid, probe, axis=1)[:, :, None],
+                              ids[np.take_along_axis(leaves, probe, axis=1)], -1)
+        candidates = np.concatenate([candidates.reshape(len(queries), -1),
+                                     np.broadcast_to(new, (len(queries), len(new)))], axis=1)
+        radius = self._nearest(queries, candidates, k)[0][:, -1]
+        radius = (radius * (1 + 1e-5))**2 # float32 round-off of the bounds
+        ### Leaves of the groups within that distance, then their vectors within it
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for i, query in enumerate(queries[:, None, :]):
+            groups = np.flatnonzero(group_bounds[i] <= radius[i])
+            leaves = (groups[:, None] * LEAVES_PER_GROUP + np.arange(LEAVES_PER_GROUP)).ravel()
+            leaves = leaves[leaves < len(ids)]
+            leaves = leaves[_box_distances(query, lower[leaves], upper[leaves])[0] <= radius[i]]
+            candidates = ids[leaves].ravel()
+            candidates = np.concatenate([candidates[candidates >= 0], new])
+            distances[i], indices[i] = self._nearest(query, candidates[None], k)
+        return distances, indices
+
+    def _nearest(self, queries:np.ndarray, candidates:np.ndarray, k:int):
+        """k nearest of candidate vector ids (-1 = none) per query, sorted"""
+        diff = self._vectors[candidates] - queries[:, None, :]
+        dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+        dist[candidates < 0] = np.inf
+        if k < dist.shape[1]:
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+        part_dist = np.take_along_axis(dist, part, axis=1)
+        order = np.argsort(part_dist, axis=1, kind='stable')
+        part = np.take_along_axis(part, order, axis=1)
+        return (np.take_along_axis(part_dist, order, axis=1),
+                np.take_along_axis(candidates, part, axis=1))
+
+    def _query_block(self, queries:np.ndarray, k:int):
+        """Exact k-NN of a block of query vectors"""
+        # Squared distances to everything in the index
+        sq_dist = queries @ self.vectors.T
+        sq_dist *= -2
+        sq_dist += self._sq_norms[:self._size]
+        sq_dist += np.einsum('ij,ij->i', queries, queries)[:, None]
+        np.maximum(sq_dist, 0, out=sq_dist)
+        # Select k smallest, then sort only those
+        if k < self._size:
+            part = np.argpartition(sq_dist, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(self._size), sq_dist.shape)
+        # Recompute distances of the candidates directly, since
+        # the expansion above loses precision for close neighbours
+        diff = self.vectors[part] - queries[:, None, :]
+        part_dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+        order = np.argsort(part_dist, axis=1, kind='stable')
+        indices = np.take_along_axis(part, order, axis=1)
+        distances = np.take_along_axis(part_dist, order, axis=1)
+        return distances, indices
+
+    def _reserve(self, capacity:int):
+        """Grow storage to hold at least "capacity" vectors"""
+        if capacity <= len(self._vectors):
+            return
+        new_capacity = max(capacity, 2 * len(self._vectors), 16)
+        vectors = np.zeros((new_capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:self._size] = self.vectors
+        sq_norms = np.zeros(new_capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        self._vectors, self._sq_norms = vectors, sq_norms
+
+
+def _box_distances(queries:np.ndarray, lower:np.ndarray, upper:np.ndarray) -> np.ndarray:
+    """Squared distances of queries (n, d) to boxes (m, d) or (n, m, d), shape (n, m)"""
+    gap = np.maximum(lower - queries[:, None, :], 0)
+    gap += np.maximum(queries[:, None, :] - upper, 0)
+    return np.einsum('ijk,ijk->ij', gap, gap)